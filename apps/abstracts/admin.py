@@ -1,11 +1,47 @@
-from django.db import models
+from collections import Counter
+from functools import lru_cache
+
+from asgiref.sync import sync_to_async
+from django.contrib import admin
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.views.main import ChangeList, ORDER_VAR
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.paginator import Paginator
+from django.db import connections, models, router, transaction
+from django.db.models import F
 from django.utils import timezone
+from django.utils.functional import cached_property
+
+from .signals import soft_deleted, restored
+
+
+# most pks sent with one soft_deleted / restored signal
+SIGNAL_CHUNK_SIZE = 10000
+
+
+@lru_cache(maxsize=None)
+def cascade_relations(model):
+    """
+    Return (related_model, fk_name) pairs a soft delete of model cascades to.
+    Only CASCADE foreign keys between soft-deletable models are followed,
+    SET_NULL / PROTECT relations keep their rows alive.
+    """
+    from .models import AbstractSoftDeletableModel
+
+    relations = []
+    for rel in model._meta.related_objects:
+        if rel.many_to_many or rel.on_delete is not models.CASCADE:
+            continue
+        if not issubclass(rel.related_model, AbstractSoftDeletableModel):
+            continue
+        relations.append((rel.related_model, rel.field.name))
+    return tuple(relations)
 
 
 class SoftDeleteQuerySet(models.QuerySet):
     def delete(self):
         # soft delete a queryset
-        return super().update(deleted_at=timezone.now())
+        return self.soft_delete()
 
     def hard_delete(self):
         return super().delete()
@@ -16,16 +52,314 @@ class SoftDeleteQuerySet(models.QuerySet):
     def dead(self):
         return self.filter(deleted_at__isnull=False)
 
+    def soft_delete(self, deleted_at=None):
+        """
+        Soft delete alive rows of the queryset and every alive row that
+        depends on them through a CASCADE foreign key.
+        Runs one UPDATE per related table, all rows share one timestamp.
+        """
+        deleted_at = deleted_at or timezone.now()
+        counter = Counter()
+        with transaction.atomic(using=self._write_db()):
+            self.alive()._cascade_soft_delete(deleted_at, counter, ())
+        return sum(counter.values()), dict(counter)
+
     def restore(self):
-        return self.update(deleted_at=None)
+        """
+        Restore dead rows of the queryset together with the related rows
+        that were soft deleted by the same cascade (same deleted_at).
+        """
+        counter = Counter()
+        with transaction.atomic(using=self._write_db()):
+            self.dead()._cascade_restore(counter, ())
+        return sum(counter.values()), dict(counter)
+
+    # async counterparts, like QuerySet.adelete()
+    async def asoft_delete(self, deleted_at=None):
+        return await sync_to_async(self.soft_delete)(deleted_at)
+
+    async def arestore(self):
+        return await sync_to_async(self.restore)()
+
+    async def ahard_delete(self):
+        return await sync_to_async(self.hard_delete)()
+
+    def _write_db(self):
+        return self._db or router.db_for_write(self.model, **self._hints)
+
+    def _related(self, related_model, fk_name):
+        return related_model.all_objects.using(self._write_db()).filter(
+            **{f"{fk_name}__in": self.values("pk")}
+        )
+
+    def _cascade_soft_delete(self, deleted_at, counter, path):
+        # children first, so the parent subquery still sees alive rows
+        path = path + (self.model,)
+        for related_model, fk_name in cascade_relations(self.model):
+            if related_model in path:
+                continue
+            self._related(related_model, fk_name).alive()._cascade_soft_delete(deleted_at, counter, path)
+        self._update_and_send(soft_deleted, counter, deleted_at=deleted_at)
+
+    def _cascade_restore(self, counter, path):
+        path = path + (self.model,)
+        for related_model, fk_name in cascade_relations(self.model):
+            if related_model in path:
+                continue
+            self._related(related_model, fk_name).filter(
+                deleted_at=F(f"{fk_name}__deleted_at"),
+            )._cascade_restore(counter, path)
+        self._update_and_send(restored, counter, deleted_at=None)
+
+    def _update_and_send(self, signal, counter, **values):
+        # pks are only collected when someone listens and must be read
+        # before the update, the filter no longer matches the rows after it
+        pks = list(self.values_list("pk", flat=True)) if signal.has_listeners(self.model) else None
+        counter[self.model._meta.label] += self.update(**values)
+        # in chunks, receivers filter on pk__in and a backend caps the
+        # number of query parameters (SQLite: 32766)
+        for start in range(0, len(pks or ()), SIGNAL_CHUNK_SIZE):
+            signal.send(sender=self.model, pks=pks[start:start + SIGNAL_CHUNK_SIZE])
 
 
 class SoftDeleteManager(models.Manager):
+    def __init__(self, alive_only=True):
+        super().__init__()
+        self.alive_only = alive_only
+
     def get_queryset(self):
-        return SoftDeleteQuerySet(self.model, using=self._db).filter(deleted_at__isnull=True)
+        queryset = SoftDeleteQuerySet(self.model, using=self._db)
+        return queryset.alive() if self.alive_only else queryset
 
     def all_with_deleted(self):
         return SoftDeleteQuerySet(self.model, using=self._db)
 
     def deleted_only(self):
         return self.all_with_deleted().dead()
+
+
+# above JOBS_ADMIN_THRESHOLD rows the actions are queued as background
+# jobs (apps.abstracts.jobs imports models.py, which imports this module)
+@admin.action(description="Soft delete selected")
+def soft_delete(modeladmin, request, queryset):
+    from .jobs import in_background, soft_delete_rows
+
+    if not in_background(modeladmin, request, queryset, soft_delete_rows):
+        queryset.soft_delete()
+
+
+@admin.action(description="Restore selected")
+def restore(modeladmin, request, queryset):
+    from .jobs import in_background, restore_rows
+
+    if not in_background(modeladmin, request, queryset, restore_rows):
+        queryset.restore()
+
+
+@admin.action(description="Hard delete selected (irreversible)")
+def hard_delete(modeladmin, request, queryset):
+    from .jobs import in_background, hard_delete_rows
+
+    if not in_background(modeladmin, request, queryset, hard_delete_rows):
+        queryset.hard_delete()
+
+
+class SoftDeleteAdmin(admin.ModelAdmin):
+    """
+    ModelAdmin for soft-deletable models.
+    Lists dead rows too so they can be restored.
+    """
+
+    actions = [soft_delete, restore, hard_delete]
+
+    def get_queryset(self, request):
+        queryset = self.model.all_objects.get_queryset()
+        ordering = self.get_ordering(request)
+        if ordering:
+            queryset = queryset.order_by(*ordering)
+        return queryset
+
+
+# ----------------------------------------------
+# Large tables
+#
+KEYSET_AFTER = "after"
+KEYSET_BEFORE = "before"
+# below this many rows an exact COUNT(*) is cheap enough
+EXACT_COUNT_BELOW = 10000
+# filtered changelists stop counting here
+COUNT_LIMIT = 10000
+
+
+def table_row_estimate(model, using):
+    """
+    Cheap row count estimate of a table, None if the backend has none.
+    SQLite uses MAX(rowid), an upper bound once rows were deleted.
+    """
+    connection = connections[using]
+    table = connection.ops.quote_name(model._meta.db_table)
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [model._meta.db_table])
+        elif connection.vendor == "sqlite":
+            cursor.execute(f"SELECT MAX(rowid) FROM {table}")
+        else:
+            return None
+        row = cursor.fetchone()
+    if not row or row[0] is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+def estimated_count(queryset):
+    """
+    Return (count, is_estimate) for changelists: a table estimate when the
+    queryset is not filtered and the table is large, else COUNT(*) capped
+    at COUNT_LIMIT.
+    """
+    if not queryset.query.where:
+        estimate = table_row_estimate(queryset.model, queryset.db)
+        if estimate is not None and estimate >= EXACT_COUNT_BELOW:
+            return estimate, True
+        return queryset.count(), False
+    count = queryset[:COUNT_LIMIT].count()
+    return count, count >= COUNT_LIMIT
+
+
+class EstimatedCountPaginator(Paginator):
+    is_estimate = False
+
+    @cached_property
+    def count(self):
+        count, self.is_estimate = estimated_count(self.object_list)
+        return count
+
+
+class LargeTableChangeList(ChangeList):
+    """
+    ChangeList paginating with a primary key cursor (?after= / ?before=)
+    instead of OFFSET while the list is in its default primary key order.
+    Sorting by a column falls back to regular page numbers.
+
+    A keyset page is a plain list of rows in result_list, which the
+    change list templates only iterate and count. The list_editable
+    formset needs a queryset: with list_editable the pages are numbered.
+    """
+
+    keyset_pagination = False
+    keyset_next_url = keyset_previous_url = keyset_first_url = None
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        for name in (KEYSET_AFTER, KEYSET_BEFORE):
+            lookup_params.pop(name, None)
+        return lookup_params
+
+    def _keyset_descending(self):
+        if ORDER_VAR in self.params or self.show_all or self.list_editable:
+            return None
+        ordering = tuple(self.queryset.query.order_by)
+        if ordering == ("-pk",):
+            return True
+        if ordering == ("pk",):
+            return False
+        return None
+
+    def _cursor(self, name):
+        value = self.params.get(name)
+        if value is None:
+            return None
+        try:
+            return self.lookup_opts.pk.to_python(value)
+        except ValidationError as exc:
+            raise IncorrectLookupParameters(exc)
+
+    def get_results(self, request):
+        descending = self._keyset_descending()
+        if descending is None:
+            return super().get_results(request)
+
+        after, before = self._cursor(KEYSET_AFTER), self._cursor(KEYSET_BEFORE)
+        per_page = self.list_per_page
+        forward, backward = ("pk__lt", "pk__gt") if descending else ("pk__gt", "pk__lt")
+        if before is not None:
+            # previous page: walk backwards from the cursor, then flip
+            page = self.queryset.filter(**{backward: before}).reverse()[:per_page + 1]
+            rows = list(page)
+            has_previous, has_next = len(rows) > per_page, True
+            rows = rows[:per_page][::-1]
+        else:
+            page = self.queryset.filter(**{forward: after}) if after is not None else self.queryset
+            page = page[:per_page + 1]
+            rows = list(page)
+            has_previous, has_next = after is not None, len(rows) > per_page
+            rows = rows[:per_page]
+
+        self.paginator = self.model_admin.get_paginator(request, self.queryset, per_page)
+        self.result_count = self.paginator.count
+        self.full_result_count = None
+        self.show_full_result_count = False
+        self.show_admin_actions = True
+        self.result_list = rows
+        self.can_show_all = False
+        self.multi_page = has_previous or has_next
+        self.keyset_pagination = True
+        if rows and has_next:
+            self.keyset_next_url = self.get_query_string({KEYSET_AFTER: rows[-1].pk}, remove=[KEYSET_BEFORE])
+        if rows and has_previous:
+            self.keyset_previous_url = self.get_query_string({KEYSET_BEFORE: rows[0].pk}, remove=[KEYSET_AFTER])
+            self.keyset_first_url = self.get_query_string(remove=[KEYSET_AFTER, KEYSET_BEFORE])
+
+
+class BoundedRelatedFieldListFilter(admin.RelatedFieldListFilter):
+    """
+    Related list filter offering at most `limit` choices (plus the selected
+    ones) instead of loading every row of the related table.
+    """
+
+    limit = 50
+
+    def field_choices(self, field, request, model_admin):
+        ordering = self.field_admin_ordering(field, request, model_admin) or ("pk",)
+        related = (
+            field.remote_field.model._default_manager
+            .complex_filter(field.get_limit_choices_to())
+            .order_by(*ordering)
+        )
+        choices = [(obj.pk, str(obj)) for obj in related[:self.limit]]
+        shown = {str(pk) for pk, _ in choices}
+        selected = [value for value in self.lookup_val or () if value not in shown]
+        if selected:
+            choices += [(obj.pk, str(obj)) for obj in related.filter(pk__in=selected)]
+        return choices
+
+
+class LargeTableAdminMixin:
+    """
+    ModelAdmin mixin for tables with millions of rows:
+    select_related for every foreign key shown in list_display (on top of
+    the paths listed in list_select_related), estimated counts and keyset
+    pagination.
+    """
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_select_related = ()
+
+    def get_changelist(self, request, **kwargs):
+        return LargeTableChangeList
+
+    def get_list_select_related(self, request):
+        related = list(self.list_select_related or ())
+        for name in self.get_list_display(request):
+            if not isinstance(name, str):
+                continue
+            try:
+                field = self.model._meta.get_field(name)
+            except FieldDoesNotExist:
+                continue
+            if (field.many_to_one or field.one_to_one) and not any(
+                path == name or path.startswith(f"{name}__") for path in related
+            ):
+                related.append(name)
+        return related
@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class AbstractsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.abstracts"
+
+    def ready(self):
+        # per-request SQL instrumentation
+        from django.db.backends.signals import connection_created
+
+        from apps.abstracts.instrumentation import install
+
+        connection_created.connect(install, dispatch_uid="apps.abstracts.instrumentation")
+        # admin.py is imported by models.py, the profiler and job admins register here
+        from apps.abstracts import jobs_admin, profiling_admin  # noqa: F401
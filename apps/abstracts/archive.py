@@ -0,0 +1,237 @@
+"""
+Archive and purge of rows that were soft deleted long ago.
+
+Rows are copied into a per-model "<db_table>_archive" table and then hard
+deleted from the hot table, in small batches, children before parents.
+A row is only purged once no row of any table references it any more:
+the hard delete would otherwise cascade into rows that were never
+archived, or null the references of rows that are kept.
+
+The archive tables are created by migrations, see sync_archive_tables().
+"""
+import time
+
+from django.apps import apps
+from django.apps.registry import Apps
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections, router, transaction
+from django.db.models import BigAutoField, DateTimeField, Exists, Field, Model, OuterRef
+from django.utils import timezone
+
+from .models import AbstractSoftDeletableModel
+
+ARCHIVED_AT_COLUMN = "archived_at"
+
+
+class PurgeReport:
+    """
+    Progress of the purge of one model.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.rows = 0
+        self.batches = 0
+        self.seconds = 0.0
+        self.finished = False
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        return (
+            f"{self.model._meta.label}: {self.rows} rows in {self.batches} batches, "
+            f"{self.seconds:.2f}s ({self.rows_per_second:.0f} rows/s)"
+        )
+
+
+def referencing_relations(model):
+    """
+    Return (related_model, fk) pairs of every foreign key pointing at model,
+    whatever its on_delete, hidden ones included. The link tables of
+    auto-created many-to-many fields are left out: their rows go with the
+    row they link.
+    """
+    return tuple(
+        (rel.related_model, rel.field)
+        for rel in model._meta.get_fields(include_hidden=True)
+        if rel.auto_created and not rel.concrete and (rel.one_to_many or rel.one_to_one)
+        and not rel.related_model._meta.auto_created
+    )
+
+
+def soft_deletable_models():
+    """Return concrete soft-deletable models, referencing models first."""
+    ordered, visiting = [], set()
+
+    def visit(model):
+        if model in ordered or model in visiting:
+            return
+        visiting.add(model)
+        for related_model, _ in referencing_relations(model):
+            if issubclass(related_model, AbstractSoftDeletableModel):
+                visit(related_model)
+        visiting.discard(model)
+        ordered.append(model)
+
+    for model in apps.get_models():
+        if issubclass(model, AbstractSoftDeletableModel):
+            visit(model)
+    return ordered
+
+
+def archive_table_name(model):
+    return f"{model._meta.db_table}_archive"
+
+
+class ArchiveColumn(Field):
+    """A nullable column of a given database type."""
+
+    def __init__(self, column_type, **kwargs):
+        self.column_type = column_type
+        kwargs.setdefault("null", True)
+        super().__init__(**kwargs)
+
+    def deconstruct(self):
+        # SQLite's schema editor clones the fields when it rebuilds a table
+        name, path, args, kwargs = super().deconstruct()
+        return name, path, [self.column_type, *args], kwargs
+
+    def db_type(self, connection):
+        return self.column_type
+
+
+def archive_model(model, connection):
+    """
+    An unregistered model over the archive table of model: the columns of
+    its hot table, with their types but without their constraints, and
+    archived_at. Its own archive_id key lets an archive keep two rows that
+    once had the same primary key.
+    """
+    attrs = {
+        "__module__": __name__,
+        "Meta": type("Meta", (), {"apps": Apps(), "app_label": model._meta.app_label, "db_table": archive_table_name(model)}),
+        "archive_id": BigAutoField(primary_key=True),
+    }
+    for field in model._meta.concrete_fields:
+        # an auto field's own type carries the sequence / AUTO_INCREMENT
+        column_type = field.rel_db_type(connection) if field.primary_key else field.db_type(connection)
+        attrs[field.attname] = ArchiveColumn(column_type, db_column=field.column)
+    attrs[ARCHIVED_AT_COLUMN] = DateTimeField(null=True)
+    return type(f"{model.__name__}Archive", (Model,), attrs)
+
+
+def _columns(connection, table):
+    """The column names of table, None if there is no such table."""
+    with connection.cursor() as cursor:
+        if table not in connection.introspection.table_names(cursor):
+            return None
+        return {info.name for info in connection.introspection.get_table_description(cursor, table)}
+
+
+def sync_archive_tables(*labels):
+    """
+    Return a RunPython function that creates the archive tables of the
+    models labels ("app_label.Model"), or adds the columns their hot tables
+    gained since. An app runs it in a migration after every migration that
+    adds a column to a soft-deletable model:
+
+        migrations.RunPython(sync_archive_tables("catalogs.Restaurant"), migrations.RunPython.noop)
+    """
+
+    def sync(apps, schema_editor):
+        for label in labels:
+            archive = archive_model(apps.get_model(label), schema_editor.connection)
+            existing = _columns(schema_editor.connection, archive._meta.db_table)
+            if existing is None:
+                schema_editor.create_model(archive)
+                continue
+            for field in archive._meta.local_fields:
+                # a primary key cannot be added to a table with rows
+                if field.column not in existing and not field.primary_key:
+                    schema_editor.add_field(archive, field)
+
+    return sync
+
+
+def check_archive_table(model, using):
+    """Raise ImproperlyConfigured unless the archive table has every column of the hot table."""
+    table = archive_table_name(model)
+    existing = _columns(connections[using], table) or set()
+    columns = [field.column for field in model._meta.concrete_fields] + [ARCHIVED_AT_COLUMN]
+    missing = [column for column in columns if column not in existing]
+    if missing:
+        raise ImproperlyConfigured(
+            f"{table} lacks {', '.join(missing)}: migrate, or add a migration running "
+            f"sync_archive_tables(\"{model._meta.label}\")."
+        )
+
+
+def purgeable(model, cutoff, using):
+    """
+    Rows of model soft deleted before cutoff that no row references any
+    more, soft deleted or not, soft-deletable or not, so deleting them
+    neither cascades into unarchived data nor nulls a kept reference.
+    """
+    queryset = model.all_objects.using(using).filter(deleted_at__lt=cutoff)
+    for related_model, fk in referencing_relations(model):
+        referencing = related_model._base_manager.using(using).filter(**{fk.name: OuterRef(fk.target_field.attname)})
+        queryset = queryset.exclude(Exists(referencing))
+    return queryset.order_by("pk")
+
+
+def archive_and_delete(model, pks, archived_at, using):
+    """Copy rows with the given pks to the archive table and delete them."""
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    columns = ", ".join(quote(field.column) for field in model._meta.concrete_fields)
+    placeholders = ", ".join(["%s"] * len(pks))
+    with transaction.atomic(using=using):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {quote(archive_table_name(model))} ({columns}, {quote(ARCHIVED_AT_COLUMN)}) "
+                f"SELECT {columns}, %s FROM {quote(model._meta.db_table)} "
+                f"WHERE {quote(model._meta.pk.column)} IN ({placeholders})",
+                [connection.ops.adapt_datetimefield_value(archived_at), *pks],
+            )
+        model.all_objects.using(using).filter(pk__in=pks).hard_delete()
+
+
+def purge(cutoff, models=None, batch_size=1000, sleep=0.0, max_seconds=None, using=None):
+    """
+    Archive and delete rows soft deleted before cutoff.
+
+    Models are processed children first, one transaction per batch, so an
+    interrupted run loses at most the current batch and the next run simply
+    picks up what is left. Yields a PurgeReport after every batch and
+    once more, finished, at the end of every model.
+    """
+    started = time.monotonic()
+    selected = set(models) if models else None
+    for model in soft_deletable_models():
+        if selected is not None and model not in selected:
+            continue
+        db = using or router.db_for_write(model)
+        check_archive_table(model, db)
+        report = PurgeReport(model)
+        queryset = purgeable(model, cutoff, db)
+        last_pk = None
+        while True:
+            if max_seconds is not None and time.monotonic() - started >= max_seconds:
+                return
+            batch_started = time.monotonic()
+            batch = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+            pks = list(batch.values_list("pk", flat=True)[:batch_size])
+            if not pks:
+                break
+            archive_and_delete(model, pks, timezone.now(), db)
+            last_pk = pks[-1]
+            report.rows += len(pks)
+            report.batches += 1
+            report.seconds += time.monotonic() - batch_started
+            yield report
+            if sleep:
+                time.sleep(sleep)
+        report.finished = True
+        yield report
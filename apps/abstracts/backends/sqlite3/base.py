@@ -0,0 +1,66 @@
+"""
+SQLite backend with a production profile, configured through OPTIONS:
+
+    "pragmas": {"journal_mode": "wal", "busy_timeout": 5000, ...}
+        run on every new connection, in order.
+    "transaction_mode": "IMMEDIATE"
+        how atomic() blocks start their transaction. IMMEDIATE takes the
+        write lock up front, so a transaction that reads before it writes
+        waits for busy_timeout instead of failing with "database is
+        locked" when another connection is writing.
+
+Connections run PRAGMA optimize when they close, as SQLite recommends:
+it ANALYZEs the tables their queries used once the statistics are
+missing or stale (bounded by the analysis_limit pragma), without which
+the planner can prefer any index with an equality over a partial one.
+
+The other OPTIONS go to sqlite3.connect() as usual.
+"""
+import re
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+from django.utils.asyncio import async_unsafe
+
+PRAGMA_VALUE_RE = re.compile(r"^(-?\d+|[A-Za-z_]+)$")
+TRANSACTION_MODES = ("DEFERRED", "IMMEDIATE", "EXCLUSIVE")
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    pragmas = {}
+    transaction_mode = "DEFERRED"
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        self.pragmas = params.pop("pragmas", {})
+        self.transaction_mode = params.pop("transaction_mode", "DEFERRED").upper()
+        if self.transaction_mode not in TRANSACTION_MODES:
+            raise ImproperlyConfigured(f"transaction_mode must be one of {', '.join(TRANSACTION_MODES)}.")
+        for name, value in self.pragmas.items():
+            if not name.isidentifier() or not PRAGMA_VALUE_RE.match(str(value)):
+                raise ImproperlyConfigured(f"Invalid SQLite pragma {name} = {value!r}.")
+        return params
+
+    @async_unsafe
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            if name == "journal_mode" and self.is_in_memory_db():
+                # in-memory databases only do "memory"
+                continue
+            conn.execute(f"PRAGMA {name} = {value}")
+        return conn
+
+    @async_unsafe
+    def _close(self):
+        if self.connection is not None and not self.is_in_memory_db():
+            try:
+                # closing anyway: no waiting, if other connections are writing the next one to close does it
+                self.connection.execute("PRAGMA busy_timeout = 0")
+                self.connection.execute("PRAGMA optimize")
+            except base.Database.Error:
+                pass
+        super()._close()
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute(f"BEGIN {self.transaction_mode}")
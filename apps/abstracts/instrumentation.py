@@ -0,0 +1,177 @@
+"""
+Per-request SQL instrumentation.
+
+install() puts an execute wrapper on every new database connection (see
+AbstractsConfig.ready). It does nothing unless a QueryRecorder is active
+in the current context, so sync_to_async() threads and every database
+alias report to the request that started them.
+
+sql_instrumentation_middleware records each request and adds a
+Server-Timing header (db time and query count, total time). It logs
+slow requests and N+1 patterns: the same query shape, literals
+stripped, run SQL_N_PLUS_ONE_THRESHOLD times or more. The log names the
+project frame that issued it.
+
+query_budget() is the same recorder for tests and scripts:
+
+    with query_budget(6):
+        client.get(reverse("admin:catalogs_menuitem_changelist"))
+
+raises AssertionError with the recorded queries once the block runs more
+than 6 queries or, unless allow_n_plus_one=True, an N+1 pattern.
+"""
+# Python modules
+import logging
+import os
+import re
+import time
+import traceback
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Django modules
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.decorators import sync_and_async_middleware
+
+logger = logging.getLogger(__name__)
+
+# active recorders, innermost last
+_recorders = ContextVar("sql_recorders", default=())
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+STRING_RE = re.compile(r"'(?:[^']|'')*'")
+NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+IN_LIST_RE = re.compile(r"\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)")
+
+
+def shape(sql):
+    """The query without its literals, for grouping repeated queries."""
+    sql = STRING_RE.sub("?", sql)
+    sql = NUMBER_RE.sub("?", sql)
+    return IN_LIST_RE.sub("(...)", sql)
+
+
+def origin():
+    """The innermost project frame of the current stack, "file:line in function"."""
+    for frame in reversed(traceback.extract_stack()):
+        if (
+            frame.filename.startswith(PROJECT_DIR)
+            and frame.filename != __file__
+            and "site-packages" not in frame.filename
+        ):
+            return f"{os.path.relpath(frame.filename, PROJECT_DIR)}:{frame.lineno} in {frame.name}"
+    return "unknown"
+
+
+class QueryRecorder:
+    def __init__(self, n_plus_one_threshold=None):
+        self.threshold = n_plus_one_threshold or settings.SQL_N_PLUS_ONE_THRESHOLD
+        self.queries = []
+        self.shapes = Counter()
+        # shape -> origin, taken when the shape reaches the threshold
+        self.origins = {}
+        self.duration = 0.0
+
+    def record(self, alias, sql, duration):
+        key = shape(sql)
+        self.queries.append((alias, sql, duration))
+        self.duration += duration
+        self.shapes[key] += 1
+        if self.shapes[key] == self.threshold:
+            self.origins[key] = origin()
+
+    def n_plus_one(self):
+        """[(count, shape, origin)] of the repeated query shapes, most frequent first."""
+        return [(self.shapes[key], key, where) for key, where in self.origins.items()]
+
+    def report(self):
+        lines = [f"{len(self.queries)} queries in {self.duration * 1000:.1f} ms"]
+        lines += [f"  {count}x {key}" for key, count in self.shapes.most_common()]
+        for count, key, where in sorted(self.n_plus_one(), reverse=True):
+            lines.append(f"N+1: {count}x from {where}: {key}")
+        return "\n".join(lines)
+
+
+def _execute(execute, sql, params, many, context):
+    recorders = _recorders.get()
+    if not recorders:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - started
+        for recorder in recorders:
+            recorder.record(context["connection"].alias, sql, duration)
+
+
+def install(sender, connection, **kwargs):
+    """connection_created receiver, wraps the connection's queries once."""
+    if _execute not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_execute)
+
+
+@contextmanager
+def recording(n_plus_one_threshold=None):
+    recorder = QueryRecorder(n_plus_one_threshold)
+    token = _recorders.set(_recorders.get() + (recorder,))
+    try:
+        yield recorder
+    finally:
+        _recorders.reset(token)
+
+
+@contextmanager
+def query_budget(max_queries, allow_n_plus_one=False, n_plus_one_threshold=None):
+    """Fail the block if it runs more than max_queries queries or an N+1 pattern."""
+    with recording(n_plus_one_threshold) as recorder:
+        yield recorder
+    if len(recorder.queries) > max_queries:
+        raise AssertionError(f"Query budget of {max_queries} exceeded: {recorder.report()}")
+    if recorder.n_plus_one() and not allow_n_plus_one:
+        raise AssertionError(f"N+1 queries: {recorder.report()}")
+
+
+def _finish(request, response, recorder, started):
+    total_ms = (time.perf_counter() - started) * 1000
+    db_ms = recorder.duration * 1000
+    count = len(recorder.queries)
+    response.headers["Server-Timing"] = (
+        f'db;dur={db_ms:.1f};desc="{count} queries", total;dur={total_ms:.1f}'
+    )
+    for repeats, key, where in recorder.n_plus_one():
+        logger.warning("N+1 in %s %s: %d x %s from %s", request.method, request.path, repeats, key, where)
+    if total_ms >= settings.SQL_SLOW_REQUEST_MS:
+        logger.warning(
+            "Slow request %s %s: %.1f ms, %d queries in %.1f ms",
+            request.method, request.path, total_ms, count, db_ms,
+        )
+    return response
+
+
+@sync_and_async_middleware
+def sql_instrumentation_middleware(get_response):
+    """Record the queries of every request, see the module docstring."""
+    if not settings.SQL_INSTRUMENTATION:
+        raise MiddlewareNotUsed
+
+    if iscoroutinefunction(get_response):
+
+        async def middleware(request):
+            started = time.perf_counter()
+            with recording() as recorder:
+                response = await get_response(request)
+            return _finish(request, response, recorder, started)
+
+    else:
+
+        def middleware(request):
+            started = time.perf_counter()
+            with recording() as recorder:
+                response = get_response(request)
+            return _finish(request, response, recorder, started)
+
+    return middleware
@@ -0,0 +1,360 @@
+"""
+Background jobs without a broker: a Job table in the project database
+and `manage.py runworkers`, a pool of worker processes draining it.
+
+A job is a function registered with @job. It gets a progress callable
+first and its keyword arguments after:
+
+    @job
+    def recalculate(progress, queryset):
+        progress(0, queryset.count())
+        ...
+
+    enqueue(recalculate, priority=5, user=request.user, queryset=orders)
+
+Arguments are stored as JSON. A queryset argument is stored as the
+primary keys it matches, copied into JobTarget by one INSERT ... SELECT
+when the job is queued, and handed to the job as a queryset over those
+rows: nothing is unpickled from the database, and a job queued before a
+Django upgrade still runs after it.
+
+Workers claim the queued job with the highest priority whose run_after
+has passed with a conditional UPDATE, so no two workers run the same
+attempt, and hold a lease on it that a heartbeat thread keeps extending.
+The job of a worker that died is claimed again once its lease runs out.
+A heartbeat that cannot renew the lease in time (e.g. the database stays
+locked) gives the job up: its next progress report raises JobCancelled,
+before another worker may have claimed it.
+A failed attempt is retried after JOBS_RETRY_BACKOFF * 2 ** (attempt - 1)
+seconds (capped at JOBS_RETRY_BACKOFF_MAX) until max_attempts.
+
+progress(done, total=None) is written at most every
+JOBS_PROGRESS_INTERVAL seconds and shows in the admin. It raises
+JobCancelled once the job is cancelled or was taken over, so a long job
+stops at its next progress report.
+"""
+# Python modules
+import threading
+import time
+import traceback
+import uuid
+from datetime import timedelta
+
+# Django modules
+from django.apps import apps
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connections, router, transaction
+from django.db.models import F, Q, QuerySet, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+# Project modules
+from apps.abstracts.models import Job, JobTarget
+
+QUERYSET_KEY = "__queryset__"
+CLAIM_ATTEMPTS = 5
+
+# name -> function, filled by @job
+registry = {}
+
+
+class JobCancelled(Exception):
+    """The job was cancelled, or its lease was taken over, while it ran."""
+
+
+def name_of(func):
+    return f"{func.__module__}.{func.__qualname__}"
+
+
+def job(func):
+    """Register func as a job, under its dotted path."""
+    registry[name_of(func)] = func
+    return func
+
+
+def lookup(name):
+    """The registered job function of name; importing its module registers it."""
+    if name not in registry:
+        try:
+            import_string(name)
+        except ImportError:
+            pass
+    if name not in registry:
+        raise LookupError(f"{name} is not a registered job.")
+    return registry[name]
+
+
+# ----------------------------------------------
+# Arguments
+#
+def _store_targets(job, argument, queryset):
+    """Copy the pks queryset matches into JobTarget rows of job, in one statement."""
+    if queryset.model._meta.pk.get_internal_type() not in ("AutoField", "BigAutoField", "IntegerField", "BigIntegerField"):
+        raise TypeError(f"{queryset.model._meta.label} has no integer primary key, pass its rows some other way.")
+    # read on the database written to, not on a replica that may lag
+    using = router.db_for_write(JobTarget)
+    # annotations, values_list() would select the pk before bare expressions
+    rows = queryset.order_by().annotate(
+        target_job=Value(job.pk), target_argument=Value(argument), target_object=F("pk"),
+    ).values_list("target_job", "target_argument", "target_object")
+    sql, params = rows.query.get_compiler(using=using).as_sql()
+    connection = connections[using]
+    table = connection.ops.quote_name(JobTarget._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {table} (job_id, argument, object_id) {sql}", params)
+
+
+def load_queryset(job, argument, label):
+    model = apps.get_model(label)
+    manager = getattr(model, "all_objects", model._base_manager)
+    return manager.filter(pk__in=JobTarget.objects.filter(job=job, argument=argument).values("object_id"))
+
+
+def _load(job):
+    return {
+        key: load_queryset(job, key, value[QUERYSET_KEY]) if isinstance(value, dict) and QUERYSET_KEY in value else value
+        for key, value in job.kwargs.items()
+    }
+
+
+def enqueue(func, *, priority=0, max_attempts=None, run_after=None, user=None, **kwargs):
+    """Queue a run of the registered job func with kwargs, returns the Job."""
+    name = name_of(func)
+    if registry.get(name) is not func:
+        raise LookupError(f"{name} is not a registered job, decorate it with @job.")
+    querysets = {key: value for key, value in kwargs.items() if isinstance(value, QuerySet)}
+    with transaction.atomic(using=router.db_for_write(Job)):
+        queued = Job.objects.create(
+            name=name,
+            kwargs={
+                key: {QUERYSET_KEY: value.model._meta.label} if key in querysets else value
+                for key, value in kwargs.items()
+            },
+            priority=priority,
+            max_attempts=max_attempts or settings.JOBS_MAX_ATTEMPTS,
+            run_after=run_after or timezone.now(),
+            created_by=user if user is not None and user.is_authenticated else None,
+        )
+        for key, queryset in querysets.items():
+            _store_targets(queued, key, queryset)
+    return queued
+
+
+# ----------------------------------------------
+# Claim / run
+#
+def _claimable(now):
+    return Q(status=Job.STATUS_QUEUED, run_after__lte=now) | Q(status=Job.STATUS_RUNNING, claimed_until__lt=now)
+
+
+def claim(worker):
+    """Lease the next job to worker and return it, None if there is nothing to run."""
+    for _ in range(CLAIM_ATTEMPTS):
+        now = timezone.now()
+        pk = Job.objects.filter(_claimable(now)).order_by("-priority", "run_after", "pk").values_list("pk", flat=True).first()
+        if pk is None:
+            return None
+        token = f"{worker[:80]}:{uuid.uuid4().hex[:16]}"
+        # matches nothing if another worker took it since the read
+        claimed = Job.objects.filter(_claimable(now), pk=pk).update(
+            status=Job.STATUS_RUNNING,
+            claimed_by=token,
+            claimed_until=now + timedelta(seconds=settings.JOBS_LEASE_SECONDS),
+            attempts=F("attempts") + 1,
+            started_at=now,
+        )
+        if claimed:
+            return Job.objects.get(pk=pk)
+    return None
+
+
+def _leased(job):
+    return Job.objects.filter(pk=job.pk, status=Job.STATUS_RUNNING, claimed_by=job.claimed_by)
+
+
+class Heartbeat(threading.Thread):
+    """
+    Extends the lease of a running job until stop(). Sets lost when the
+    lease was taken over or could not be renewed before it ran out.
+    """
+
+    def __init__(self, job):
+        super().__init__(name=f"job-{job.pk}-heartbeat", daemon=True)
+        self.job = job
+        self.stopped = threading.Event()
+        self.lost = threading.Event()
+
+    def run(self):
+        lease = settings.JOBS_LEASE_SECONDS
+        # renew a third of the way in, keep a margin before it runs out
+        deadline = time.monotonic() + lease * 2 / 3
+        delay = lease / 3
+        try:
+            while not self.stopped.wait(delay):
+                try:
+                    renewed = _leased(self.job).update(claimed_until=timezone.now() + timedelta(seconds=lease))
+                except DatabaseError:
+                    # e.g. SQLite's "database is locked", try again soon
+                    if time.monotonic() >= deadline:
+                        self.lost.set()
+                        return
+                    delay = min(settings.JOBS_POLL_INTERVAL, max(0.0, deadline - time.monotonic()))
+                    continue
+                if not renewed:
+                    # cancelled, or claimed by another worker
+                    self.lost.set()
+                    return
+                deadline = time.monotonic() + lease * 2 / 3
+                delay = lease / 3
+        finally:
+            connections.close_all()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+class Progress:
+    """The progress callable handed to a job."""
+
+    def __init__(self, job, heartbeat):
+        self.job = job
+        self.heartbeat = heartbeat
+        self.written = 0.0
+
+    def __call__(self, done, total=None, force=False):
+        if self.heartbeat.lost.is_set():
+            raise JobCancelled(f"Job #{self.job.pk} lost its lease.")
+        if not force and time.monotonic() - self.written < settings.JOBS_PROGRESS_INTERVAL:
+            return
+        values = {"progress_done": done}
+        if total is not None:
+            values["progress_total"] = total
+        if not _leased(self.job).update(**values):
+            raise JobCancelled(f"Job #{self.job.pk} was cancelled or taken over.")
+        self.written = time.monotonic()
+
+
+def backoff(attempts):
+    return min(settings.JOBS_RETRY_BACKOFF * 2 ** max(0, attempts - 1), settings.JOBS_RETRY_BACKOFF_MAX)
+
+
+def run(job):
+    """Run a claimed job and record how it went, returns its new status."""
+    leased = _leased(job)
+    if job.attempts > job.max_attempts:
+        # the last attempt's worker died without recording anything
+        leased.update(status=Job.STATUS_FAILED, claimed_by=None, claimed_until=None, finished_at=timezone.now())
+        return Job.STATUS_FAILED
+    heartbeat = Heartbeat(job)
+    heartbeat.start()
+    try:
+        result = lookup(job.name)(Progress(job, heartbeat), **_load(job))
+    except JobCancelled:
+        return Job.STATUS_CANCELLED
+    except Exception:
+        error = traceback.format_exc()
+        if job.attempts < job.max_attempts:
+            status = Job.STATUS_QUEUED
+            leased.update(
+                status=status, error=error, claimed_by=None, claimed_until=None,
+                run_after=timezone.now() + timedelta(seconds=backoff(job.attempts)),
+            )
+        else:
+            status = Job.STATUS_FAILED
+            leased.update(status=status, error=error, claimed_by=None, claimed_until=None, finished_at=timezone.now())
+        return status
+    finally:
+        heartbeat.stop()
+    if heartbeat.lost.is_set():
+        # finished, but another worker may be running it by now
+        return Job.STATUS_CANCELLED
+    if leased.update(
+        status=Job.STATUS_DONE, result=result, error="", claimed_by=None, claimed_until=None,
+        # the last report may have been throttled
+        progress_done=Coalesce("progress_total", "progress_done"),
+        finished_at=timezone.now(),
+    ):
+        # done for good, a retry from the admin only applies to failed jobs
+        JobTarget.objects.filter(job=job).delete()
+    return Job.STATUS_DONE
+
+
+def work(worker, once=False, stopping=None, log=None):
+    """Claim and run jobs until stopping is set, or the queue is empty with once."""
+    while stopping is None or not stopping.is_set():
+        close_old_connections()
+        job = claim(worker)
+        if job is None:
+            if once:
+                return
+            time.sleep(settings.JOBS_POLL_INTERVAL)
+            continue
+        started = time.monotonic()
+        status = run(job)
+        if log:
+            log(f"{worker}: job #{job.pk} {job.name} attempt {job.attempts}: {status} in {time.monotonic() - started:.1f}s")
+
+
+# ----------------------------------------------
+# Admin actions
+#
+def pk_chunks(queryset, size):
+    """Lists of up to size primary keys of queryset, in order, by keyset."""
+    last = None
+    while True:
+        chunk = queryset.order_by("pk")
+        if last is not None:
+            chunk = chunk.filter(pk__gt=last)
+        pks = list(chunk.values_list("pk", flat=True)[:size])
+        if not pks:
+            return
+        yield pks
+        last = pks[-1]
+
+
+def _in_chunks(progress, queryset, apply):
+    total = queryset.count()
+    progress(0, total, force=True)
+    done = 0
+    for pks in pk_chunks(queryset, settings.JOBS_CHUNK_SIZE):
+        apply(queryset.model.all_objects.filter(pk__in=pks))
+        done += len(pks)
+        progress(done, total)
+    return {"rows": done}
+
+
+@job
+def soft_delete_rows(progress, queryset):
+    # one timestamp for every chunk, so a restore brings them back together
+    deleted_at = timezone.now()
+    return _in_chunks(progress, queryset, lambda chunk: chunk.soft_delete(deleted_at))
+
+
+@job
+def restore_rows(progress, queryset):
+    return _in_chunks(progress, queryset, lambda chunk: chunk.restore())
+
+
+@job
+def hard_delete_rows(progress, queryset):
+    return _in_chunks(progress, queryset, lambda chunk: chunk.hard_delete())
+
+
+def in_background(modeladmin, request, queryset, func, **kwargs):
+    """
+    Queue func for a queryset above JOBS_ADMIN_THRESHOLD rows and tell
+    the admin user, returns the Job, or None when the action should run
+    inline.
+    """
+    threshold = settings.JOBS_ADMIN_THRESHOLD
+    # bounded count, the queryset may span millions of rows
+    if queryset[:threshold + 1].count() <= threshold:
+        return None
+    queued = enqueue(func, user=request.user, queryset=queryset, **kwargs)
+    modeladmin.message_user(
+        request,
+        f"More than {threshold} rows: queued as job #{queued.pk}, follow it under Jobs.",
+    )
+    return queued
@@ -0,0 +1,58 @@
+"""
+Admin of the background jobs, registered from AbstractsConfig.ready()
+because admin.py is imported by models.py.
+"""
+# Django modules
+from django.contrib import admin
+from django.utils import timezone
+from django.utils.html import format_html
+
+# Project modules
+from apps.abstracts.admin import LargeTableAdminMixin
+from apps.abstracts.models import Job
+
+
+@admin.action(description="Retry selected failed or cancelled jobs", permissions=["change"])
+def retry(modeladmin, request, queryset):
+    count = queryset.filter(status__in=[Job.STATUS_FAILED, Job.STATUS_CANCELLED]).update(
+        status=Job.STATUS_QUEUED, attempts=0, run_after=timezone.now(), progress_done=0, finished_at=None,
+    )
+    modeladmin.message_user(request, f"{count} jobs queued again.")
+
+
+@admin.action(description="Cancel selected queued or running jobs", permissions=["change"])
+def cancel(modeladmin, request, queryset):
+    # a running job stops at its next progress report
+    count = queryset.filter(status__in=[Job.STATUS_QUEUED, Job.STATUS_RUNNING]).update(
+        status=Job.STATUS_CANCELLED, claimed_by=None, claimed_until=None, finished_at=timezone.now(),
+    )
+    modeladmin.message_user(request, f"{count} jobs cancelled.")
+
+
+@admin.register(Job)
+class JobAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    list_display = ("id", "name", "status", "priority", "progress", "attempts", "created_by", "created_at", "started_at", "finished_at")
+    list_filter = ("status", "name")
+    search_fields = ("name",)
+    actions = [retry, cancel]
+    # the form only shows a job, change permission is for the actions
+    readonly_fields = [field.name for field in Job._meta.fields if field.name != "error"] + ["progress", "error_trace"]
+    exclude = ("error",)
+    ordering = ("-pk",)
+
+    def has_add_permission(self, request):
+        # jobs are queued by code, apps.abstracts.jobs.enqueue()
+        return False
+
+    @admin.display(description="Progress")
+    def progress(self, obj):
+        if obj.progress_percent is None:
+            return obj.progress_done or "-"
+        return format_html(
+            '<progress value="{}" max="{}"></progress> {}/{} ({}%)',
+            obj.progress_done, obj.progress_total, obj.progress_done, obj.progress_total, f"{obj.progress_percent:.0f}",
+        )
+
+    @admin.display(description="Error")
+    def error_trace(self, obj):
+        return format_html('<pre style="white-space: pre-wrap">{}</pre>', obj.error) if obj.error else "-"
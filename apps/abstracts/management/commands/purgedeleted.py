@@ -0,0 +1,57 @@
+from datetime import timedelta
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import router
+from django.utils import timezone
+
+from apps.abstracts.archive import purge, purgeable, soft_deletable_models
+
+
+class Command(BaseCommand):
+    help = "Move rows soft deleted more than N days ago to archive tables and delete them."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=90, help="Only purge rows deleted more than this many days ago.")
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--sleep", type=float, default=0.0, help="Seconds to pause between batches.")
+        parser.add_argument("--max-seconds", type=float, default=None, help="Stop after this many seconds, the next run resumes.")
+        parser.add_argument("--model", action="append", default=[], help="Limit to app_label.Model, can be repeated.")
+        parser.add_argument("--database", default=None)
+        parser.add_argument("--dry-run", action="store_true", help="Only count rows that are purgeable right now.")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options["days"])
+        try:
+            models = [apps.get_model(label) for label in options["model"]]
+        except (LookupError, ValueError) as exc:
+            raise CommandError(exc)
+
+        if options["dry_run"]:
+            for model in soft_deletable_models():
+                if models and model not in models:
+                    continue
+                count = purgeable(model, cutoff, options["database"] or router.db_for_write(model)).count()
+                self.stdout.write(f"{model._meta.label}: {count} rows")
+            return
+
+        reports = purge(
+            cutoff,
+            models=models,
+            batch_size=options["batch_size"],
+            sleep=options["sleep"],
+            max_seconds=options["max_seconds"],
+            using=options["database"],
+        )
+        total, report = 0, None
+        for report in reports:
+            if report.finished:
+                total += report.rows
+                self.stdout.write(str(report))
+            elif options["verbosity"] > 1:
+                self.stdout.write(f"  {report}")
+        if report is not None and not report.finished:
+            total += report.rows
+            self.stdout.write(f"{report} (time budget reached)")
+
+        self.stdout.write(self.style.SUCCESS(f"Archived and purged {total} rows deleted before {cutoff:%Y-%m-%d}."))
@@ -0,0 +1,99 @@
+import multiprocessing
+import os
+import signal
+import socket
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections
+
+from apps.abstracts import jobs
+
+
+def writer(out):
+    """A line writer on the command's stdout / stderr, flushed: workers share it."""
+
+    def write(line):
+        out.write(f"{time.strftime('%H:%M:%S')} {line}")
+        out.flush()
+
+    return write
+
+
+def run_worker(worker, once, stopping, verbosity, stdout, stderr):
+    # ctrl-c reaches the whole process group, the parent decides when to stop
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    log = writer(stdout) if verbosity else None
+    warn = writer(stderr)
+    while not stopping.is_set():
+        try:
+            jobs.work(worker, once=once, stopping=stopping, log=log)
+            return
+        except OperationalError as exc:
+            # e.g. SQLite's "database is locked" under other writers, a lost
+            # lease runs out by itself and the job is claimed again
+            warn(f"{worker}: {exc}, retrying")
+            time.sleep(settings.JOBS_POLL_INTERVAL)
+        finally:
+            connections.close_all()
+
+
+class Command(BaseCommand):
+    help = (
+        "Run background jobs (apps.abstracts.jobs) in --processes worker processes. "
+        "SIGTERM or ctrl-c lets running jobs finish, a second one stops at once."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--processes", type=int, default=settings.JOBS_PROCESSES)
+        parser.add_argument("--worker", default=f"{socket.gethostname()}-{os.getpid()}", help="Worker name, in the claim tokens.")
+        parser.add_argument("--once", action="store_true", help="Exit once the queue is empty instead of waiting.")
+
+    def handle(self, *args, **options):
+        context = multiprocessing.get_context("fork")
+        stopping = context.Event()
+        once, verbosity = options["once"], options["verbosity"]
+
+        def stop(signum, frame):
+            if stopping.is_set():
+                raise KeyboardInterrupt
+            self.stdout.write("Stopping after the running jobs, signal again to stop now.")
+            stopping.set()
+
+        signal.signal(signal.SIGINT, stop)
+        signal.signal(signal.SIGTERM, stop)
+
+        def start(index):
+            # not daemonic, a job may start a multiprocessing pool of its own
+            process = context.Process(
+                target=run_worker,
+                args=(f"{options['worker']}-{index}", once, stopping, verbosity, self.stdout, self.stderr),
+                name=f"jobs-worker-{index}",
+            )
+            process.start()
+            return process
+
+        # children must not inherit the parent's connections
+        connections.close_all()
+        processes = {index: start(index) for index in range(options["processes"])}
+        self.stdout.write(f"{len(processes)} workers started.")
+        try:
+            while processes:
+                for index, process in list(processes.items()):
+                    process.join(timeout=0.2)
+                    if process.is_alive():
+                        continue
+                    del processes[index]
+                    if process.exitcode and not stopping.is_set():
+                        # crashed mid-job: its lease runs out and the job is claimed again
+                        self.stderr.write(f"Worker {index} exited with {process.exitcode}, restarting it.")
+                        processes[index] = start(index)
+        except KeyboardInterrupt:
+            for process in processes.values():
+                process.terminate()
+            for process in processes.values():
+                process.join()
+            raise
+        self.stdout.write(self.style.SUCCESS("Workers stopped."))
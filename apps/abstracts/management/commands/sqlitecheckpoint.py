@@ -0,0 +1,42 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+MODES = ("PASSIVE", "FULL", "RESTART", "TRUNCATE")
+
+
+class Command(BaseCommand):
+    help = (
+        "Checkpoint the SQLite write-ahead log into the database file, once or every N seconds. "
+        "Run it next to the web workers so the WAL does not grow while readers keep it busy."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--mode", choices=MODES, default="PASSIVE", type=str.upper,
+                            help="PASSIVE never blocks, TRUNCATE also shrinks the WAL file to zero.")
+        parser.add_argument("--every", type=float, nargs="?", const=settings.SQLITE_CHECKPOINT_INTERVAL, default=None,
+                            help="Repeat every N seconds (SQLITE_CHECKPOINT_INTERVAL if no value is given).")
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        connection = connections[options["database"]]
+        if connection.vendor != "sqlite":
+            raise CommandError(f"Database {options['database']!r} is not SQLite.")
+
+        while True:
+            with connection.cursor() as cursor:
+                cursor.execute(f"PRAGMA wal_checkpoint({options['mode']})")
+                busy, wal_pages, checkpointed = cursor.fetchone()
+            if wal_pages == -1:
+                raise CommandError("The database is not in WAL mode.")
+            self.stdout.write(
+                f"{time.strftime('%H:%M:%S')} checkpointed {checkpointed}/{wal_pages} WAL pages"
+                f"{' (blocked by readers or writers)' if busy else ''}"
+            )
+            if options["every"] is None:
+                return
+            # do not keep the connection open between runs
+            connection.close()
+            time.sleep(options["every"])
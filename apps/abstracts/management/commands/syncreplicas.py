@@ -0,0 +1,49 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from apps.abstracts.routers import replicas
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy the primary SQLite database onto the replica files (DB_REPLICAS) with the online backup API, "
+        "once or every N seconds."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--every", type=float, nargs="?", const=settings.REPLICA_SYNC_INTERVAL, default=None,
+                            help="Repeat every N seconds (REPLICA_SYNC_INTERVAL if no value is given).")
+
+    def handle(self, *args, **options):
+        primary = connections[DEFAULT_DB_ALIAS]
+        aliases = replicas()
+        if primary.vendor != "sqlite":
+            raise CommandError("syncreplicas only copies SQLite databases, use the replication of your server.")
+        if not aliases:
+            raise CommandError("No replicas are configured, set DB_REPLICAS.")
+
+        while True:
+            started = time.perf_counter()
+            # one snapshot of the primary for every replica
+            source = sqlite3.connect(primary.settings_dict["NAME"])
+            try:
+                source.execute("BEGIN")
+                for alias in aliases:
+                    target = sqlite3.connect(connections[alias].settings_dict["NAME"])
+                    try:
+                        source.backup(target)
+                    finally:
+                        target.close()
+            finally:
+                source.close()
+            self.stdout.write(
+                f"{time.strftime('%H:%M:%S')} synced {', '.join(aliases)} "
+                f"in {(time.perf_counter() - started) * 1000:.0f} ms"
+            )
+            if options["every"] is None:
+                return
+            time.sleep(options["every"])
@@ -0,0 +1,55 @@
+# Django modules
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.utils.decorators import sync_and_async_middleware
+
+# Project modules
+from apps.abstracts import routers
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+@sync_and_async_middleware
+def replica_pin_middleware(get_response):
+    """
+    Give every request its own replica pin (see apps.abstracts.routers).
+
+    Unsafe methods and clients holding the REPLICA_PIN_COOKIE read from the
+    primary; a request that writes sets the cookie for REPLICA_PIN_SECONDS,
+    so the pages it redirects to do not read from a lagging replica.
+    """
+
+    def begin(request):
+        pinned = request.method not in SAFE_METHODS or settings.REPLICA_PIN_COOKIE in request.COOKIES
+        return routers.new_state(pinned=pinned)
+
+    def finish(token, response):
+        if routers.reset_state(token) and routers.replicas():
+            response.set_cookie(
+                settings.REPLICA_PIN_COOKIE, "1", max_age=settings.REPLICA_PIN_SECONDS, httponly=True, samesite="Lax",
+            )
+        return response
+
+    if iscoroutinefunction(get_response):
+
+        async def middleware(request):
+            token = begin(request)
+            try:
+                response = await get_response(request)
+            except BaseException:
+                routers.reset_state(token)
+                raise
+            return finish(token, response)
+
+    else:
+
+        def middleware(request):
+            token = begin(request)
+            try:
+                response = get_response(request)
+            except BaseException:
+                routers.reset_state(token)
+                raise
+            return finish(token, response)
+
+    return middleware
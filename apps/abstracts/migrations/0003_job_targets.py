@@ -0,0 +1,26 @@
+# Generated by Django 5.0 on 2026-10-18 13:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('abstracts', '0002_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobTarget',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('argument', models.CharField(max_length=50)),
+                ('object_id', models.BigIntegerField()),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='targets', to='abstracts.job')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['job', 'argument', 'object_id'], name='abstracts_jobtarget_idx')],
+            },
+        ),
+    ]
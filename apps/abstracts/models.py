@@ -1,6 +1,23 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db.models import (
     Model,
+    BooleanField,
+    BigIntegerField,
+    CharField,
     DateTimeField,
+    FloatField,
+    ForeignKey,
+    Index,
+    JSONField,
+    PositiveIntegerField,
+    PositiveSmallIntegerField,
+    SmallIntegerField,
+    TextField,
+    Q,
+    CASCADE,
+    SET_NULL,
 )
 from django.utils import timezone
 from .admin import SoftDeleteManager
@@ -17,20 +34,22 @@ class AbstractSoftDeletableModel(Model):
 
     objects = SoftDeleteManager()
     # separate manager that returns all (including deleted)
-    all_objects = SoftDeleteManager()
+    all_objects = SoftDeleteManager(alive_only=False)
 
     class Meta:
         abstract = True
 
     def soft_delete(self):
-        """Mark record as deleted."""
-        self.deleted_at = timezone.now()
-        self.save(update_fields=["deleted_at"])
+        """Mark record and its dependent records as deleted."""
+        deleted_at = timezone.now()
+        total, _ = type(self).all_objects.filter(pk=self.pk).soft_delete(deleted_at)
+        if total:
+            self.deleted_at = deleted_at
 
     def restore(self):
-        """Restore a soft-deleted record."""
+        """Restore a soft-deleted record and the records deleted with it."""
+        type(self).all_objects.filter(pk=self.pk).restore()
         self.deleted_at = None
-        self.save(update_fields=["deleted_at"])
 
     def hard_delete(self):
         """Permanently delete from DB."""
@@ -39,3 +58,151 @@ class AbstractSoftDeletableModel(Model):
     # override delete() to soft-delete by default
     def delete(self, using=None, keep_parents=False):
         self.soft_delete()
+
+    async def asoft_delete(self):
+        await sync_to_async(self.soft_delete)()
+
+    async def arestore(self):
+        await sync_to_async(self.restore)()
+
+    async def ahard_delete(self):
+        await sync_to_async(self.hard_delete)()
+
+
+class ProfilerConfig(Model):
+    """
+    Runtime switch of the sampling profiler (apps.abstracts.profiling),
+    one row edited in the admin. Workers re-read it every
+    PROFILER_CONFIG_TTL seconds, no restart needed.
+    """
+
+    enabled = BooleanField(default=False)
+    # share of the matching requests to profile
+    sample_percent = FloatField(
+        default=1.0,
+        validators=[MinValueValidator(0), MaxValueValidator(100)],
+    )
+    path_prefix = CharField(
+        max_length=200,
+        blank=True,
+        help_text="Only profile requests under this path, e.g. /api/catalogs/.",
+    )
+    interval_ms = PositiveIntegerField(
+        default=5,
+        validators=[MinValueValidator(1)],
+        help_text="Time between two stack samples.",
+    )
+    updated_at = DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "profiler config"
+
+    def __str__(self):
+        state = f"{self.sample_percent:g}% of {self.path_prefix or '/'}" if self.enabled else "off"
+        return f"Profiler: {state}"
+
+
+class CapturedProfile(Model):
+    """One profiled request, its collapsed stacks are in PROFILER_DIR."""
+
+    TRIGGER_HEADER = "header"
+    TRIGGER_SAMPLED = "sampled"
+    TRIGGER_CHOICES = (
+        (TRIGGER_HEADER, "Signed header"),
+        (TRIGGER_SAMPLED, "Sampled"),
+    )
+
+    created_at = DateTimeField(auto_now_add=True, db_index=True)
+    method = CharField(max_length=10)
+    path = CharField(max_length=2048)
+    status = PositiveSmallIntegerField(null=True)
+    duration_ms = FloatField()
+    samples = PositiveIntegerField()
+    trigger = CharField(max_length=10, choices=TRIGGER_CHOICES)
+    filename = CharField(max_length=255)
+
+    class Meta:
+        ordering = ("-created_at",)
+
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.duration_ms:.0f} ms)"
+
+
+class Job(Model):
+    """
+    Background job run by `manage.py runworkers` (apps.abstracts.jobs):
+    a registered function, its keyword arguments, and where it stands.
+    """
+
+    STATUS_QUEUED = "queued"
+    STATUS_RUNNING = "running"
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+    STATUS_CANCELLED = "cancelled"
+    STATUS_CHOICES = (
+        (STATUS_QUEUED, "Queued"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_DONE, "Done"),
+        (STATUS_FAILED, "Failed"),
+        (STATUS_CANCELLED, "Cancelled"),
+    )
+
+    name = CharField(max_length=200)
+    kwargs = JSONField(default=dict, blank=True)
+    # higher runs first
+    priority = SmallIntegerField(default=0)
+    status = CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    attempts = PositiveSmallIntegerField(default=0)
+    max_attempts = PositiveSmallIntegerField(default=3)
+    # not before, pushed back after a failed attempt
+    run_after = DateTimeField(default=timezone.now)
+    # lease of the running attempt, kept alive by the worker
+    claimed_by = CharField(max_length=100, null=True, blank=True)
+    claimed_until = DateTimeField(null=True, blank=True)
+    progress_done = PositiveIntegerField(default=0)
+    progress_total = PositiveIntegerField(null=True, blank=True)
+    result = JSONField(null=True, blank=True)
+    error = TextField(blank=True)
+    created_by = ForeignKey(to=settings.AUTH_USER_MODEL, on_delete=SET_NULL, null=True, blank=True, related_name="+")
+    created_at = DateTimeField(auto_now_add=True, db_index=True)
+    started_at = DateTimeField(null=True, blank=True)
+    finished_at = DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ("-created_at",)
+        indexes = [
+            # the queue, finished jobs left out
+            Index(
+                fields=["-priority", "run_after", "id"],
+                condition=Q(status__in=["queued", "running"]),
+                name="abstracts_job_queue_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"#{self.pk} {self.name} ({self.status})"
+
+    @property
+    def progress_percent(self):
+        if not self.progress_total:
+            return None
+        return min(100.0, 100.0 * self.progress_done / self.progress_total)
+
+
+class JobTarget(Model):
+    """
+    Primary key of a row a job works on: the rows of a queryset argument
+    as they matched at enqueue time (apps.abstracts.jobs).
+    """
+
+    job = ForeignKey(to=Job, on_delete=CASCADE, related_name="targets")
+    argument = CharField(max_length=50)
+    object_id = BigIntegerField()
+
+    class Meta:
+        indexes = [
+            Index(fields=["job", "argument", "object_id"], name="abstracts_jobtarget_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.argument}={self.object_id} of job #{self.job_id}"
@@ -0,0 +1,248 @@
+"""
+On-demand sampling profiler.
+
+profiler_middleware profiles a request when it carries a valid signed
+X-Profile header (admin: profiler config, "Profile header"), or when the
+ProfilerConfig row is enabled and the request falls in its sample.
+Workers re-read the row every PROFILER_CONFIG_TTL seconds, so both
+switches work on running settings/wsgi.py and settings/asgi.py processes.
+
+A profiled request gets a Sampler thread that records the stack of the
+request thread every interval_ms. Under ASGI the view may run on the
+event loop or in a sync_to_async() thread, so every thread is sampled
+and stacks start with the thread name; the other requests served
+meanwhile show up too. The stacks are written to PROFILER_DIR in the
+collapsed format of flamegraph.pl and speedscope ("a;b;c 12" per line)
+and listed in the admin as CapturedProfile rows. Every save() prunes the
+profiles older than PROFILER_MAX_AGE_DAYS or beyond the newest
+PROFILER_MAX_PROFILES, rows and files, so PROFILER_DIR stays bounded.
+"""
+# Python modules
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import timedelta
+
+# Django modules
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import MiddlewareNotUsed
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.decorators import sync_and_async_middleware
+
+# Project modules
+from apps.abstracts.models import CapturedProfile, ProfilerConfig
+
+HEADER = "X-Profile"
+SIGNING_SALT = "apps.abstracts.profiling"
+SIGNED_VALUE = "profile"
+
+# (ProfilerConfig or None, monotonic time to re-read it)
+_config = (None, 0.0)
+_labels = {}
+
+
+def make_token():
+    """A value for the X-Profile header, valid for PROFILER_TOKEN_MAX_AGE seconds."""
+    return signing.TimestampSigner(salt=SIGNING_SALT).sign(SIGNED_VALUE)
+
+
+def token_is_valid(token):
+    try:
+        value = signing.TimestampSigner(salt=SIGNING_SALT).unsign(token, max_age=settings.PROFILER_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return False
+    return value == SIGNED_VALUE
+
+
+def get_config():
+    global _config
+    config, expires = _config
+    if time.monotonic() >= expires:
+        config = ProfilerConfig.objects.first()
+        _config = (config, time.monotonic() + settings.PROFILER_CONFIG_TTL)
+    return config
+
+
+async def aget_config():
+    global _config
+    config, expires = _config
+    if time.monotonic() >= expires:
+        config = await ProfilerConfig.objects.afirst()
+        _config = (config, time.monotonic() + settings.PROFILER_CONFIG_TTL)
+    return config
+
+
+def _trigger(request, config):
+    token = request.headers.get(HEADER)
+    if token and token_is_valid(token):
+        return CapturedProfile.TRIGGER_HEADER
+    if (
+        config is not None
+        and config.enabled
+        and request.path.startswith(config.path_prefix)
+        and random.random() * 100 < config.sample_percent
+    ):
+        return CapturedProfile.TRIGGER_SAMPLED
+    return None
+
+
+def _label(code):
+    label = _labels.get(code)
+    if label is None:
+        filename = code.co_filename
+        for prefix in sorted(sys.path, key=len, reverse=True):
+            if prefix and filename.startswith(prefix):
+                filename = filename[len(prefix):].lstrip(os.sep)
+                break
+        # ";" separates the frames in the collapsed format
+        label = f"{code.co_name} ({filename}:{code.co_firstlineno})".replace(";", ":")
+        _labels[code] = label
+    return label
+
+
+def collapse(frame):
+    """The stack of frame, outermost first, as "a;b;c"."""
+    labels = []
+    while frame is not None:
+        labels.append(_label(frame.f_code))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+class Sampler(threading.Thread):
+    """Counts the stacks of one thread (or of every thread) until stop()."""
+
+    def __init__(self, interval, thread_id=None):
+        super().__init__(name="profiler-sampler", daemon=True)
+        self.interval = interval
+        self.thread_id = thread_id
+        self.stacks = Counter()
+        self.samples = 0
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frames = sys._current_frames()
+            self.samples += 1
+            if self.thread_id is not None:
+                frame = frames.get(self.thread_id)
+                if frame is not None:
+                    self.stacks[collapse(frame)] += 1
+                continue
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in frames.items():
+                if ident != self.ident:
+                    name = str(names.get(ident, ident)).replace(";", ":")
+                    self.stacks[f"{name};{collapse(frame)}"] += 1
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+def prune():
+    """
+    Delete the profiles past PROFILER_MAX_AGE_DAYS or beyond the newest
+    PROFILER_MAX_PROFILES (0 keeps them), rows and files. Returns the
+    number deleted.
+    """
+    expired = Q()
+    if settings.PROFILER_MAX_AGE_DAYS:
+        expired |= Q(created_at__lt=timezone.now() - timedelta(days=settings.PROFILER_MAX_AGE_DAYS))
+    if settings.PROFILER_MAX_PROFILES:
+        # pks grow with created_at: the newest beyond the limit and older
+        newest_extra = (
+            CapturedProfile.objects.order_by("-pk")
+            .values_list("pk", flat=True)[settings.PROFILER_MAX_PROFILES:settings.PROFILER_MAX_PROFILES + 1]
+            .first()
+        )
+        if newest_extra is not None:
+            expired |= Q(pk__lte=newest_extra)
+    if not expired:
+        return 0
+    stale = dict(CapturedProfile.objects.filter(expired).values_list("pk", "filename"))
+    if not stale:
+        return 0
+    CapturedProfile.objects.filter(pk__in=stale).delete()
+    for filename in stale.values():
+        try:
+            os.remove(os.path.join(settings.PROFILER_DIR, filename))
+        except FileNotFoundError:
+            pass
+    return len(stale)
+
+
+def save(request, response, sampler, trigger, duration):
+    """Write the collapsed stacks and record them, returns the CapturedProfile."""
+    os.makedirs(settings.PROFILER_DIR, exist_ok=True)
+    filename = f"{timezone.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:8]}.collapsed"
+    with open(os.path.join(settings.PROFILER_DIR, filename), "w") as file:
+        for stack, count in sampler.stacks.most_common():
+            file.write(f"{stack} {count}\n")
+    profile = CapturedProfile.objects.create(
+        method=request.method,
+        path=request.path[:2048],
+        status=getattr(response, "status_code", None),
+        duration_ms=duration * 1000,
+        samples=sampler.samples,
+        trigger=trigger,
+        filename=filename,
+    )
+    prune()
+    return profile
+
+
+def _interval(config):
+    return (config.interval_ms if config is not None else settings.PROFILER_INTERVAL_MS) / 1000
+
+
+@sync_and_async_middleware
+def profiler_middleware(get_response):
+    """Profile the requests picked by _trigger(), see the module docstring."""
+    if not settings.PROFILER_ENABLED:
+        raise MiddlewareNotUsed
+
+    if iscoroutinefunction(get_response):
+
+        async def middleware(request):
+            config = await aget_config()
+            trigger = _trigger(request, config)
+            if trigger is None:
+                return await get_response(request)
+            sampler = Sampler(_interval(config))
+            started = time.perf_counter()
+            sampler.start()
+            try:
+                response = await get_response(request)
+            finally:
+                sampler.stop()
+            profile = await sync_to_async(save)(request, response, sampler, trigger, time.perf_counter() - started)
+            response.headers["X-Profile-Id"] = str(profile.pk)
+            return response
+
+    else:
+
+        def middleware(request):
+            config = get_config()
+            trigger = _trigger(request, config)
+            if trigger is None:
+                return get_response(request)
+            sampler = Sampler(_interval(config), threading.get_ident())
+            started = time.perf_counter()
+            sampler.start()
+            try:
+                response = get_response(request)
+            finally:
+                sampler.stop()
+            profile = save(request, response, sampler, trigger, time.perf_counter() - started)
+            response.headers["X-Profile-Id"] = str(profile.pk)
+            return response
+
+    return middleware
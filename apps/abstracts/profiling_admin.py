@@ -0,0 +1,99 @@
+"""
+Admin of the sampling profiler, registered from AbstractsConfig.ready()
+because admin.py is imported by models.py.
+"""
+# Python modules
+import os
+from itertools import islice
+
+# Django modules
+from django.conf import settings
+from django.contrib import admin
+from django.http import FileResponse, Http404
+from django.urls import path, reverse
+from django.utils.html import format_html
+
+# Project modules
+from apps.abstracts import profiling
+from apps.abstracts.models import CapturedProfile, ProfilerConfig
+
+TOP_STACKS = 20
+
+
+@admin.register(ProfilerConfig)
+class ProfilerConfigAdmin(admin.ModelAdmin):
+    list_display = ("__str__", "enabled", "sample_percent", "path_prefix", "interval_ms", "updated_at")
+    list_editable = ("enabled", "sample_percent", "path_prefix", "interval_ms")
+    readonly_fields = ("profile_header",)
+
+    @admin.display(description="Profile header")
+    def profile_header(self, obj):
+        # any request sent with it is profiled, for PROFILER_TOKEN_MAX_AGE seconds
+        return f"{profiling.HEADER}: {profiling.make_token()}"
+
+    def has_add_permission(self, request):
+        # a single row
+        return not ProfilerConfig.objects.exists()
+
+
+@admin.register(CapturedProfile)
+class CapturedProfileAdmin(admin.ModelAdmin):
+    list_display = ("created_at", "method", "path", "status", "duration_ms", "samples", "trigger", "download")
+    list_filter = ("trigger", "method")
+    search_fields = ("path",)
+    readonly_fields = [field.name for field in CapturedProfile._meta.fields] + ["download", "top_stacks"]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_urls(self):
+        info = self.model._meta.app_label, self.model._meta.model_name
+        return [
+            path(
+                "<int:pk>/download/",
+                self.admin_site.admin_view(self.download_view),
+                name="%s_%s_download" % info,
+            ),
+        ] + super().get_urls()
+
+    def _path(self, profile):
+        return os.path.join(settings.PROFILER_DIR, os.path.basename(profile.filename))
+
+    def download_view(self, request, pk):
+        profile = self.get_object(request, pk)
+        if profile is None or not self.has_view_permission(request, profile) or not os.path.exists(self._path(profile)):
+            raise Http404
+        return FileResponse(open(self._path(profile), "rb"), as_attachment=True, filename=profile.filename)
+
+    @admin.display(description="Collapsed stacks")
+    def download(self, obj):
+        url = reverse("admin:%s_%s_download" % (obj._meta.app_label, obj._meta.model_name), args=[obj.pk])
+        return format_html('<a href="{}">{}</a>', url, obj.filename)
+
+    @admin.display(description="Top stacks")
+    def top_stacks(self, obj):
+        if not os.path.exists(self._path(obj)):
+            return "The file is gone."
+        with open(self._path(obj)) as file:
+            lines = [line.rstrip("\n") for line in islice(file, TOP_STACKS)]
+        # innermost frames are the interesting end
+        return format_html(
+            '<pre style="white-space: pre-wrap">{}</pre>',
+            "\n".join(f"{line.rpartition(' ')[2]:>6}  {line.rpartition(' ')[0].split(';')[-1]}" for line in lines),
+        )
+
+    def _remove_files(self, profiles):
+        for profile in profiles:
+            if os.path.exists(self._path(profile)):
+                os.remove(self._path(profile))
+
+    def delete_model(self, request, obj):
+        self._remove_files([obj])
+        super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        self._remove_files(queryset)
+        super().delete_queryset(request, queryset)
@@ -0,0 +1,107 @@
+"""
+Read replicas behind the default (primary) database.
+
+ReplicaRouter sends reads of settings.REPLICA_APPS models to a random
+alias of settings.DATABASE_REPLICAS; writes, reads inside a transaction
+on the primary and everything else stay on default.
+
+A context that writes is pinned to the primary, so its later reads see
+its own writes. ReplicaPinMiddleware gives every request its own context
+and keeps the client pinned for REPLICA_PIN_SECONDS after a write, which
+covers the replica lag (`manage.py syncreplicas --every`) right after
+checkout. Outside requests (commands, workers) the pin lasts for the
+rest of the thread; use_primary() pins a block explicitly.
+"""
+# Python modules
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Django modules
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# a dict, so the sync_to_async() threads of a request share it
+_state = ContextVar("replica_state", default=None)
+
+
+def replicas():
+    # local settings may replace DATABASES without the replicas
+    return [alias for alias in settings.DATABASE_REPLICAS if alias in settings.DATABASES]
+
+
+def new_state(pinned=False):
+    """Start a fresh pin state for the current context, returns the reset token."""
+    return _state.set({"pinned": pinned, "wrote": False})
+
+
+def reset_state(token):
+    """End the state started by new_state(), returns whether it wrote."""
+    wrote = _state.get()["wrote"]
+    _state.reset(token)
+    return wrote
+
+
+def is_pinned():
+    state = _state.get()
+    return state is not None and state["pinned"]
+
+
+def pin(wrote=False):
+    state = _state.get()
+    if state is None:
+        new_state()
+        state = _state.get()
+    state["pinned"] = True
+    state["wrote"] = state["wrote"] or wrote
+
+
+@contextmanager
+def use_primary():
+    """Read everything from the primary inside the block."""
+    state = _state.get()
+    if state is None:
+        token = new_state(pinned=True)
+        try:
+            yield
+        finally:
+            _state.reset(token)
+        return
+    pinned = state["pinned"]
+    state["pinned"] = True
+    try:
+        yield
+    finally:
+        # a write inside the block keeps the pin
+        state["pinned"] = pinned or state["wrote"]
+
+
+class ReplicaRouter:
+    def _replicated(self, model):
+        return model._meta.app_label in settings.REPLICA_APPS
+
+    def db_for_read(self, model, **hints):
+        if not self._replicated(model) or is_pinned():
+            return None
+        aliases = replicas()
+        if not aliases or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            # select_for_update() and read-then-write blocks need the primary
+            return None
+        return random.choice(aliases)
+
+    def db_for_write(self, model, **hints):
+        if self._replicated(model):
+            pin(wrote=True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            # replicas are copies of the primary file
+            return False
+        return None
@@ -0,0 +1,7 @@
+from django.dispatch import Signal
+
+# Sent by SoftDeleteQuerySet for every model a cascade touched,
+# with sender=model and pks=list of affected primary keys, once per
+# SIGNAL_CHUNK_SIZE (apps.abstracts.admin) pks.
+soft_deleted = Signal()
+restored = Signal()
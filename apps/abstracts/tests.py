@@ -1,3 +1,212 @@
-from django.test import TestCase
+# Python modules
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+# Django modules
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError, connection
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+# Project modules
+from apps.abstracts import jobs
+from apps.abstracts.archive import archive_table_name, purge, soft_deletable_models
+from apps.abstracts.instrumentation import query_budget
+from apps.abstracts.models import Job, JobTarget
+from apps.catalogs.models import Restaurant, MenuItem
+from apps.commerces import datagen, rollups
+from apps.commerces.models import Order, OrderItem, RestaurantDailySales, MenuItemDailySales
+
+
+@jobs.job
+def count_rows(progress, queryset, step=1):
+    total = queryset.count()
+    progress(0, total, force=True)
+    return {"rows": total, "step": step}
+
+
+@jobs.job
+def fail(progress):
+    raise RuntimeError("boom")
+
+
+class QueryBudgetTests(TestCase):
+    def test_within_budget(self):
+        with query_budget(2) as recorder:
+            list(Restaurant.objects.all())
+        self.assertEqual(len(recorder.queries), 1)
+
+    def test_over_budget(self):
+        with self.assertRaisesMessage(AssertionError, "Query budget of 1 exceeded"):
+            with query_budget(1):
+                list(Restaurant.objects.all())
+                list(MenuItem.objects.all())
+
+    def test_n_plus_one(self):
+        user = get_user_model().objects.create(username="budget")
+        restaurants = [Restaurant(name=f"r{index}", slug=f"r{index}") for index in range(6)]
+        Restaurant.objects.bulk_create(restaurants)
+        with self.assertRaisesMessage(AssertionError, "N+1 queries"):
+            with query_budget(100):
+                for restaurant in Restaurant.objects.all():
+                    list(Order.objects.filter(restaurant=restaurant, user=user))
+
+
+class SoftDeleteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        datagen.generate(2, seed=0)
+        cls.restaurant = Restaurant.objects.order_by("pk").first()
+
+    def alive(self):
+        return {
+            "menu_items": MenuItem.objects.filter(restaurant=self.restaurant).count(),
+            "orders": Order.objects.filter(restaurant=self.restaurant).count(),
+            "items": OrderItem.objects.filter(order__restaurant=self.restaurant).count(),
+        }
+
+    def test_cascade(self):
+        self.assertTrue(all(self.alive().values()))
+        self.restaurant.soft_delete()
+        self.assertEqual(self.alive(), {"menu_items": 0, "orders": 0, "items": 0})
+        self.assertFalse(Restaurant.objects.filter(pk=self.restaurant.pk).exists())
+        self.assertTrue(Restaurant.all_objects.filter(pk=self.restaurant.pk).exists())
+        # the done orders left the rollups with the restaurant
+        self.assertFalse(RestaurantDailySales.objects.filter(restaurant=self.restaurant, order_count__gt=0).exists())
+
+    def test_restore_brings_back_what_was_deleted_with_it(self):
+        before = self.alive()
+        deleted_first = Order.objects.filter(restaurant=self.restaurant).order_by("pk").first()
+        deleted_first.soft_delete()
+
+        self.restaurant.soft_delete()
+        Restaurant.all_objects.filter(pk=self.restaurant.pk).restore()
+
+        after = self.alive()
+        self.assertEqual(after["menu_items"], before["menu_items"])
+        self.assertEqual(after["orders"], before["orders"] - 1)
+        self.assertFalse(Order.objects.filter(pk=deleted_first.pk).exists())
+        today = timezone.localdate()
+        self.assertEqual(rollups.verify(today - timedelta(days=400), today + timedelta(days=1)), [])
+
+    def test_queryset_delete_is_soft(self):
+        orders = Order.objects.filter(restaurant=self.restaurant)
+        count = orders.count()
+        orders.delete()
+        self.assertEqual(Order.all_objects.filter(restaurant=self.restaurant, deleted_at__isnull=False).count(), count)
+
+
+class PurgeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        datagen.generate(2, seed=0)
+        cls.restaurant = Restaurant.objects.order_by("pk").first()
+
+    def archived(self, model):
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT COUNT(*) FROM {connection.ops.quote_name(archive_table_name(model))}")
+            return cursor.fetchone()[0]
+
+    def test_purge_archives_old_rows(self):
+        orders = Order.objects.filter(restaurant=self.restaurant).count()
+        self.restaurant.soft_delete()
+        long_ago = timezone.now() - timedelta(days=100)
+        for model in soft_deletable_models():
+            model.all_objects.filter(deleted_at__isnull=False).update(deleted_at=long_ago)
+
+        list(purge(timezone.now() - timedelta(days=90)))
+
+        self.assertFalse(Order.all_objects.filter(restaurant_id=self.restaurant.pk).exists())
+        self.assertEqual(self.archived(Order), orders)
+        # the sales rollups still reference the restaurant and its items
+        self.assertTrue(Restaurant.all_objects.filter(pk=self.restaurant.pk).exists())
+        self.assertEqual(self.archived(Restaurant), 0)
+        self.assertTrue(MenuItemDailySales.objects.filter(menu_item__restaurant=self.restaurant).exists())
+
+        MenuItemDailySales.objects.filter(menu_item__restaurant=self.restaurant).delete()
+        RestaurantDailySales.objects.filter(restaurant=self.restaurant).delete()
+        reports = [report for report in purge(timezone.now() - timedelta(days=90)) if report.finished]
+
+        self.assertFalse(Restaurant.all_objects.filter(pk=self.restaurant.pk).exists())
+        self.assertEqual(self.archived(Restaurant), 1)
+        self.assertEqual(sum(report.rows for report in reports if report.model is Restaurant), 1)
+
+    def test_recent_rows_are_kept(self):
+        self.restaurant.soft_delete()
+        list(purge(timezone.now() - timedelta(days=90)))
+        self.assertTrue(Restaurant.all_objects.filter(pk=self.restaurant.pk).exists())
+
+
+class JobTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        datagen.generate(2, seed=0)
+
+    def run_next(self):
+        claimed = jobs.claim("test")
+        self.assertIsNotNone(claimed)
+        return jobs.run(claimed)
+
+    def test_queryset_argument_is_stored_as_targets(self):
+        orders = Order.objects.filter(status=Order.STATUS_DONE)
+        queued = jobs.enqueue(count_rows, queryset=orders, step=2)
+        self.assertEqual(queued.kwargs, {"queryset": {jobs.QUERYSET_KEY: "commerces.Order"}, "step": 2})
+        self.assertEqual(
+            set(JobTarget.objects.filter(job=queued).values_list("object_id", flat=True)),
+            set(orders.values_list("pk", flat=True)),
+        )
+
+        self.assertEqual(self.run_next(), Job.STATUS_DONE)
+        queued.refresh_from_db()
+        self.assertEqual(queued.result, {"rows": orders.count(), "step": 2})
+        self.assertEqual(queued.progress_done, orders.count())
+        self.assertFalse(JobTarget.objects.filter(job=queued).exists())
+
+    def test_soft_delete_rows(self):
+        restaurant = Restaurant.objects.order_by("pk").first()
+        orders = Order.objects.filter(restaurant=restaurant)
+        count = orders.count()
+        jobs.enqueue(jobs.soft_delete_rows, queryset=orders)
+        with override_settings(JOBS_CHUNK_SIZE=7):
+            self.assertEqual(self.run_next(), Job.STATUS_DONE)
+        self.assertEqual(Order.all_objects.filter(restaurant=restaurant, deleted_at__isnull=False).count(), count)
+        # one timestamp for every chunk
+        self.assertEqual(Order.all_objects.filter(restaurant=restaurant).values("deleted_at").distinct().count(), 1)
+
+    def test_failed_job_is_retried_then_fails(self):
+        queued = jobs.enqueue(fail, max_attempts=2)
+        self.assertEqual(self.run_next(), Job.STATUS_QUEUED)
+        queued.refresh_from_db()
+        self.assertIn("RuntimeError: boom", queued.error)
+        self.assertGreater(queued.run_after, timezone.now())
+
+        Job.objects.filter(pk=queued.pk).update(run_after=timezone.now())
+        self.assertEqual(self.run_next(), Job.STATUS_FAILED)
+        self.assertIsNone(jobs.claim("test"))
+
+    def test_unregistered_function(self):
+        with self.assertRaises(LookupError):
+            jobs.enqueue(lambda progress: None)
+
+    def test_cancelled_job_stops_at_progress(self):
+        queued = jobs.enqueue(count_rows, queryset=Order.objects.all())
+        claimed = jobs.claim("test")
+        Job.objects.filter(pk=queued.pk).update(status=Job.STATUS_CANCELLED)
+        progress = jobs.Progress(claimed, jobs.Heartbeat(claimed))
+        with self.assertRaises(jobs.JobCancelled):
+            progress(1, force=True)
+
+    @override_settings(JOBS_LEASE_SECONDS=0.3, JOBS_POLL_INTERVAL=0.02)
+    def test_heartbeat_gives_up_when_renewals_keep_failing(self):
+        queued = jobs.enqueue(count_rows, queryset=Order.objects.all())
+        claimed = jobs.claim("test")
+        self.assertEqual(claimed.pk, queued.pk)
+        heartbeat = jobs.Heartbeat(claimed)
+        locked = mock.Mock(**{"update.side_effect": DatabaseError("database is locked")})
+        with mock.patch.object(jobs, "_leased", return_value=locked):
+            heartbeat.start()
+            heartbeat.join(5)
+        self.assertTrue(heartbeat.lost.is_set())
+        self.assertGreater(locked.update.call_count, 1)
+        with self.assertRaises(jobs.JobCancelled):
+            jobs.Progress(claimed, heartbeat)(1)
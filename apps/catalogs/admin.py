@@ -1,60 +1,60 @@
 from django.contrib import admin
+
+from apps.abstracts.admin import SoftDeleteAdmin, LargeTableAdminMixin, BoundedRelatedFieldListFilter
 from .models import Restaurant, MenuItem, Category, ItemCategory, Option, ItemOption
+from . import search
 
-def soft_delete(modeladmin, request, queryset):
-    for obj in queryset:
-        obj.soft_delete()
-soft_delete.short_description = "Soft delete selected"
 
-def restore(modeladmin, request, queryset):
-    for obj in queryset:
-        obj.restore()
-restore.short_description = "Restore selected"
+class FullTextSearchMixin:
+    """
+    Admin search through the catalogs full-text index instead of LIKE scans.
+    Soft-deleted rows are not indexed, so they are not found either.
+    """
 
-def hard_delete(modeladmin, request, queryset):
-    for obj in queryset:
-        obj.hard_delete()
-hard_delete.short_description = "Hard delete selected (irreversible)"
+    def get_search_results(self, request, queryset, search_term):
+        matching = search.matching(self.model, search_term)
+        if matching is None:
+            return super().get_search_results(request, queryset, search_term)
+        return queryset.filter(pk__in=matching), False
 
 
 @admin.register(Restaurant)
-class RestaurantAdmin(admin.ModelAdmin):
+class RestaurantAdmin(FullTextSearchMixin, LargeTableAdminMixin, SoftDeleteAdmin):
     list_display = ("id", "name", "slug", "deleted_at")
-    search_fields = ("name",)
-    actions = [soft_delete, restore, hard_delete]
+    search_fields = ("name", "address")
 
 
 @admin.register(MenuItem)
-class MenuItemAdmin(admin.ModelAdmin):
-    list_display = ("id", "name", "restaurant", "base_price", "is_available", "deleted_at")
-    list_filter = ("restaurant", "is_available")
-    search_fields = ("name",)
-    actions = [soft_delete, restore, hard_delete]
+class MenuItemAdmin(FullTextSearchMixin, LargeTableAdminMixin, SoftDeleteAdmin):
+    list_display = ("id", "name", "restaurant", "base_price", "min_price", "max_price", "is_available", "deleted_at")
+    list_filter = (("restaurant", BoundedRelatedFieldListFilter), "is_available")
+    search_fields = ("name", "description")
+    raw_id_fields = ("restaurant",)
 
 
 @admin.register(Category)
-class CategoryAdmin(admin.ModelAdmin):
+class CategoryAdmin(LargeTableAdminMixin, SoftDeleteAdmin):
     list_display = ("id", "name", "slug", "deleted_at")
     search_fields = ("name",)
-    actions = [soft_delete, restore, hard_delete]
 
 
 @admin.register(ItemCategory)
-class ItemCategoryAdmin(admin.ModelAdmin):
+class ItemCategoryAdmin(LargeTableAdminMixin, SoftDeleteAdmin):
     list_display = ("id", "menuitem", "category", "position", "deleted_at")
+    list_select_related = ("menuitem__restaurant",)
     list_filter = ("category",)
-    actions = [soft_delete, restore, hard_delete]
+    raw_id_fields = ("menuitem",)
 
 
 @admin.register(Option)
-class OptionAdmin(admin.ModelAdmin):
+class OptionAdmin(LargeTableAdminMixin, SoftDeleteAdmin):
     list_display = ("id", "name", "is_required", "deleted_at")
     search_fields = ("name",)
-    actions = [soft_delete, restore, hard_delete]
 
 
 @admin.register(ItemOption)
-class ItemOptionAdmin(admin.ModelAdmin):
+class ItemOptionAdmin(LargeTableAdminMixin, SoftDeleteAdmin):
     list_display = ("id", "menuitem", "option", "price_delta", "is_default", "deleted_at")
+    list_select_related = ("menuitem__restaurant",)
     list_filter = ("is_default",)
-    actions = [soft_delete, restore, hard_delete]
+    raw_id_fields = ("menuitem",)
@@ -5,3 +5,7 @@ from django.apps import AppConfig
 class CatalogsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.catalogs"
+
+    def ready(self):
+        # menu cache invalidation
+        from apps.catalogs import signals  # noqa: F401
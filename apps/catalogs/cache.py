@@ -0,0 +1,167 @@
+"""
+Per-restaurant cache of serialized menus.
+
+Menus are stored as ready-to-send JSON under keys that carry two versions:
+a global one, bumped when shared categories or options change, and one per
+restaurant, bumped by catalog signals. A bump makes the old entries
+unreachable and they simply expire.
+
+Entries are built from the primary database, the requests the cache
+does not absorb read from the replicas (apps.abstracts.routers).
+
+Entries are kept STALE_GRACE seconds past their freshness deadline. Once
+stale, a single request (holding a cache.add() lock) rebuilds the menu
+while the others keep serving the stale copy, so an expiring hot key does
+not send every request to the database at once. On a miss there is no copy
+to serve: async requests wait for the rebuild for up to WAIT_STEPS *
+WAIT_INTERVAL seconds, sync ones, which hold a worker thread meanwhile,
+for SYNC_WAIT_STEPS polls only, then build the menu themselves.
+
+A restaurant that does not exist is cached too, as an entry without a
+payload, for MISSING_TIMEOUT seconds: saving or restoring the restaurant
+bumps its version, bulk_create() does not.
+"""
+# Python modules
+import asyncio
+import json
+import time
+
+# Django modules
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+# Project modules
+from apps.abstracts.routers import use_primary
+from apps.catalogs.models import Restaurant
+from apps.catalogs.menu import serialize_menu
+
+GLOBAL_VERSION_KEY = "menu:version:global"
+STALE_GRACE = 300
+LOCK_TIMEOUT = 30
+WAIT_STEPS = 20
+SYNC_WAIT_STEPS = 2
+WAIT_INTERVAL = 0.05
+MISSING_TIMEOUT = 60
+
+
+def menu_cache():
+    return caches[settings.MENU_CACHE_ALIAS]
+
+
+def version_key(restaurant_id):
+    return f"menu:version:{restaurant_id}"
+
+
+def _versions(cache, restaurant_id):
+    keys = [GLOBAL_VERSION_KEY, version_key(restaurant_id)]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # start from a timestamp, so a lost version never reuses old keys
+            cache.add(key, time.time_ns(), None)
+            versions[key] = cache.get(key, 0)
+    return versions[keys[0]], versions[keys[1]]
+
+
+def _bump(key):
+    cache = menu_cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), None)
+
+
+def invalidate_restaurants(restaurant_ids):
+    """Drop cached menus of the given restaurants once the transaction commits."""
+    restaurant_ids = set(restaurant_ids)
+    transaction.on_commit(lambda: [_bump(version_key(pk)) for pk in restaurant_ids])
+
+
+def invalidate_all():
+    """Drop every cached menu once the transaction commits."""
+    transaction.on_commit(lambda: _bump(GLOBAL_VERSION_KEY))
+
+
+def build_menu_json(restaurant_id):
+    restaurant = Restaurant.objects.filter(pk=restaurant_id).first()
+    if restaurant is None:
+        return None
+    return json.dumps(serialize_menu(restaurant), cls=DjangoJSONEncoder)
+
+
+def _rebuild(cache, key, lock_key, restaurant_id):
+    try:
+        # the entry outlives any replica lag, build it from the primary
+        with use_primary():
+            payload = build_menu_json(restaurant_id)
+        # a missing restaurant is stored as an entry without payload
+        timeout = settings.MENU_CACHE_TIMEOUT if payload is not None else MISSING_TIMEOUT
+        cache.set(key, (time.time() + timeout, payload), timeout + STALE_GRACE)
+        return payload
+    finally:
+        cache.delete(lock_key)
+
+
+def get_menu_json(restaurant_id):
+    """
+    Return the menu of an alive restaurant as a JSON string,
+    or None if there is no such restaurant.
+    """
+    cache = menu_cache()
+    key = "menu:{}:{}:{}".format(restaurant_id, *_versions(cache, restaurant_id))
+    lock_key = f"{key}:lock"
+
+    entry = cache.get(key)
+    if entry is not None:
+        fresh_until, payload = entry
+        if time.time() < fresh_until or not cache.add(lock_key, 1, LOCK_TIMEOUT):
+            return payload
+        return _rebuild(cache, key, lock_key, restaurant_id)
+
+    if cache.add(lock_key, 1, LOCK_TIMEOUT):
+        return _rebuild(cache, key, lock_key, restaurant_id)
+    # someone else is building it, wait a moment before doing it ourselves:
+    # the sleep holds a worker thread
+    for _ in range(SYNC_WAIT_STEPS):
+        time.sleep(WAIT_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry[1]
+    return build_menu_json(restaurant_id)
+
+
+async def _aversions(cache, restaurant_id):
+    keys = [GLOBAL_VERSION_KEY, version_key(restaurant_id)]
+    versions = await cache.aget_many(keys)
+    for key in keys:
+        if key not in versions:
+            await cache.aadd(key, time.time_ns(), None)
+            versions[key] = await cache.aget(key, 0)
+    return versions[keys[0]], versions[keys[1]]
+
+
+async def aget_menu_json(restaurant_id):
+    """get_menu_json() for async views: waits without holding a thread."""
+    cache = menu_cache()
+    key = "menu:{}:{}:{}".format(restaurant_id, *await _aversions(cache, restaurant_id))
+    lock_key = f"{key}:lock"
+    rebuild = sync_to_async(_rebuild)
+
+    entry = await cache.aget(key)
+    if entry is not None:
+        fresh_until, payload = entry
+        if time.time() < fresh_until or not await cache.aadd(lock_key, 1, LOCK_TIMEOUT):
+            return payload
+        return await rebuild(cache, key, lock_key, restaurant_id)
+
+    if await cache.aadd(lock_key, 1, LOCK_TIMEOUT):
+        return await rebuild(cache, key, lock_key, restaurant_id)
+    for _ in range(WAIT_STEPS):
+        await asyncio.sleep(WAIT_INTERVAL)
+        entry = await cache.aget(key)
+        if entry is not None:
+            return entry[1]
+    return await sync_to_async(build_menu_json)(restaurant_id)
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+
+from apps.catalogs import prices
+from apps.catalogs.models import MenuItem
+
+
+class Command(BaseCommand):
+    help = "Verify the stored menu item price ranges against the options, or rebuild them, in primary key ranges."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rebuild", action="store_true", help="Recompute the price ranges instead of verifying them.")
+        parser.add_argument("--restaurant", type=int, action="append", default=[], help="Restaurant id, can be repeated.")
+        parser.add_argument("--batch-size", type=int, default=10000, help="Menu items per statement.")
+
+    def handle(self, *args, **options):
+        menu_items = MenuItem.all_objects.all()
+        if options["restaurant"]:
+            menu_items = menu_items.filter(restaurant_id__in=options["restaurant"])
+        bounds = menu_items.aggregate(first=Min("pk"), last=Max("pk"))
+        if bounds["first"] is None:
+            self.stdout.write("No menu items.")
+            return
+
+        batch_size = options["batch_size"]
+        count = 0
+        for start in range(bounds["first"], bounds["last"] + 1, batch_size):
+            batch = menu_items.filter(pk__gte=start, pk__lt=start + batch_size)
+            if options["rebuild"]:
+                count += prices.refresh(batch.values("pk"))
+                continue
+            for pk, min_price, max_price, expected_min, expected_max in prices.stale(batch).values_list(
+                "pk", "min_price", "max_price", "expected_min", "expected_max",
+            ):
+                count += 1
+                self.stdout.write(f"  menu item {pk}: stored {min_price}..{max_price}, expected {expected_min}..{expected_max}")
+
+        if options["rebuild"]:
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt the price ranges of {count} menu items."))
+            return
+        if count:
+            raise CommandError(f"{count} menu item price ranges are off, run with --rebuild.")
+        self.stdout.write(self.style.SUCCESS("Menu item price ranges are correct."))
@@ -0,0 +1,92 @@
+# Django modules
+from django.db.models import Prefetch
+
+# Project modules
+from apps.catalogs.models import MenuItem, ItemCategory, ItemOption
+
+
+def menu_items(restaurant):
+    """
+    Alive menu items of a restaurant with their alive categories and options.
+    Always 3 queries: items, item categories, item options.
+    """
+    return (
+        MenuItem.objects.filter(restaurant=restaurant)
+        .order_by("pk")
+        .prefetch_related(
+            Prefetch(
+                "itemcategory_set",
+                queryset=ItemCategory.objects.filter(category__deleted_at__isnull=True)
+                .select_related("category")
+                .order_by("position", "pk"),
+                to_attr="alive_item_categories",
+            ),
+            Prefetch(
+                "itemoption_set",
+                queryset=ItemOption.objects.filter(option__deleted_at__isnull=True)
+                .select_related("option")
+                .order_by("pk"),
+                to_attr="alive_item_options",
+            ),
+        )
+    )
+
+
+def serialize_menu_item(menu_item, position=None):
+    return {
+        "id": menu_item.pk,
+        "name": menu_item.name,
+        "slug": menu_item.slug,
+        "description": menu_item.description,
+        "base_price": str(menu_item.base_price),
+        "min_price": str(menu_item.min_price),
+        "max_price": str(menu_item.max_price),
+        "is_available": menu_item.is_available,
+        "position": position,
+        "options": [
+            {
+                "id": item_option.option_id,
+                "name": item_option.option.name,
+                "is_required": item_option.option.is_required,
+                "is_default": item_option.is_default,
+                "price_delta": str(item_option.price_delta),
+            }
+            for item_option in menu_item.alive_item_options
+        ],
+    }
+
+
+def serialize_menu(restaurant):
+    """
+    Menu of a restaurant grouped by category.
+    Categories are ordered by their first item position, items by
+    ItemCategory.position. Items without a category go to "uncategorized".
+    """
+    groups = {}
+    uncategorized = []
+    for menu_item in menu_items(restaurant):
+        if not menu_item.alive_item_categories:
+            uncategorized.append(serialize_menu_item(menu_item))
+        for item_category in menu_item.alive_item_categories:
+            category = item_category.category
+            group = groups.setdefault(category.pk, {
+                "id": category.pk,
+                "name": category.name,
+                "slug": category.slug,
+                "items": [],
+            })
+            group["items"].append(serialize_menu_item(menu_item, item_category.position))
+
+    categories = list(groups.values())
+    for group in categories:
+        group["items"].sort(key=lambda item: (item["position"], item["id"]))
+    categories.sort(key=lambda group: (group["items"][0]["position"], group["id"]))
+    return {
+        "restaurant": {
+            "id": restaurant.pk,
+            "name": restaurant.name,
+            "slug": restaurant.slug,
+        },
+        "categories": categories,
+        "uncategorized": uncategorized,
+    }
@@ -0,0 +1,102 @@
+"""
+FTS5 full-text index over restaurants (name, address) and menu items
+(name, description), kept in sync by triggers. Soft-deleted rows are left
+out of the index. Restaurants are stored under rowid -id, menu items under
+rowid id, so a trigger touches exactly one index row.
+
+SQLite only, other backends skip this migration.
+"""
+from django.db import migrations
+
+CREATE_SQL = [
+    """
+    CREATE VIRTUAL TABLE catalogs_search USING fts5(
+        name, body, restaurant_id UNINDEXED,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+    """,
+    # names weigh ten times more than addresses and descriptions
+    "INSERT INTO catalogs_search (catalogs_search, rank) VALUES ('rank', 'bm25(10.0, 1.0)')",
+    """
+    INSERT INTO catalogs_search (rowid, name, body, restaurant_id)
+    SELECT -id, name, COALESCE(address, ''), id FROM catalogs_restaurant WHERE deleted_at IS NULL
+    """,
+    """
+    INSERT INTO catalogs_search (rowid, name, body, restaurant_id)
+    SELECT id, name, description, restaurant_id FROM catalogs_menuitem WHERE deleted_at IS NULL
+    """,
+    """
+    CREATE TRIGGER catalogs_restaurant_search_insert AFTER INSERT ON catalogs_restaurant
+    WHEN new.deleted_at IS NULL BEGIN
+        INSERT INTO catalogs_search (rowid, name, body, restaurant_id)
+        VALUES (-new.id, new.name, COALESCE(new.address, ''), new.id);
+    END
+    """,
+    """
+    CREATE TRIGGER catalogs_restaurant_search_update AFTER UPDATE OF name, address, deleted_at ON catalogs_restaurant
+    BEGIN
+        DELETE FROM catalogs_search WHERE rowid = -old.id;
+        INSERT INTO catalogs_search (rowid, name, body, restaurant_id)
+        SELECT -new.id, new.name, COALESCE(new.address, ''), new.id WHERE new.deleted_at IS NULL;
+    END
+    """,
+    """
+    CREATE TRIGGER catalogs_restaurant_search_delete AFTER DELETE ON catalogs_restaurant
+    BEGIN
+        DELETE FROM catalogs_search WHERE rowid = -old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER catalogs_menuitem_search_insert AFTER INSERT ON catalogs_menuitem
+    WHEN new.deleted_at IS NULL BEGIN
+        INSERT INTO catalogs_search (rowid, name, body, restaurant_id)
+        VALUES (new.id, new.name, new.description, new.restaurant_id);
+    END
+    """,
+    """
+    CREATE TRIGGER catalogs_menuitem_search_update
+    AFTER UPDATE OF name, description, restaurant_id, deleted_at ON catalogs_menuitem
+    BEGIN
+        DELETE FROM catalogs_search WHERE rowid = old.id;
+        INSERT INTO catalogs_search (rowid, name, body, restaurant_id)
+        SELECT new.id, new.name, new.description, new.restaurant_id WHERE new.deleted_at IS NULL;
+    END
+    """,
+    """
+    CREATE TRIGGER catalogs_menuitem_search_delete AFTER DELETE ON catalogs_menuitem
+    BEGIN
+        DELETE FROM catalogs_search WHERE rowid = old.id;
+    END
+    """,
+]
+
+DROP_SQL = [
+    "DROP TRIGGER IF EXISTS catalogs_restaurant_search_insert",
+    "DROP TRIGGER IF EXISTS catalogs_restaurant_search_update",
+    "DROP TRIGGER IF EXISTS catalogs_restaurant_search_delete",
+    "DROP TRIGGER IF EXISTS catalogs_menuitem_search_insert",
+    "DROP TRIGGER IF EXISTS catalogs_menuitem_search_update",
+    "DROP TRIGGER IF EXISTS catalogs_menuitem_search_delete",
+    "DROP TABLE IF EXISTS catalogs_search",
+]
+
+
+def run(statements):
+    def operation(apps, schema_editor):
+        if schema_editor.connection.vendor != "sqlite":
+            return
+        for sql in statements:
+            schema_editor.execute(sql)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalogs', '0002_remove_itemcategory_unique_item_category_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(run(CREATE_SQL), run(DROP_SQL)),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.0 on 2026-10-18 13:08
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Round
+
+
+def fill_price_ranges(apps, schema_editor):
+    # apps.catalogs.prices.refresh() over every item, with the historical models
+    MenuItem = apps.get_model("catalogs", "MenuItem")
+    ItemOption = apps.get_model("catalogs", "ItemOption")
+    money = models.DecimalField(max_digits=10, decimal_places=2)
+
+    def deltas(**filters):
+        item_options = ItemOption._base_manager.filter(
+            menuitem=OuterRef("pk"), deleted_at__isnull=True, option__deleted_at__isnull=True, **filters
+        )
+        return Coalesce(
+            Subquery(item_options.values("menuitem").annotate(total=Sum("price_delta")).values("total"), output_field=money),
+            Value(Decimal("0.00"), output_field=money),
+        )
+
+    MenuItem._base_manager.using(schema_editor.connection.alias).update(
+        min_price=Round(F("base_price") + deltas(option__is_required=True), 2, output_field=money),
+        max_price=Round(F("base_price") + deltas(), 2, output_field=money),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalogs', '0003_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='menuitem',
+            name='max_price',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='menuitem',
+            name='min_price',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=10, null=True),
+        ),
+        migrations.RunPython(fill_price_ranges, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='menuitem',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', True)), fields=['restaurant', 'min_price'], name='catalogs_item_min_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='menuitem',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', True)), fields=['restaurant', 'max_price'], name='catalogs_item_max_price_idx'),
+        ),
+    ]
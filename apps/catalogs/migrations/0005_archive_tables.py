@@ -0,0 +1,22 @@
+# Generated by Django 5.0 on 2026-10-18 14:10
+
+from django.db import migrations
+
+from apps.abstracts.archive import sync_archive_tables
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalogs', '0004_menu_item_price_range'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            sync_archive_tables(
+                'catalogs.Restaurant', 'catalogs.MenuItem', 'catalogs.Category',
+                'catalogs.Option', 'catalogs.ItemCategory', 'catalogs.ItemOption',
+            ),
+            migrations.RunPython.noop,
+        ),
+    ]
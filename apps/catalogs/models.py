@@ -9,7 +9,9 @@ from django.db.models import (
     BooleanField,
     IntegerField,
     DateTimeField,
+    Index,
     UniqueConstraint,
+    Q,
     CASCADE,
 )
 from django.core.validators import MinValueValidator
@@ -78,11 +80,22 @@ class MenuItem(AbstractSoftDeletableModel):
     description = TextField(blank=True, default="")
     base_price = DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(0)])
     is_available = BooleanField(default=True)
+    # price range over the options (apps.catalogs.prices), nullable so adding
+    # them is an ALTER TABLE ADD COLUMN, not a table rebuild
+    min_price = DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, editable=False)
+    max_price = DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, editable=False)
     options = ManyToManyField(to=Option, through="ItemOption", through_fields=("menuitem", "option"), related_name="menu_items", blank=True)
     categories = ManyToManyField(to=Category, through="ItemCategory", through_fields=("menuitem", "category"), related_name="menu_items", blank=True)
     created_at = DateTimeField(auto_now_add=True)
     updated_at = DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # price filtering and sorting of a menu, alive items only
+            Index(fields=["restaurant", "min_price"], condition=Q(deleted_at__isnull=True), name="catalogs_item_min_price_idx"),
+            Index(fields=["restaurant", "max_price"], condition=Q(deleted_at__isnull=True), name="catalogs_item_max_price_idx"),
+        ]
+
     def __str__(self):
         return f"{self.name} — {self.restaurant.name}"
 
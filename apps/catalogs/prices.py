@@ -0,0 +1,100 @@
+"""
+Menu item price ranges.
+
+What a menu item costs depends on its options: every required option
+must be picked (apps.commerces.orders.price_cart), optional ones may be.
+
+    MenuItem.min_price = base_price + alive deltas of its required options
+    MenuItem.max_price = base_price + alive deltas of all its options
+
+Both are stored on the item and indexed per restaurant, so filtering or
+sorting a menu by price reads an index range instead of aggregating item
+options per request. The receivers in apps.catalogs.signals refresh them
+in SQL, one UPDATE per change, when an item, an item option or an option
+changes.
+
+Queryset update() and bulk_create() send no signals: run
+`manage.py menuprices --rebuild` after such changes.
+"""
+# Python modules
+from decimal import Decimal
+
+# Django modules
+from django.db.models import DecimalField, F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Round
+
+# Project modules
+from apps.catalogs.models import MenuItem, ItemOption
+
+MONEY = DecimalField(max_digits=10, decimal_places=2)
+ZERO = Value(Decimal("0.00"), output_field=MONEY)
+MAX_LIMIT = 100
+SORTS = ("min_price", "-min_price", "max_price", "-max_price")
+
+
+def _deltas(required_only):
+    """Correlated sum of the alive option deltas of the outer menu item."""
+    item_options = ItemOption.objects.filter(menuitem=OuterRef("pk"), option__deleted_at__isnull=True)
+    if required_only:
+        item_options = item_options.filter(option__is_required=True)
+    return Coalesce(
+        Subquery(
+            item_options.values("menuitem").annotate(total=Sum("price_delta")).values("total"),
+            output_field=MONEY,
+        ),
+        ZERO,
+    )
+
+
+def computed():
+    """{"min_price": expression, "max_price": expression} of the outer menu item."""
+    # rounded, SQLite adds decimals as floats
+    return {
+        "min_price": Round(F("base_price") + _deltas(required_only=True), 2, output_field=MONEY),
+        "max_price": Round(F("base_price") + _deltas(required_only=False), 2, output_field=MONEY),
+    }
+
+
+def refresh(menu_items):
+    """
+    Recompute the price range of menu_items (pks or a queryset of pks),
+    dead ones included, in one UPDATE. Returns the number of items.
+    """
+    return MenuItem.all_objects.filter(pk__in=menu_items).update(**computed())
+
+
+def refresh_for_options(option_ids):
+    """Recompute the menu items offering any of the options."""
+    return refresh(ItemOption.all_objects.filter(option_id__in=option_ids).values("menuitem_id"))
+
+
+def stale(menu_items=None):
+    """Menu items (all, or of the menu_items queryset) whose stored range is off."""
+    menu_items = MenuItem.all_objects.all() if menu_items is None else menu_items
+    expected = computed()
+    return (
+        menu_items.annotate(expected_min=expected["min_price"], expected_max=expected["max_price"])
+        .filter(
+            Q(min_price__isnull=True) | Q(max_price__isnull=True)
+            | ~Q(min_price=F("expected_min")) | ~Q(max_price=F("expected_max"))
+        )
+    )
+
+
+def in_price_range(restaurant_id, low=None, high=None, sort="min_price", limit=20):
+    """
+    Alive menu items of a restaurant whose starting price (min_price) is in
+    [low, high], sorted by sort (one of SORTS). Filtering and sorting by
+    min_price walk the (restaurant, min_price) index; sorting by max_price
+    walks the (restaurant, max_price) one when there are no bounds.
+    """
+    if sort not in SORTS:
+        raise ValueError(f"sort must be one of {', '.join(SORTS)}.")
+    menu_items = MenuItem.objects.filter(restaurant_id=restaurant_id)
+    if low is not None:
+        menu_items = menu_items.filter(min_price__gte=low)
+    if high is not None:
+        menu_items = menu_items.filter(min_price__lte=high)
+    # ties by pk in the same direction, the index ends with the rowid
+    tiebreak = "-pk" if sort.startswith("-") else "pk"
+    return menu_items.order_by(sort, tiebreak)[:max(1, min(limit, MAX_LIMIT))]
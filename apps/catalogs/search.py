@@ -0,0 +1,126 @@
+"""
+Full-text search over restaurants and menu items.
+
+On SQLite the catalogs_search FTS5 table (see migration 0003) holds one row
+per alive restaurant (rowid -id) and menu item (rowid id). Other backends
+fall back to a case-insensitive name match.
+"""
+# Python modules
+import re
+
+# Django modules
+from django.db import connections, router
+from django.db.models.expressions import RawSQL
+
+# Project modules
+from apps.catalogs.models import Restaurant, MenuItem
+
+TABLE = "catalogs_search"
+MAX_LIMIT = 100
+TERM_RE = re.compile(r"\w+", re.UNICODE)
+
+RESTAURANT = "restaurant"
+MENU_ITEM = "menu_item"
+
+
+def fts_query(text):
+    """
+    Turn free text into an FTS5 query: every word must match, the last one
+    as a prefix (search as you type). Returns "" when there is no word.
+    """
+    terms = TERM_RE.findall(text)
+    if not terms:
+        return ""
+    return " ".join(f'"{term}"' for term in terms) + "*"
+
+
+def is_indexed(model):
+    return connections[router.db_for_read(model)].vendor == "sqlite"
+
+
+def matching(model, text):
+    """
+    Expression for `pk__in=` selecting the rows of model (Restaurant or
+    MenuItem) that match text, e.g. to narrow an admin changelist.
+    Returns None when the index cannot serve the search.
+    """
+    query = fts_query(text)
+    if not query or not is_indexed(model):
+        return None
+    if model is Restaurant:
+        sql = f"SELECT -rowid FROM {TABLE} WHERE {TABLE} MATCH %s AND rowid < 0"
+    else:
+        sql = f"SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s AND rowid > 0"
+    return RawSQL(sql, [query])
+
+
+def _ranked_hits(query, restaurant_id, limit):
+    conditions, params = [f"{TABLE} MATCH %s"], [query]
+    if restaurant_id is not None:
+        # a restaurant indexes itself under its own id
+        conditions.append("restaurant_id = %s")
+        params.append(restaurant_id)
+    sql = f"SELECT rowid, rank FROM {TABLE} WHERE {' AND '.join(conditions)} ORDER BY rank LIMIT %s"
+    with connections[router.db_for_read(MenuItem)].cursor() as cursor:
+        cursor.execute(sql, [*params, limit])
+        return cursor.fetchall()
+
+
+def _fallback_hits(text, restaurant_id, limit):
+    restaurants = Restaurant.objects.filter(name__icontains=text)
+    menu_items = MenuItem.objects.filter(name__icontains=text)
+    if restaurant_id is not None:
+        restaurants = restaurants.filter(pk=restaurant_id)
+        menu_items = menu_items.filter(restaurant_id=restaurant_id)
+    hits = [(-pk, 0.0) for pk in restaurants.values_list("pk", flat=True)[:limit]]
+    hits += [(pk, 0.0) for pk in menu_items.values_list("pk", flat=True)[:limit - len(hits)]]
+    return hits
+
+
+def search(text, restaurant_id=None, limit=20):
+    """
+    Return up to limit results matching text, best first, as dicts with a
+    "type" of "restaurant" or "menu_item". Costs 3 queries at most.
+    """
+    limit = max(1, min(limit, MAX_LIMIT))
+    if is_indexed(MenuItem):
+        query = fts_query(text)
+        hits = _ranked_hits(query, restaurant_id, limit) if query else []
+    else:
+        hits = _fallback_hits(text, restaurant_id, limit) if text.strip() else []
+
+    menu_items = MenuItem.objects.in_bulk([rowid for rowid, _ in hits if rowid > 0])
+    restaurant_ids = {-rowid for rowid, _ in hits if rowid < 0}
+    restaurant_ids.update(menu_item.restaurant_id for menu_item in menu_items.values())
+    restaurants = Restaurant.objects.in_bulk(restaurant_ids) if restaurant_ids else {}
+
+    results = []
+    for rowid, rank in hits:
+        if rowid < 0:
+            restaurant = restaurants.get(-rowid)
+            if restaurant is None:
+                continue
+            results.append({
+                "type": RESTAURANT,
+                "id": restaurant.pk,
+                "name": restaurant.name,
+                "slug": restaurant.slug,
+                "address": restaurant.address,
+                "rank": rank,
+            })
+        else:
+            menu_item = menu_items.get(rowid)
+            restaurant = menu_item and restaurants.get(menu_item.restaurant_id)
+            if restaurant is None:
+                continue
+            results.append({
+                "type": MENU_ITEM,
+                "id": menu_item.pk,
+                "name": menu_item.name,
+                "description": menu_item.description,
+                "base_price": menu_item.base_price,
+                "is_available": menu_item.is_available,
+                "restaurant": {"id": restaurant.pk, "name": restaurant.name},
+                "rank": rank,
+            })
+    return results
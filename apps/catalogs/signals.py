@@ -0,0 +1,96 @@
+"""
+Invalidate the menu cache, and keep the price ranges of menu items
+(apps.catalogs.prices) in step with their base price and options.
+"""
+# Django modules
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+# Project modules
+from apps.abstracts.signals import soft_deleted, restored
+from apps.catalogs.models import Restaurant, MenuItem, Category, ItemCategory, Option, ItemOption
+from apps.catalogs import cache, prices
+
+CHANGE_SIGNALS = (post_save, post_delete, soft_deleted, restored)
+
+
+def _instance_pks(kwargs):
+    # model signals pass one instance, soft delete signals a list of pks
+    return kwargs["pks"] if "pks" in kwargs else [kwargs["instance"].pk]
+
+
+@receiver(CHANGE_SIGNALS, sender=Restaurant)
+def restaurant_changed(sender, **kwargs):
+    cache.invalidate_restaurants(_instance_pks(kwargs))
+
+
+@receiver(CHANGE_SIGNALS, sender=MenuItem)
+def menu_item_changed(sender, **kwargs):
+    if "instance" in kwargs:
+        cache.invalidate_restaurants([kwargs["instance"].restaurant_id])
+        return
+    restaurant_ids = MenuItem.all_objects.filter(pk__in=kwargs["pks"]).values_list("restaurant_id", flat=True)
+    cache.invalidate_restaurants(restaurant_ids.distinct())
+
+
+@receiver(CHANGE_SIGNALS, sender=ItemCategory)
+@receiver(CHANGE_SIGNALS, sender=ItemOption)
+def item_relation_changed(sender, **kwargs):
+    if "instance" in kwargs:
+        menu_item_ids = [kwargs["instance"].menuitem_id]
+    else:
+        menu_item_ids = sender.all_objects.filter(pk__in=kwargs["pks"]).values("menuitem_id")
+    restaurant_ids = MenuItem.all_objects.filter(pk__in=menu_item_ids).values_list("restaurant_id", flat=True)
+    cache.invalidate_restaurants(restaurant_ids.distinct())
+
+
+@receiver(CHANGE_SIGNALS, sender=Category)
+@receiver(CHANGE_SIGNALS, sender=Option)
+def shared_catalog_changed(sender, **kwargs):
+    cache.invalidate_all()
+
+
+# ----------------------------------------------
+# Price ranges
+#
+@receiver(pre_save, sender=MenuItem)
+def menu_item_saving(sender, instance, **kwargs):
+    if instance._state.adding:
+        # no options yet, the range is the base price
+        instance.min_price = instance.max_price = instance.base_price
+
+
+@receiver(post_save, sender=MenuItem)
+def menu_item_saved(sender, instance, created, update_fields, **kwargs):
+    if created or (update_fields is not None and "base_price" not in update_fields):
+        return
+    # also puts back a range a stale instance just wrote
+    prices.refresh([instance.pk])
+
+
+@receiver(pre_save, sender=ItemOption)
+def item_option_saving(sender, instance, **kwargs):
+    # the item the option moves away from needs a refresh too
+    instance._menuitem_before = None if instance._state.adding else (
+        ItemOption.all_objects.filter(pk=instance.pk).values_list("menuitem_id", flat=True).first()
+    )
+
+
+@receiver(post_save, sender=ItemOption)
+def item_option_saved(sender, instance, **kwargs):
+    prices.refresh({instance.menuitem_id, getattr(instance, "_menuitem_before", None)} - {None})
+
+
+@receiver((post_delete, soft_deleted, restored), sender=ItemOption)
+def item_options_changed(sender, **kwargs):
+    if "instance" in kwargs:
+        prices.refresh([kwargs["instance"].menuitem_id])
+    else:
+        prices.refresh(ItemOption.all_objects.filter(pk__in=kwargs["pks"]).values("menuitem_id"))
+
+
+@receiver((post_save, soft_deleted, restored), sender=Option)
+def options_changed(sender, **kwargs):
+    # is_required moves the minimum, a dead option counts for nothing;
+    # a deleted option's item options send their own post_delete
+    prices.refresh_for_options(_instance_pks(kwargs))
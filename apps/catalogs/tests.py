@@ -1,3 +1,97 @@
+# Python modules
+from decimal import Decimal
+from io import StringIO
+
+# Django modules
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
 from django.test import TestCase
+from django.urls import reverse
+
+# Project modules
+from apps.abstracts.instrumentation import query_budget
+from apps.catalogs import prices
+from apps.catalogs.models import Restaurant, MenuItem, Option, ItemOption
+from apps.commerces import datagen
+
+
+class MenuQueryBudgetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        datagen.generate(2, seed=0)
+        cls.restaurant = Restaurant.objects.order_by("pk").first()
+
+    def setUp(self):
+        cache.clear()
+
+    def test_menu(self):
+        url = reverse("restaurant-menu", args=[self.restaurant.pk])
+        # restaurant, items, item categories, item options, whatever the menu size
+        with query_budget(4):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        items = sum(len(category["items"]) for category in response.json()["categories"])
+        self.assertGreater(items + len(response.json()["uncategorized"]), 0)
+        with query_budget(0):
+            self.assertEqual(self.client.get(url).content, response.content)
+
+    def test_missing_restaurant_is_cached(self):
+        url = reverse("restaurant-menu", args=[Restaurant.all_objects.order_by("pk").last().pk + 1])
+        self.assertEqual(self.client.get(url).status_code, 404)
+        with query_budget(0):
+            self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_menu_items_by_price(self):
+        url = reverse("menu-items-by-price", args=[self.restaurant.pk])
+        with query_budget(1):
+            response = self.client.get(url, {"min": "4", "max": "20", "sort": "-max_price", "limit": "5"})
+        self.assertEqual(response.status_code, 200)
+        results = response.json()["results"]
+        self.assertLessEqual(len(results), 5)
+        self.assertTrue(all(Decimal("4") <= Decimal(item["min_price"]) <= Decimal("20") for item in results))
+        self.assertEqual(
+            [item["max_price"] for item in results],
+            sorted((item["max_price"] for item in results), key=Decimal, reverse=True),
+        )
+
+    def test_menu_items_by_price_rejects_bad_parameters(self):
+        url = reverse("menu-items-by-price", args=[self.restaurant.pk])
+        for params in ({"min": "nan"}, {"max": "Infinity"}, {"min": "sNaN"}, {"limit": "-5"}, {"limit": "x"}, {"sort": "name"}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get(url, params).status_code, 400)
+
+
+class PriceRangeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.restaurant = Restaurant.objects.create(name="Range", slug="range")
+        cls.required = Option.objects.create(name="Size", slug="size", is_required=True)
+        cls.optional = Option.objects.create(name="Sauce", slug="sauce")
+
+    def range_of(self, menu_item):
+        menu_item.refresh_from_db()
+        return menu_item.min_price, menu_item.max_price
+
+    def test_options_move_the_range(self):
+        menu_item = MenuItem.objects.create(restaurant=self.restaurant, name="Soup", slug="soup", base_price="5.00")
+        self.assertEqual(self.range_of(menu_item), (Decimal("5.00"), Decimal("5.00")))
+
+        ItemOption.objects.create(menuitem=menu_item, option=self.required, price_delta="1.50")
+        sauce = ItemOption.objects.create(menuitem=menu_item, option=self.optional, price_delta="0.75")
+        self.assertEqual(self.range_of(menu_item), (Decimal("6.50"), Decimal("7.25")))
+
+        sauce.soft_delete()
+        self.assertEqual(self.range_of(menu_item), (Decimal("6.50"), Decimal("6.50")))
+
+        self.required.soft_delete()
+        self.assertEqual(self.range_of(menu_item), (Decimal("5.00"), Decimal("5.00")))
+        self.assertFalse(prices.stale().exists())
 
-# Create your tests here.
+    def test_menuprices_rebuilds_after_queryset_updates(self):
+        menu_item = MenuItem.objects.create(restaurant=self.restaurant, name="Tea", slug="tea", base_price="2.00")
+        # update() sends no signals
+        MenuItem.objects.filter(pk=menu_item.pk).update(base_price="3.00")
+        with self.assertRaises(CommandError):
+            call_command("menuprices", stdout=StringIO())
+        call_command("menuprices", "--rebuild", stdout=StringIO())
+        self.assertEqual(self.range_of(menu_item), (Decimal("3.00"), Decimal("3.00")))
@@ -0,0 +1,12 @@
+# Django modules
+from django.urls import path
+
+# Project modules
+from apps.catalogs import views
+
+urlpatterns = [
+    path("search/", views.search, name="search"),
+    path("restaurants/<int:restaurant_id>/menu/", views.restaurant_menu, name="restaurant-menu"),
+    path("restaurants/<int:restaurant_id>/menu/prices/", views.menu_items_by_price, name="menu-items-by-price"),
+    path("restaurants/<int:restaurant_id>/menu/async/", views.async_restaurant_menu, name="async-restaurant-menu"),
+]
@@ -1,3 +1,128 @@
-from django.shortcuts import render
+# Python modules
+from decimal import Decimal, InvalidOperation
 
-# Create your views here.
+# Django modules
+from django.http import Http404, HttpRequest, HttpResponse, JsonResponse
+from django.views.decorators.http import require_GET
+
+# Project modules
+from apps.catalogs import prices, search as catalog_search
+from apps.catalogs.cache import aget_menu_json, get_menu_json
+
+
+@require_GET
+def restaurant_menu(request: HttpRequest, restaurant_id: int) -> HttpResponse:
+    """
+    Return the menu of an alive restaurant as JSON.
+
+    Parameters:
+        request: HttpRequest
+            The request object.
+        restaurant_id: int
+            Primary key of the restaurant.
+
+    Returns:
+        HttpResponse
+            Menu items grouped by category with their option price deltas,
+            served from the menu cache when possible.
+    """
+
+    payload = get_menu_json(restaurant_id)
+    if payload is None:
+        raise Http404("No such restaurant.")
+    return HttpResponse(payload, content_type="application/json")
+
+
+@require_GET
+async def async_restaurant_menu(request: HttpRequest, restaurant_id: int) -> HttpResponse:
+    """
+    restaurant_menu() as a native async view, for settings/asgi.py.
+
+    Parameters:
+        request: HttpRequest
+            The request object.
+        restaurant_id: int
+            Primary key of the restaurant.
+
+    Returns:
+        HttpResponse
+            The same JSON menu.
+    """
+
+    payload = await aget_menu_json(restaurant_id)
+    if payload is None:
+        raise Http404("No such restaurant.")
+    return HttpResponse(payload, content_type="application/json")
+
+
+@require_GET
+def search(request: HttpRequest) -> JsonResponse:
+    """
+    Search restaurants and menu items by name, address and description.
+
+    Parameters:
+        request: HttpRequest
+            The request object. Query parameters: q (the text), restaurant
+            (optional restaurant id to search in) and limit (at most 100).
+
+    Returns:
+        JsonResponse
+            Matching restaurants and menu items, best match first.
+    """
+
+    text = request.GET.get("q", "")
+    try:
+        restaurant_id = int(request.GET["restaurant"]) if request.GET.get("restaurant") else None
+        limit = int(request.GET.get("limit", 20))
+    except ValueError:
+        return JsonResponse({"detail": "restaurant and limit must be integers."}, status=400)
+    results = catalog_search.search(text, restaurant_id=restaurant_id, limit=limit)
+    return JsonResponse({"query": text, "results": results})
+
+
+@require_GET
+def menu_items_by_price(request: HttpRequest, restaurant_id: int) -> JsonResponse:
+    """
+    List the alive menu items of a restaurant by price, from the stored
+    price ranges.
+
+    Parameters:
+        request: HttpRequest
+            The request object. Query parameters: min and max (bounds of
+            the starting price, optional), sort (min_price, -min_price,
+            max_price or -max_price) and limit (1 to 100, larger is capped).
+        restaurant_id: int
+            Primary key of the restaurant.
+
+    Returns:
+        JsonResponse
+            Menu items with their base price and price range.
+    """
+
+    try:
+        low = Decimal(request.GET["min"]) if request.GET.get("min") else None
+        high = Decimal(request.GET["max"]) if request.GET.get("max") else None
+        limit = int(request.GET.get("limit", 20))
+        # Decimal() also parses NaN and Infinity
+        if limit < 1 or any(bound is not None and not bound.is_finite() for bound in (low, high)):
+            raise ValueError
+    except (InvalidOperation, ValueError):
+        return JsonResponse({"detail": "min and max must be numbers, limit a positive integer."}, status=400)
+    sort = request.GET.get("sort", "min_price")
+    if sort not in prices.SORTS:
+        return JsonResponse({"detail": f"sort must be one of {', '.join(prices.SORTS)}."}, status=400)
+    menu_items = prices.in_price_range(restaurant_id, low, high, sort=sort, limit=limit)
+    return JsonResponse({
+        "restaurant": restaurant_id,
+        "results": [
+            {
+                "id": menu_item.pk,
+                "name": menu_item.name,
+                "base_price": menu_item.base_price,
+                "min_price": menu_item.min_price,
+                "max_price": menu_item.max_price,
+                "is_available": menu_item.is_available,
+            }
+            for menu_item in menu_items.only("pk", "name", "base_price", "min_price", "max_price", "is_available")
+        ],
+    })
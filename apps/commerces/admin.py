@@ -1,59 +1,66 @@
 from django.contrib import admin
-from .models import Address, Order, OrderItem, OrderItemOption, PromoCode, OrderPromo
 
-def soft_delete(modeladmin, request, queryset):
-    for obj in queryset:
-        obj.soft_delete()
-soft_delete.short_description = "Soft delete selected"
+from apps.abstracts.admin import SoftDeleteAdmin, LargeTableAdminMixin, BoundedRelatedFieldListFilter
+from apps.abstracts.jobs import in_background
+from .jobs import recalculate_order_totals
+from .models import Address, Order, OrderItem, OrderItemOption, PromoCode, PromoCodeUsage, OrderPromo
+from .totals import recalculate_totals
 
-def restore(modeladmin, request, queryset):
-    for obj in queryset:
-        obj.restore()
-restore.short_description = "Restore selected"
 
-def hard_delete(modeladmin, request, queryset):
-    for obj in queryset:
-        obj.hard_delete()
-hard_delete.short_description = "Hard delete selected (irreversible)"
+@admin.action(description="Recalculate totals of selected")
+def recalculate_selected_totals(modeladmin, request, queryset):
+    if not in_background(modeladmin, request, queryset, recalculate_order_totals):
+        count = recalculate_totals(queryset)
+        modeladmin.message_user(request, f"Recalculated {count} orders.")
 
 
 @admin.register(Address)
-class AddressAdmin(admin.ModelAdmin):
+class AddressAdmin(LargeTableAdminMixin, SoftDeleteAdmin):
     list_display = ("id", "user", "street", "city", "deleted_at")
     search_fields = ("street", "city")
-    actions = [soft_delete, restore, hard_delete]
+    raw_id_fields = ("user",)
 
 
 @admin.register(Order)
-class OrderAdmin(admin.ModelAdmin):
+class OrderAdmin(LargeTableAdminMixin, SoftDeleteAdmin):
     list_display = ("id", "user", "restaurant", "address", "status", "total", "deleted_at")
-    list_filter = ("status", "restaurant")
+    list_filter = ("status", ("restaurant", BoundedRelatedFieldListFilter))
     search_fields = ("user__username", "restaurant__name")
-    actions = [soft_delete, restore, hard_delete]
+    raw_id_fields = ("user", "restaurant", "address")
+    actions = SoftDeleteAdmin.actions + [recalculate_selected_totals]
     inlines = []
 
 
 @admin.register(OrderItem)
-class OrderItemAdmin(admin.ModelAdmin):
+class OrderItemAdmin(LargeTableAdminMixin, SoftDeleteAdmin):
     list_display = ("id", "order", "item_name", "item_price", "quantity", "line_total")
-    actions = [soft_delete, restore, hard_delete]
+    list_select_related = ("order__user",)
+    raw_id_fields = ("order", "menu_item")
 
 
 @admin.register(OrderItemOption)
-class OrderItemOptionAdmin(admin.ModelAdmin):
+class OrderItemOptionAdmin(LargeTableAdminMixin, SoftDeleteAdmin):
     list_display = ("id", "order_item", "option_name", "price_delta")
-    actions = [soft_delete, restore, hard_delete]
+    raw_id_fields = ("order_item",)
 
 
 @admin.register(PromoCode)
-class PromoCodeAdmin(admin.ModelAdmin):
-    list_display = ("id", "code", "discount_percent", "is_active", "deleted_at")
+class PromoCodeAdmin(LargeTableAdminMixin, SoftDeleteAdmin):
+    list_display = ("id", "code", "discount_percent", "is_active", "used_count", "max_uses", "max_uses_per_user", "deleted_at")
     list_filter = ("is_active",)
     search_fields = ("code",)
-    actions = [soft_delete, restore, hard_delete]
+    readonly_fields = ("used_count",)
+
+
+@admin.register(PromoCodeUsage)
+class PromoCodeUsageAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    list_display = ("id", "promo", "user", "uses")
+    search_fields = ("promo__code", "user__username")
+    raw_id_fields = ("promo", "user")
 
 
 @admin.register(OrderPromo)
-class OrderPromoAdmin(admin.ModelAdmin):
+class OrderPromoAdmin(LargeTableAdminMixin, SoftDeleteAdmin):
     list_display = ("id", "order", "promo", "applied_amount")
-    actions = [soft_delete, restore, hard_delete]
+    list_select_related = ("order__user",)
+    raw_id_fields = ("order",)
@@ -5,3 +5,7 @@ from django.apps import AppConfig
 class CommercesConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.commerces"
+
+    def ready(self):
+        # sales rollups and the promo code index
+        from apps.commerces import signals  # noqa: F401
@@ -0,0 +1,279 @@
+"""
+Deterministic large-scale test data for catalogs and commerces.
+
+Rows of every restaurant are built by a pure function of (seed, index) with
+primary keys computed from fixed per-restaurant block sizes, so restaurants
+can be built in worker processes and the same seed on the same database
+always produces the same data. Only the parent process touches the database.
+Explicit primary keys do not move the sequences of databases that have them
+(PostgreSQL, Oracle), they are reset once everything is written.
+"""
+import multiprocessing
+import random
+from decimal import Decimal, ROUND_HALF_UP
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connections, router, transaction
+from django.db.models import Max
+
+from apps.catalogs.models import Restaurant, Category, Option, MenuItem, ItemCategory, ItemOption
+from apps.commerces import rollups
+from apps.commerces.models import Address, PromoCode, Order, OrderItem, OrderPromo
+
+User = get_user_model()
+
+USERS_PER_RESTAURANT = 5
+MENU_ITEMS_PER_RESTAURANT = 50
+ORDERS_PER_RESTAURANT = 100
+MAX_ITEMS_PER_ORDER = 4
+CATEGORIES = 12
+OPTIONS = 20
+PROMO_CODES = 50
+PROMO_RATE = 0.2
+PASSWORD = "password123"
+
+WORDS = (
+    "spicy", "grilled", "crispy", "smoked", "fresh", "garlic", "lemon", "honey",
+    "chicken", "beef", "tofu", "salmon", "rice", "noodles", "salad", "soup",
+)
+
+# parents before children, the order rows are flushed in
+WRITE_ORDER = (Restaurant, MenuItem, ItemCategory, ItemOption, Order, OrderItem, OrderPromo)
+
+
+# every model the generator writes
+MODELS = (User, Address, Category, Option, PromoCode, *WRITE_ORDER)
+
+
+def next_pks():
+    """First free primary key of every model the generator writes."""
+    pks = {}
+    for model in MODELS:
+        manager = getattr(model, "all_objects", model._base_manager)
+        pks[model] = (manager.aggregate(max_pk=Max("pk"))["max_pk"] or 0) + 1
+    return pks
+
+
+def reset_sequences():
+    """Move the primary key sequences past the rows written with explicit pks."""
+    by_alias = {}
+    for model in MODELS:
+        by_alias.setdefault(router.db_for_write(model), []).append(model)
+    for alias, models in by_alias.items():
+        connection = connections[alias]
+        statements = connection.ops.sequence_reset_sql(no_style(), models)
+        if not statements:
+            # SQLite and MySQL follow the largest key on their own
+            continue
+        with transaction.atomic(using=alias), connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+
+def build_plan(scale, seed, pks):
+    """Picklable description of the dataset shared with worker processes."""
+    return {
+        "seed": seed,
+        "users": (pks[User], scale * USERS_PER_RESTAURANT),
+        "addresses": pks[Address],
+        "categories": (pks[Category], CATEGORIES),
+        "options": (pks[Option], OPTIONS),
+        "promo_codes": (pks[PromoCode], PROMO_CODES),
+        "restaurant": pks[Restaurant],
+        "menu_item": pks[MenuItem],
+        "order": pks[Order],
+    }
+
+
+def promo_percent(index):
+    return Decimal(5 + index % 26)
+
+
+def build_shared(plan):
+    """Users, addresses, categories, options and promo codes."""
+    rng = random.Random(f"{plan['seed']}:shared")
+    password = make_password(PASSWORD)
+    first_user, users = plan["users"]
+    rows = {model: [] for model in (User, Address, Category, Option, PromoCode)}
+    for i in range(users):
+        pk = first_user + i
+        rows[User].append(User(pk=pk, username=f"load-user-{pk}", email=f"load-user-{pk}@example.com", password=password))
+        rows[Address].append(Address(
+            pk=plan["addresses"] + i,
+            user_id=pk,
+            street=f"Street {rng.randint(1, 999)}",
+            city="City",
+            postal_code=f"{rng.randint(10000, 99999)}",
+            country="Country",
+        ))
+    first, count = plan["categories"]
+    for pk in range(first, first + count):
+        rows[Category].append(Category(pk=pk, name=f"Category {pk}", slug=f"load-cat-{pk}"))
+    first, count = plan["options"]
+    for pk in range(first, first + count):
+        rows[Option].append(Option(pk=pk, name=f"Option {pk}", slug=f"load-opt-{pk}", is_required=rng.random() < 0.2))
+    first, count = plan["promo_codes"]
+    for i in range(count):
+        rows[PromoCode].append(PromoCode(pk=first + i, code=f"LOAD{first + i}", discount_percent=promo_percent(i)))
+    return rows
+
+
+def build_restaurant(plan, index):
+    """
+    Field values of one restaurant with its menu and orders.
+    Pure function of (plan, index), safe to run in a worker process.
+    """
+    rng = random.Random(f"{plan['seed']}:{index}")
+    restaurant_id = plan["restaurant"] + index
+    first_item = plan["menu_item"] + index * MENU_ITEMS_PER_RESTAURANT
+    first_order = plan["order"] + index * ORDERS_PER_RESTAURANT
+    first_user, users = plan["users"]
+    first_category, categories = plan["categories"]
+    first_option, options = plan["options"]
+    first_promo, promo_codes = plan["promo_codes"]
+
+    rows = {model: [] for model in WRITE_ORDER}
+    rows[Restaurant].append({
+        "pk": restaurant_id,
+        "name": f"Restaurant {restaurant_id}",
+        "slug": f"load-rest-{restaurant_id}",
+        "address": f"Addr {rng.randint(1, 999)}",
+        "phone": f"{rng.randint(1000000, 9999999)}",
+    })
+
+    prices = []
+    for j in range(MENU_ITEMS_PER_RESTAURANT):
+        pk = first_item + j
+        price = Decimal(rng.randint(300, 5000)) / 100
+        name = " ".join(rng.sample(WORDS, 2)).title()
+        prices.append((pk, name, price))
+        rows[MenuItem].append({
+            "pk": pk,
+            "restaurant_id": restaurant_id,
+            "name": name,
+            "slug": f"menu-{pk}",
+            "description": " ".join(rng.choices(WORDS, k=8)),
+            "base_price": price,
+        })
+        rows[ItemCategory].append({
+            "menuitem_id": pk,
+            "category_id": first_category + rng.randrange(categories),
+            "position": j,
+        })
+        min_price = max_price = price
+        for option_id in rng.sample(range(first_option, first_option + options), rng.randint(0, 3)):
+            delta = Decimal(rng.randint(0, 300)) / 100
+            rows[ItemOption].append({
+                "menuitem_id": pk,
+                "option_id": option_id,
+                "price_delta": delta,
+            })
+            max_price += delta
+            if option_id in plan["required_options"]:
+                min_price += delta
+        # what apps.catalogs.prices would store, bulk_create sends no signals
+        rows[MenuItem][-1].update(min_price=min_price, max_price=max_price)
+
+    for j in range(ORDERS_PER_RESTAURANT):
+        order_id = first_order + j
+        user_index = rng.randrange(users)
+        subtotal = Decimal("0.00")
+        for menu_item_id, name, price in rng.sample(prices, rng.randint(1, MAX_ITEMS_PER_ORDER)):
+            quantity = rng.randint(1, 3)
+            line_total = price * quantity
+            subtotal += line_total
+            rows[OrderItem].append({
+                "order_id": order_id,
+                "menu_item_id": menu_item_id,
+                "item_name": name,
+                "item_price": price,
+                "quantity": quantity,
+                "line_total": line_total,
+            })
+        discount = Decimal("0.00")
+        if rng.random() < PROMO_RATE:
+            promo_index = rng.randrange(promo_codes)
+            discount = (subtotal * promo_percent(promo_index) / Decimal(100)).quantize(Decimal("0.01"), ROUND_HALF_UP)
+            rows[OrderPromo].append({
+                "order_id": order_id,
+                "promo_id": first_promo + promo_index,
+                "applied_amount": discount,
+            })
+        rows[Order].append({
+            "pk": order_id,
+            "user_id": first_user + user_index,
+            "restaurant_id": restaurant_id,
+            "address_id": plan["addresses"] + user_index,
+            "status": rng.choice(list(Order.STATUS_CHOICES)),
+            "subtotal": subtotal,
+            "discount_total": discount,
+            "total": subtotal - discount,
+        })
+    return rows
+
+
+class BulkWriter:
+    """
+    Buffers rows and writes them with bulk_create, parents first,
+    once chunk_size rows are pending.
+    """
+
+    def __init__(self, chunk_size):
+        self.chunk_size = chunk_size
+        self.pending = {model: [] for model in WRITE_ORDER}
+        self.written = {model: 0 for model in WRITE_ORDER}
+
+    def add(self, rows):
+        for model, values in rows.items():
+            self.pending[model].extend(model(**fields) for fields in values)
+        if sum(len(objs) for objs in self.pending.values()) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        with transaction.atomic():
+            for model in WRITE_ORDER:
+                objs = self.pending[model]
+                model.all_objects.bulk_create(objs, batch_size=self.chunk_size)
+                self.written[model] += len(objs)
+                self.pending[model] = []
+
+
+def generate(scale, seed=0, workers=1, chunk_size=5000, progress=None):
+    """
+    Generate scale restaurants with their menus and orders.
+    Returns the number of rows written per model.
+    """
+    plan = build_plan(scale, seed, next_pks())
+    shared = build_shared(plan)
+    plan["required_options"] = frozenset(option.pk for option in shared[Option] if option.is_required)
+    with transaction.atomic():
+        for model, objs in shared.items():
+            manager = getattr(model, "all_objects", model._base_manager)
+            manager.bulk_create(objs, batch_size=chunk_size)
+
+    writer = BulkWriter(chunk_size)
+    build = partial(build_restaurant, plan)
+    if workers > 1:
+        # workers never touch the database, don't share the parent's connection
+        connections.close_all()
+        with multiprocessing.get_context("fork").Pool(workers) as pool:
+            for index, rows in enumerate(pool.imap(build, range(scale), chunksize=8)):
+                writer.add(rows)
+                if progress:
+                    progress(index + 1)
+    else:
+        for index in range(scale):
+            writer.add(build(index))
+            if progress:
+                progress(index + 1)
+    writer.flush()
+    reset_sequences()
+    # bulk_create sends no order signals, the done orders are not in the sales rollups yet
+    rollups.rebuild_orders(Order.all_objects.filter(pk__gte=plan["order"]))
+
+    written = {model: len(objs) for model, objs in shared.items()}
+    written.update(writer.written)
+    return written
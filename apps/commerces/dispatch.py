@@ -0,0 +1,147 @@
+"""
+Order dispatch queue.
+
+Orders not done yet are the queue: a worker claims a batch of one
+restaurant's orders in a status, moves the batch to the next status in
+bulk and lets go of it.
+
+    NEW -> CONFIRMED -> DELIVERING -> DONE
+
+claim() leases the batch to a claim token (claimed_by, claimed_until)
+for DISPATCH_LEASE_SECONDS, so an order is processed once while its
+lease runs and is up for grabs again if the worker dies. The lease is
+taken by an UPDATE that only matches orders whose lease is free. Where
+the backend has SELECT ... FOR UPDATE SKIP LOCKED, the candidates are
+locked with it first, so concurrent workers pick disjoint batches
+instead of waiting on each other's rows. SQLite has no row locks but
+runs one write at a time, and the conditional UPDATE alone keeps two
+workers from getting the same order.
+
+advance() moves the orders still leased to the token and applies them
+to the sales rollups when they reach DONE (apps.commerces.rollups, a
+queryset update sends no order signals).
+
+    token, pks = claim("worker-1", Order.STATUS_NEW)
+    if pks:
+        advance(token, pks)
+"""
+# Python modules
+import uuid
+from datetime import timedelta
+
+# Django modules
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+# Project modules
+from apps.abstracts.routers import use_primary
+from apps.commerces import rollups
+from apps.commerces.models import Order
+
+# reads of fresh candidates when other workers took them first (SQLite)
+CLAIM_ATTEMPTS = 5
+
+TRANSITIONS = {
+    Order.STATUS_NEW: Order.STATUS_CONFIRMED,
+    Order.STATUS_CONFIRMED: Order.STATUS_DELIVERING,
+    Order.STATUS_DELIVERING: Order.STATUS_DONE,
+}
+
+
+def _lease_free(now):
+    return Q(claimed_until__isnull=True) | Q(claimed_until__lt=now)
+
+
+def queue(status, restaurant_id=None, now=None):
+    """Alive orders in status with a free lease, oldest first."""
+    orders = Order.objects.filter(
+        # status__lt repeats the condition of the partial index so SQLite uses it
+        _lease_free(now or timezone.now()), status=status, status__lt=Order.STATUS_DONE,
+    )
+    if restaurant_id is not None:
+        orders = orders.filter(restaurant_id=restaurant_id)
+    return orders.order_by("pk")
+
+
+def _token(worker):
+    return f"{worker[:80]}:{uuid.uuid4().hex[:16]}"
+
+
+def _candidates(status, restaurant_id, now, limit, skip_locked):
+    orders = queue(status, restaurant_id, now)
+    if skip_locked:
+        orders = orders.select_for_update(skip_locked=True, of=("self",))
+    if restaurant_id is None:
+        restaurant_id = orders.values_list("restaurant_id", flat=True).first()
+        if restaurant_id is None:
+            return []
+        orders = orders.filter(restaurant_id=restaurant_id)
+    return list(orders.values_list("pk", flat=True)[:limit])
+
+
+def claim(worker, status, restaurant_id=None, limit=None, lease=None):
+    """
+    Lease up to limit orders in status to a new token, all of one
+    restaurant (restaurant_id, or the one of the oldest order in the
+    queue). Returns (token, [order pks]), no pks when the queue is empty.
+    """
+    if status not in TRANSITIONS:
+        raise ValueError(f"Orders in status {status} do not move on.")
+    limit = limit or settings.DISPATCH_BATCH_SIZE
+    token = _token(worker)
+    now = timezone.now()
+    lease_values = {
+        "claimed_by": token,
+        "claimed_until": now + timedelta(seconds=lease or settings.DISPATCH_LEASE_SECONDS),
+    }
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            pks = _candidates(status, restaurant_id, now, limit, skip_locked=True)
+            Order.objects.filter(_lease_free(now), pk__in=pks).update(**lease_values)
+        return token, pks
+    # read outside a transaction, so the write lock is only held by the
+    # UPDATE, which checks the lease again: another worker may have taken
+    # the candidates since the read, then read again
+    with use_primary():
+        for _ in range(CLAIM_ATTEMPTS):
+            pks = _candidates(status, restaurant_id, now, limit, skip_locked=False)
+            if not pks:
+                break
+            if Order.objects.filter(_lease_free(now), pk__in=pks, status=status).update(**lease_values):
+                return token, list(
+                    Order.objects.filter(pk__in=pks, claimed_by=token).order_by("pk").values_list("pk", flat=True)
+                )
+        return token, []
+
+
+def advance(token, pks):
+    """
+    Move the orders of pks still leased to token to their next status and
+    let go of them. Orders whose lease ran out are left alone, another
+    worker may hold them now. Returns the number of orders moved.
+    """
+    now = timezone.now()
+    moved = 0
+    with transaction.atomic():
+        leased = Order.objects.filter(pk__in=pks, claimed_by=token, claimed_until__gte=now)
+        by_status = {}
+        for pk, status in leased.values_list("pk", "status"):
+            by_status.setdefault(status, []).append(pk)
+        for status, batch in by_status.items():
+            if status not in TRANSITIONS:
+                # moved on by someone else meanwhile
+                continue
+            moved += Order.objects.filter(pk__in=batch, claimed_by=token).update(
+                status=TRANSITIONS[status], claimed_by=None, claimed_until=None, updated_at=now,
+            )
+            if TRANSITIONS[status] == Order.STATUS_DONE:
+                rollups.add_orders(batch)
+        release(token, pks)
+    return moved
+
+
+def release(token, pks):
+    """Let go of the orders of pks leased to token without moving them."""
+    return Order.all_objects.filter(pk__in=pks, claimed_by=token).update(claimed_by=None, claimed_until=None)
@@ -0,0 +1,223 @@
+"""
+Streaming export of orders with their items, item options and promos.
+
+Orders are read as values() rows with iterator(chunk_size=...) and the
+children of every chunk are fetched in three queries, over the chunk's
+pk range when it is dense or its pks when filters make it sparse. There
+are no model instances or related managers per row, and memory depends
+on chunk_size, not on how many orders match: 100 orders or 100 million
+stream the same way.
+
+    export(orders(...), "csv")     one row per order item (an order
+                                   without items gets one row)
+    export(orders(...), "ndjson")  one JSON object per order, children
+                                   nested
+
+Both yield one text block per chunk; aexport() is the same for async
+views.
+"""
+# Python modules
+import csv
+import json
+from datetime import datetime, time as dt_time
+
+# Django modules
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+# Project modules
+from apps.commerces.models import Order, OrderItem, OrderItemOption, OrderPromo
+
+FORMATS = ("csv", "ndjson")
+CONTENT_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+CHUNK_SIZE = 2000
+ORDER_FIELDS = (
+    "id", "created_at", "status", "restaurant_id", "restaurant__name", "user_id",
+    "subtotal", "discount_total", "total",
+)
+CSV_COLUMNS = (
+    "order_id", "created_at", "status", "restaurant_id", "restaurant_name", "user_id",
+    "subtotal", "discount_total", "total", "promo_codes",
+    "item_id", "item_name", "item_price", "quantity", "line_total", "item_options",
+)
+
+
+def parse_date(value):
+    """YYYY-MM-DD as an aware datetime at midnight, ValueError otherwise."""
+    try:
+        day = datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        raise ValueError(f"Invalid date {value!r}, expected YYYY-MM-DD.")
+    return timezone.make_aware(datetime.combine(day, dt_time.min))
+
+
+def orders(restaurant_ids=(), statuses=(), since=None, until=None):
+    """Alive orders to export, oldest first, created in [since, until)."""
+    queryset = Order.objects.order_by("pk")
+    if restaurant_ids:
+        queryset = queryset.filter(restaurant_id__in=restaurant_ids)
+    if statuses:
+        queryset = queryset.filter(status__in=statuses)
+    if since:
+        queryset = queryset.filter(created_at__gte=since)
+    if until:
+        queryset = queryset.filter(created_at__lt=until)
+    return queryset
+
+
+def _children(chunk):
+    """Querysets of the alive items, item options and promos of a chunk of orders."""
+    first, last = chunk[0]["id"], chunk[-1]["id"]
+    if last - first < 2 * len(chunk):
+        # a range scan of the order_id index, the few filtered out orders are skipped by _attach()
+        orders = {"order_id__gte": first, "order_id__lte": last}
+    else:
+        orders = {"order_id__in": [order["id"] for order in chunk]}
+    return (
+        OrderItem.objects.filter(**orders)
+        .order_by("pk")
+        .values("id", "order_id", "item_name", "item_price", "quantity", "line_total"),
+        OrderItemOption.objects.filter(**{f"order_item__{key}": value for key, value in orders.items()})
+        .order_by("pk")
+        .values("order_item_id", "option_name", "price_delta"),
+        OrderPromo.objects.filter(**orders)
+        .order_by("pk")
+        .values("order_id", "promo__code", "applied_amount"),
+    )
+
+
+def _attach(chunk, items, options, promos):
+    """Nest the children rows into the chunk of order rows."""
+    by_id = {}
+    for order in chunk:
+        order["items"], order["promos"] = [], []
+        by_id[order["id"]] = order
+    by_item = {}
+    for item in items:
+        # orders of the pk range that were filtered out
+        order = by_id.get(item["order_id"])
+        if order is not None:
+            item["options"] = []
+            order["items"].append(item)
+            by_item[item["id"]] = item
+    for option in options:
+        item = by_item.get(option["order_item_id"])
+        if item is not None:
+            item["options"].append(option)
+    for promo in promos:
+        order = by_id.get(promo["order_id"])
+        if order is not None:
+            order["promos"].append(promo)
+    return chunk
+
+
+def _fetch_children(chunk):
+    return _attach(chunk, *(list(queryset) for queryset in _children(chunk)))
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _ndjson_lines(order):
+    yield json.dumps(
+        {
+            "id": order["id"],
+            "created_at": order["created_at"],
+            "status": order["status"],
+            "restaurant": {"id": order["restaurant_id"], "name": order["restaurant__name"]},
+            "user_id": order["user_id"],
+            "subtotal": order["subtotal"],
+            "discount_total": order["discount_total"],
+            "total": order["total"],
+            "promos": [
+                {"code": promo["promo__code"], "applied_amount": promo["applied_amount"]}
+                for promo in order["promos"]
+            ],
+            "items": [
+                {
+                    "id": item["id"],
+                    "name": item["item_name"],
+                    "price": item["item_price"],
+                    "quantity": item["quantity"],
+                    "line_total": item["line_total"],
+                    "options": [
+                        {"name": option["option_name"], "price_delta": option["price_delta"]}
+                        for option in item["options"]
+                    ],
+                }
+                for item in order["items"]
+            ],
+        },
+        cls=DjangoJSONEncoder,
+    ) + "\n"
+
+
+class _Echo:
+    """File-like object for csv.writer that hands the line back."""
+
+    def write(self, value):
+        return value
+
+
+def _csv_lines(order, writer):
+    head = [order[field] for field in ORDER_FIELDS]
+    head[1] = head[1].isoformat()
+    head.append("|".join(promo["promo__code"] for promo in order["promos"]))
+    if not order["items"]:
+        yield writer.writerow(head + [""] * 6)
+    for item in order["items"]:
+        options = "|".join(f"{option['option_name']} (+{option['price_delta']})" for option in item["options"])
+        yield writer.writerow(
+            head + [item["id"], item["item_name"], item["item_price"], item["quantity"], item["line_total"], options]
+        )
+
+
+def _formatter(fmt):
+    """(header, order -> lines) of a format."""
+    if fmt == "csv":
+        writer = csv.writer(_Echo())
+        return writer.writerow(CSV_COLUMNS), lambda order: _csv_lines(order, writer)
+    if fmt == "ndjson":
+        return "", _ndjson_lines
+    raise ValueError(f"Unknown format {fmt!r}, expected one of {', '.join(FORMATS)}.")
+
+
+def _blocks(header, lines, chunk):
+    return header + "".join(line for order in chunk for line in lines(order))
+
+
+def export(queryset, fmt, chunk_size=CHUNK_SIZE):
+    header, lines = _formatter(fmt)
+    rows = queryset.values(*ORDER_FIELDS).iterator(chunk_size=chunk_size)
+    for chunk in _chunks(rows, chunk_size):
+        yield _blocks(header, lines, _fetch_children(chunk))
+        header = ""
+    if header:
+        # nothing matched
+        yield header
+
+
+async def aexport(queryset, fmt, chunk_size=CHUNK_SIZE):
+    header, lines = _formatter(fmt)
+    chunk = []
+    async for row in queryset.values(*ORDER_FIELDS).aiterator(chunk_size=chunk_size):
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            yield _blocks(header, lines, await sync_to_async(_fetch_children)(chunk))
+            header, chunk = "", []
+    if chunk:
+        yield _blocks(header, lines, await sync_to_async(_fetch_children)(chunk))
+    elif header:
+        yield header
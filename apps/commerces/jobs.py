@@ -0,0 +1,35 @@
+"""
+Background jobs of the commerces app (apps.abstracts.jobs), run by
+`manage.py runworkers`.
+"""
+# Django modules
+from django.conf import settings
+
+# Project modules
+from apps.abstracts.jobs import job, pk_chunks
+from apps.commerces import datagen
+from apps.commerces.totals import recalculate_totals
+
+
+@job
+def recalculate_order_totals(progress, queryset, reapply_promos=False):
+    """recalculate_totals() over queryset, in primary key chunks."""
+    total = queryset.count()
+    progress(0, total, force=True)
+    done = 0
+    for pks in pk_chunks(queryset, settings.JOBS_CHUNK_SIZE):
+        # by pk, recalculate_totals() re-evaluates its queryset in every statement
+        done += recalculate_totals(queryset.model.all_objects.filter(pk__in=pks), reapply_promos=reapply_promos)
+        progress(done, total)
+    return {"orders": done}
+
+
+@job
+def generate_test_data(progress, scale, seed=0, workers=1, chunk_size=5000):
+    """datagen.generate(), restaurants for progress."""
+    progress(0, scale, force=True)
+    written = datagen.generate(
+        scale, seed=seed, workers=workers, chunk_size=chunk_size,
+        progress=lambda done: progress(done, scale, force=done == scale),
+    )
+    return {model._meta.label: count for model, count in written.items()}
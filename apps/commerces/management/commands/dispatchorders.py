@@ -0,0 +1,66 @@
+import os
+import socket
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import OperationalError
+
+from apps.commerces import dispatch
+from apps.commerces.models import Order
+
+
+class Command(BaseCommand):
+    help = (
+        "Dispatch worker: claim batches of one restaurant's orders and move them to their next status "
+        "(new, confirmed, delivering, done). Run several for parallel workers."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--worker", default=f"{socket.gethostname()}-{os.getpid()}", help="Worker name, in the claim tokens.")
+        parser.add_argument("--status", type=int, action="append", default=None, choices=list(dispatch.TRANSITIONS),
+                            help="Only move orders in this status, can be repeated (default: every status).")
+        parser.add_argument("--restaurant", type=int, default=None, help="Only this restaurant's orders.")
+        parser.add_argument("--batch-size", type=int, default=settings.DISPATCH_BATCH_SIZE)
+        parser.add_argument("--lease", type=int, default=settings.DISPATCH_LEASE_SECONDS, help="Lease in seconds.")
+        parser.add_argument("--once", action="store_true", help="Exit once the queue is empty instead of waiting.")
+
+    def dispatch(self, worker, status, options):
+        """Claim and advance one batch, returns the number of orders moved or None if there was none."""
+        token, pks = dispatch.claim(worker, status, options["restaurant"], options["batch_size"], options["lease"])
+        if not pks:
+            return None
+        try:
+            return dispatch.advance(token, pks)
+        except BaseException:
+            dispatch.release(token, pks)
+            raise
+
+    def handle(self, *args, **options):
+        worker = options["worker"]
+        statuses = options["status"] or list(dispatch.TRANSITIONS)
+        total = 0
+        while True:
+            moved, busy = 0, False
+            for status in statuses:
+                try:
+                    count = self.dispatch(worker, status, options)
+                except OperationalError as exc:
+                    # e.g. SQLite's "database is locked" under other writers, an
+                    # unreleased lease runs out by itself
+                    self.stderr.write(f"{time.strftime('%H:%M:%S')} {worker}: {exc}, retrying")
+                    busy = True
+                    continue
+                if count is None:
+                    continue
+                moved += count
+                self.stdout.write(
+                    f"{time.strftime('%H:%M:%S')} {worker}: {count} orders "
+                    f"{Order.STATUS_CHOICES[status]} -> {Order.STATUS_CHOICES[dispatch.TRANSITIONS[status]]}"
+                )
+            total += moved
+            if not moved:
+                if options["once"] and not busy:
+                    self.stdout.write(self.style.SUCCESS(f"Queue drained, {total} orders moved."))
+                    return
+                time.sleep(settings.DISPATCH_IDLE_SLEEP)
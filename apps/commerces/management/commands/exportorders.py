@@ -0,0 +1,38 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.commerces import export
+from apps.commerces.models import Order
+
+
+def parse_date(value):
+    try:
+        return export.parse_date(value)
+    except ValueError as exc:
+        raise CommandError(str(exc))
+
+
+class Command(BaseCommand):
+    help = "Stream alive orders with their items, options and promos as CSV or NDJSON, in constant memory."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=export.FORMATS, default="csv")
+        parser.add_argument("--output", default="-", help="File to write, - for stdout.")
+        parser.add_argument("--restaurant", type=int, action="append", default=[], help="Restaurant id, can be repeated.")
+        parser.add_argument("--status", type=int, action="append", default=[], choices=list(Order.STATUS_CHOICES))
+        parser.add_argument("--since", type=parse_date, default=None, help="Orders created on or after YYYY-MM-DD.")
+        parser.add_argument("--until", type=parse_date, default=None, help="Orders created before YYYY-MM-DD.")
+        parser.add_argument("--chunk-size", type=int, default=export.CHUNK_SIZE, help="Orders read per query.")
+
+    def handle(self, *args, **options):
+        orders = export.orders(options["restaurant"], options["status"], options["since"], options["until"])
+        output = sys.stdout if options["output"] == "-" else open(options["output"], "w", newline="", encoding="utf-8")
+        try:
+            for block in export.export(orders, options["format"], options["chunk_size"]):
+                output.write(block)
+        finally:
+            if output is not sys.stdout:
+                output.close()
+        if output is not sys.stdout:
+            self.stdout.write(self.style.SUCCESS(f"Exported orders to {options['output']}."))
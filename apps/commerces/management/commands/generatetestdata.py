@@ -1,18 +1,35 @@
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.contrib.auth import get_user_model
 from apps.catalogs.models import Restaurant, Category, Option, MenuItem, ItemCategory, ItemOption
 from apps.commerces.models import Address, PromoCode, Order, OrderItem, OrderItemOption, OrderPromo
+from apps.abstracts.jobs import enqueue
+from apps.commerces import datagen
+from apps.commerces.jobs import generate_test_data
 from django.utils import timezone
-from random import randint, choice, sample
+from random import randint, choice, sample, seed as random_seed
 from decimal import Decimal
+import time
 
 User = get_user_model()
 
 
 class Command(BaseCommand):
-    help = "Generate test data (≈20 records per model)."
+    help = "Generate test data (≈20 records per model, or --scale restaurants with full menus and orders)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scale", type=int, default=0, help="Number of restaurants to generate in bulk mode.")
+        parser.add_argument("--seed", type=int, default=0, help="Random seed, the same seed produces the same data.")
+        parser.add_argument("--workers", type=int, default=1, help="Processes building restaurants in bulk mode.")
+        parser.add_argument("--chunk-size", type=int, default=5000, help="Rows per bulk_create transaction.")
+        parser.add_argument("--background", action="store_true", help="Queue bulk mode as a job for `manage.py runworkers`.")
 
     def handle(self, *args, **options):
+        if options["scale"] < 0:
+            raise CommandError("--scale must not be negative.")
+        if options["scale"]:
+            return self.handle_scale(**options)
+
+        random_seed(options["seed"])
         # Create some users
         users = []
         if User.objects.count() < 5:
@@ -93,3 +110,22 @@ class Command(BaseCommand):
             order.save()
 
         self.stdout.write(self.style.SUCCESS("Generated test data for catalogs and commerces."))
+
+    def handle_scale(self, scale, seed, workers, chunk_size, **options):
+        if options["background"]:
+            queued = enqueue(generate_test_data, scale=scale, seed=seed, workers=workers, chunk_size=chunk_size)
+            self.stdout.write(self.style.SUCCESS(f"Queued as job #{queued.pk}, run `manage.py runworkers` to process it."))
+            return
+        started = time.monotonic()
+        step = max(1, scale // 20)
+
+        def progress(done):
+            if done % step == 0 or done == scale:
+                self.stdout.write(f"  {done}/{scale} restaurants, {time.monotonic() - started:.1f}s")
+
+        written = datagen.generate(scale, seed=seed, workers=workers, chunk_size=chunk_size, progress=progress)
+        for model, count in written.items():
+            self.stdout.write(f"{model._meta.label}: {count}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {sum(written.values())} rows for {scale} restaurants in {time.monotonic() - started:.1f}s."
+        ))
@@ -0,0 +1,61 @@
+from datetime import datetime, time as dt_time
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from apps.commerces.models import Order
+from apps.commerces.totals import recalculate_totals
+
+
+def parse_date(value):
+    try:
+        return timezone.make_aware(datetime.combine(datetime.strptime(value, "%Y-%m-%d").date(), dt_time.min))
+    except ValueError:
+        raise CommandError(f"Invalid date {value!r}, expected YYYY-MM-DD.")
+
+
+class Command(BaseCommand):
+    help = "Recalculate order totals in SQL, in primary key ranges of --batch-size orders."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--restaurant", type=int, action="append", default=[], help="Restaurant id, can be repeated.")
+        parser.add_argument("--status", type=int, action="append", default=[], choices=list(Order.STATUS_CHOICES))
+        parser.add_argument("--since", type=parse_date, default=None, help="Orders created on or after YYYY-MM-DD.")
+        parser.add_argument("--until", type=parse_date, default=None, help="Orders created before YYYY-MM-DD.")
+        parser.add_argument("--include-deleted", action="store_true", help="Also recalculate soft deleted orders.")
+        parser.add_argument("--reapply-promos", action="store_true", help="Recompute promo amounts from the promo percent.")
+        parser.add_argument("--batch-size", type=int, default=10000)
+
+    def handle(self, *args, **options):
+        orders = Order.all_objects.all() if options["include_deleted"] else Order.objects.all()
+        if options["restaurant"]:
+            orders = orders.filter(restaurant_id__in=options["restaurant"])
+        if options["status"]:
+            orders = orders.filter(status__in=options["status"])
+        if options["since"]:
+            orders = orders.filter(created_at__gte=options["since"])
+        if options["until"]:
+            orders = orders.filter(created_at__lt=options["until"])
+
+        bounds = orders.aggregate(first=Min("pk"), last=Max("pk"))
+        if bounds["first"] is None:
+            self.stdout.write("No orders to recalculate.")
+            return
+
+        started = time.monotonic()
+        total = 0
+        batch_size = options["batch_size"]
+        for start in range(bounds["first"], bounds["last"] + 1, batch_size):
+            total += recalculate_totals(
+                orders.filter(pk__gte=start, pk__lt=start + batch_size),
+                reapply_promos=options["reapply_promos"],
+            )
+            if options["verbosity"] > 1:
+                self.stdout.write(f"  {total} orders, up to pk {start + batch_size - 1}")
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Recalculated {total} orders in {elapsed:.1f}s ({total / elapsed if elapsed else 0:.0f} orders/s)."
+        ))
@@ -0,0 +1,52 @@
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+
+from apps.commerces import rollups
+from apps.commerces.models import Order
+
+
+def parse_day(value):
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        raise CommandError(f"Invalid date {value!r}, expected YYYY-MM-DD.")
+
+
+class Command(BaseCommand):
+    help = "Verify the daily sales rollups against the orders, or rebuild them, one date window at a time."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rebuild", action="store_true", help="Recompute the rollups instead of verifying them.")
+        parser.add_argument("--since", type=parse_day, default=None, help="First day, YYYY-MM-DD (default: first order).")
+        parser.add_argument("--until", type=parse_day, default=None, help="Day to stop before, YYYY-MM-DD (default: after the last order).")
+        parser.add_argument("--days", type=int, default=31, help="Days per window, one transaction each.")
+
+    def handle(self, *args, **options):
+        bounds = Order.all_objects.aggregate(first=Min("created_at"), last=Max("created_at"))
+        if bounds["first"] is None and not (options["since"] and options["until"]):
+            self.stdout.write("No orders.")
+            return
+        since = options["since"] or rollups.day_of(bounds["first"])
+        until = options["until"] or rollups.day_of(bounds["last"]) + timedelta(days=1)
+        if options["days"] < 1:
+            raise CommandError("--days must be at least 1.")
+
+        if options["rebuild"]:
+            rows = 0
+            for start, end in rollups.windows(since, until, options["days"]):
+                written = rollups.rebuild(start, end)
+                rows += written
+                self.stdout.write(f"  {start} .. {end}: {written} rows")
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt sales rollups from {since} to {until} ({rows} rows)."))
+            return
+
+        mismatches = []
+        for start, end in rollups.windows(since, until, options["days"]):
+            mismatches += rollups.verify(start, end)
+        for kind, key, stored, expected in mismatches:
+            self.stdout.write(f"  {kind} {key}: stored {stored}, expected {expected}")
+        if mismatches:
+            raise CommandError(f"{len(mismatches)} sales rollups are off, run with --rebuild.")
+        self.stdout.write(self.style.SUCCESS(f"Sales rollups from {since} to {until} are correct."))
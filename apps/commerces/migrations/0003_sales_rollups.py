@@ -0,0 +1,66 @@
+# Generated by Django 5.0 on 2026-10-18 12:47
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalogs', '0003_search_index'),
+        ('commerces', '0002_order_deleted_at_orderitem_deleted_at_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MenuItemDailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('quantity', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RestaurantDailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('order_count', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['created_at'], name='commerces_order_created_idx'),
+        ),
+        migrations.AddField(
+            model_name='menuitemdailysales',
+            name='menu_item',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='catalogs.menuitem'),
+        ),
+        migrations.AddField(
+            model_name='restaurantdailysales',
+            name='restaurant',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='catalogs.restaurant'),
+        ),
+        migrations.AddIndex(
+            model_name='menuitemdailysales',
+            index=models.Index(fields=['day'], name='commerces_mids_day_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='menuitemdailysales',
+            constraint=models.UniqueConstraint(fields=('menu_item', 'day'), name='unique_menu_item_daily_sales'),
+        ),
+        migrations.AddIndex(
+            model_name='restaurantdailysales',
+            index=models.Index(fields=['day'], name='commerces_rds_day_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='restaurantdailysales',
+            constraint=models.UniqueConstraint(fields=('restaurant', 'day'), name='unique_restaurant_daily_sales'),
+        ),
+    ]
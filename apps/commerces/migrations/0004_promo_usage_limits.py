@@ -0,0 +1,56 @@
+# Generated by Django 5.0 on 2026-10-18 12:50
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('commerces', '0003_sales_rollups'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PromoCodeUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('uses', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='promocode',
+            name='max_uses',
+            field=models.PositiveIntegerField(blank=True, help_text='Uses over all users, empty for no limit.', null=True),
+        ),
+        migrations.AddField(
+            model_name='promocode',
+            name='max_uses_per_user',
+            field=models.PositiveIntegerField(blank=True, help_text='Uses per user, empty for no limit.', null=True),
+        ),
+        migrations.AddField(
+            model_name='promocode',
+            name='used_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddConstraint(
+            model_name='promocode',
+            constraint=models.CheckConstraint(check=models.Q(('max_uses__isnull', True), ('used_count__lte', models.F('max_uses')), _connector='OR'), name='promo_code_used_within_max_uses'),
+        ),
+        migrations.AddField(
+            model_name='promocodeusage',
+            name='promo',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='usages', to='commerces.promocode'),
+        ),
+        migrations.AddField(
+            model_name='promocodeusage',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='promo_usages', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddConstraint(
+            model_name='promocodeusage',
+            constraint=models.UniqueConstraint(fields=('promo', 'user'), name='unique_promo_code_usage'),
+        ),
+    ]
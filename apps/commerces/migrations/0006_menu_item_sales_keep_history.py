@@ -0,0 +1,20 @@
+# Generated by Django 5.0 on 2026-10-18 13:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalogs', '0004_menu_item_price_range'),
+        ('commerces', '0005_order_dispatch_lease'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='menuitemdailysales',
+            name='menu_item',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='daily_sales', to='catalogs.menuitem'),
+        ),
+    ]
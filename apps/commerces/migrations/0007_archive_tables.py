@@ -0,0 +1,22 @@
+# Generated by Django 5.0 on 2026-10-18 14:10
+
+from django.db import migrations
+
+from apps.abstracts.archive import sync_archive_tables
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('commerces', '0006_menu_item_sales_keep_history'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            sync_archive_tables(
+                'commerces.Address', 'commerces.PromoCode', 'commerces.Order',
+                'commerces.OrderItem', 'commerces.OrderItemOption', 'commerces.OrderPromo',
+            ),
+            migrations.RunPython.noop,
+        ),
+    ]
@@ -1,11 +1,18 @@
 from django.db.models import (
+    Model,
     CharField,
     ForeignKey,
     DecimalField,
     PositiveIntegerField,
     BooleanField,
+    DateField,
     DateTimeField,
+    IntegerField,
+    Index,
+    CheckConstraint,
     UniqueConstraint,
+    F,
+    Q,
     CASCADE,
     SET_NULL,
 )
@@ -46,12 +53,52 @@ class PromoCode(AbstractSoftDeletableModel):
     code = CharField(max_length=CODE_MAX_LEN, unique=True)
     discount_percent = DecimalField(max_digits=5, decimal_places=2, validators=[MinValueValidator(0)])
     is_active = BooleanField(default=True)
+    max_uses = PositiveIntegerField(null=True, blank=True, help_text="Uses over all users, empty for no limit.")
+    max_uses_per_user = PositiveIntegerField(null=True, blank=True, help_text="Uses per user, empty for no limit.")
+    # counted by apps.commerces.promos for codes with max_uses only
+    used_count = PositiveIntegerField(default=0)
     created_at = DateTimeField(auto_now_add=True)
     updated_at = DateTimeField(auto_now=True)
 
+    class Meta:
+        constraints = [
+            CheckConstraint(
+                check=Q(max_uses__isnull=True) | Q(used_count__lte=F("max_uses")),
+                name="promo_code_used_within_max_uses",
+            ),
+        ]
+
     def __str__(self):
         return self.code
 
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            # used_count only moves by conditional UPDATEs, a stale instance must not write it back
+            kwargs["update_fields"] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != "used_count"
+            ]
+        super().save(*args, **kwargs)
+
+
+class PromoCodeUsage(Model):
+    """
+    Uses of a promo code by a user, for codes with max_uses_per_user,
+    maintained by apps.commerces.promos.
+    """
+
+    promo = ForeignKey(to=PromoCode, on_delete=CASCADE, related_name="usages")
+    user = ForeignKey(to=User, on_delete=CASCADE, related_name="promo_usages")
+    uses = PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(fields=["promo", "user"], name="unique_promo_code_usage"),
+        ]
+
+    def __str__(self):
+        return f"{self.promo} by {self.user}: {self.uses}"
+
 
 class Order(AbstractSoftDeletableModel):
     """
@@ -77,9 +124,25 @@ class Order(AbstractSoftDeletableModel):
     subtotal = DecimalField(max_digits=10, decimal_places=2, default=Decimal("0.00"), validators=[MinValueValidator(0)])
     discount_total = DecimalField(max_digits=10, decimal_places=2, default=Decimal("0.00"), validators=[MinValueValidator(0)])
     total = DecimalField(max_digits=10, decimal_places=2, default=Decimal("0.00"), validators=[MinValueValidator(0)])
+    # dispatch lease (apps.commerces.dispatch): the claim holding the order and until when,
+    # nullable so adding them is an ALTER TABLE ADD COLUMN, not a table rebuild
+    claimed_by = CharField(max_length=100, null=True, blank=True)
+    claimed_until = DateTimeField(null=True, blank=True)
     created_at = DateTimeField(auto_now_add=True)
     updated_at = DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # date-partitioned rollup rebuilds and exports
+            Index(fields=["created_at"], name="commerces_order_created_idx"),
+            # dispatch queue, only alive orders not done yet (4 is STATUS_DONE)
+            Index(
+                fields=["status", "restaurant", "id"],
+                condition=Q(status__lt=4, deleted_at__isnull=True),
+                name="commerces_order_queue_idx",
+            ),
+        ]
+
     def __str__(self):
         return f"Order #{self.pk} — {self.user}"
 
@@ -131,3 +194,57 @@ class OrderPromo(AbstractSoftDeletableModel):
 
     def __str__(self):
         return f"{self.promo} on {self.order}"
+
+
+class RestaurantDailySales(Model):
+    """
+    Done, alive orders of a restaurant per day (of created_at),
+    maintained by apps.commerces.rollups.
+    """
+
+    restaurant = ForeignKey(to=Restaurant, on_delete=CASCADE, related_name="daily_sales")
+    day = DateField()
+    order_count = IntegerField(default=0)
+    revenue = DecimalField(max_digits=14, decimal_places=2, default=Decimal("0.00"))
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(fields=["restaurant", "day"], name="unique_restaurant_daily_sales"),
+        ]
+        indexes = [
+            Index(fields=["day"], name="commerces_rds_day_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.restaurant_id} on {self.day}: {self.order_count} orders, {self.revenue}"
+
+    @property
+    def average_basket(self):
+        if not self.order_count:
+            return Decimal("0.00")
+        return (self.revenue / self.order_count).quantize(Decimal("0.01"))
+
+
+class MenuItemDailySales(Model):
+    """
+    Quantity and line totals of a menu item in done, alive orders per day,
+    maintained by apps.commerces.rollups. Rows of a hard deleted (or
+    purged) menu item stay as history with no menu item, like the revenue
+    in RestaurantDailySales.
+    """
+
+    menu_item = ForeignKey(to=MenuItem, on_delete=SET_NULL, null=True, related_name="daily_sales")
+    day = DateField()
+    quantity = IntegerField(default=0)
+    revenue = DecimalField(max_digits=14, decimal_places=2, default=Decimal("0.00"))
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(fields=["menu_item", "day"], name="unique_menu_item_daily_sales"),
+        ]
+        indexes = [
+            Index(fields=["day"], name="commerces_mids_day_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.menu_item_id} on {self.day}: {self.quantity}"
@@ -0,0 +1,130 @@
+"""
+Order placement.
+
+A cart is a list of lines:
+    {"menu_item": <MenuItem pk>, "quantity": <int>, "options": [<Option pk>, ...]}
+
+place_order() validates it against the live catalog and writes the order,
+its item and option snapshots and the promo application in one transaction
+with a fixed number of statements, whatever the size of the cart. Promo
+codes come from the in-process index of apps.commerces.promos.
+"""
+# Python modules
+from decimal import Decimal
+
+# Django modules
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Prefetch
+
+# Project modules
+from apps.catalogs.models import MenuItem, ItemOption
+from apps.commerces import promos
+from apps.commerces.models import Order, OrderItem, OrderItemOption
+
+
+def load_menu_items(restaurant_id, menu_item_ids):
+    """Available menu items of the restaurant with their alive options, in 2 queries."""
+    menu_items = (
+        MenuItem.objects.filter(restaurant_id=restaurant_id, pk__in=menu_item_ids, is_available=True)
+        .prefetch_related(
+            Prefetch(
+                "itemoption_set",
+                queryset=ItemOption.objects.filter(option__deleted_at__isnull=True).select_related("option"),
+                to_attr="alive_item_options",
+            )
+        )
+    )
+    return {menu_item.pk: menu_item for menu_item in menu_items}
+
+
+def _parse_line(number, line):
+    """(menu item pk, quantity, {option pks}) of a cart line, ValidationError if malformed."""
+    try:
+        menu_item_id = int(line["menu_item"])
+        quantity = int(line.get("quantity", 1))
+        option_ids = {int(option_id) for option_id in line.get("options", ())}
+    except (KeyError, TypeError, ValueError, AttributeError):
+        raise ValidationError(
+            f"Cart line {number} must be {{\"menu_item\": <id>, \"quantity\": <int>, \"options\": [<id>, ...]}}."
+        ) from None
+    return menu_item_id, quantity, option_ids
+
+
+def price_cart(restaurant_id, lines):
+    """
+    Validate cart lines and return (priced lines, subtotal).
+    A priced line is (menu_item, quantity, [item options], line_total).
+    """
+    if not lines:
+        raise ValidationError("The cart is empty.")
+    parsed = [_parse_line(number, line) for number, line in enumerate(lines, 1)]
+    menu_items = load_menu_items(restaurant_id, {menu_item_id for menu_item_id, _, _ in parsed})
+
+    priced, subtotal = [], Decimal("0.00")
+    for menu_item_id, quantity, chosen in parsed:
+        menu_item = menu_items.get(menu_item_id)
+        if menu_item is None:
+            raise ValidationError(f"Menu item {menu_item_id} is not available in this restaurant.")
+        if quantity < 1:
+            raise ValidationError(f"Invalid quantity for {menu_item.name}.")
+
+        available = {item_option.option_id: item_option for item_option in menu_item.alive_item_options}
+        unknown = chosen - available.keys()
+        if unknown:
+            raise ValidationError(f"Options {sorted(unknown)} are not available for {menu_item.name}.")
+        missing = [io.option.name for io in available.values() if io.option.is_required and io.option_id not in chosen]
+        if missing:
+            raise ValidationError(f"{menu_item.name} requires options: {', '.join(missing)}.")
+
+        item_options = [available[option_id] for option_id in sorted(chosen)]
+        unit_price = menu_item.base_price + sum((io.price_delta for io in item_options), Decimal("0.00"))
+        line_total = unit_price * quantity
+        priced.append((menu_item, quantity, item_options, line_total))
+        subtotal += line_total
+    return priced, subtotal
+
+
+def place_order(user, restaurant_id, lines, address=None, promo_code=None):
+    """
+    Create an order from cart lines and return it.
+    Raises ValidationError and writes nothing if the cart or promo is invalid.
+    """
+    with transaction.atomic():
+        priced, subtotal = price_cart(restaurant_id, lines)
+        discount = Decimal("0.00")
+        promo = None
+        if promo_code:
+            promo = promos.lookup(promo_code)
+            discount = promos.discount(promo, subtotal)
+
+        order = Order.objects.create(
+            user=user,
+            restaurant_id=restaurant_id,
+            address=address,
+            subtotal=subtotal,
+            discount_total=discount,
+            total=subtotal - discount,
+        )
+        order_items = OrderItem.objects.bulk_create([
+            OrderItem(
+                order=order,
+                menu_item=menu_item,
+                item_name=menu_item.name,
+                item_price=menu_item.base_price,
+                quantity=quantity,
+                line_total=line_total,
+            )
+            for menu_item, quantity, _, line_total in priced
+        ])
+        item_options = [
+            OrderItemOption(order_item=order_item, option_name=io.option.name, price_delta=io.price_delta)
+            for order_item, (_, _, options, _) in zip(order_items, priced)
+            for io in options
+        ]
+        if item_options:
+            OrderItemOption.objects.bulk_create(item_options)
+        if promo is not None:
+            # last: a limited code's row stays locked until the commit
+            promos.redeem(promo, user, order, subtotal)
+    return order
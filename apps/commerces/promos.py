@@ -0,0 +1,169 @@
+"""
+Promo codes at checkout.
+
+lookup() resolves a code from an in-process index of the active codes,
+so a checkout does not query PromoCode. The index remembers the version
+stamp it was built under: the receivers in apps.commerces.signals bump
+the stamp in the PROMO_CACHE_ALIAS cache when a PromoCode changes (on
+commit), and a process rebuilds its index on the next lookup that sees
+another stamp, or after PROMO_INDEX_TTL seconds anyway (a locmem cache
+is per process).
+
+redeem() enforces the limits with conditional UPDATEs instead of
+read-modify-write:
+
+    PromoCodeUsage  uses = uses + 1
+                    WHERE uses < max_uses_per_user
+    PromoCode       used_count = used_count + 1
+                    WHERE used_count < max_uses AND is_active
+                    AND discount_percent = <the percent applied>
+
+A refused UPDATE rolls the order back with a ValidationError. The code's
+row is written for codes with max_uses only, as the last statement of
+the checkout, so a code on thousands of checkouts a minute holds its row
+lock for the commit alone. An unlimited code is never written: redeem()
+checks it with an indexed EXISTS on the same is_active and percent
+conditions instead. Either way a stale index (e.g. a per-process locmem
+cache that has not seen the bump yet) never applies a deactivated code
+or an old discount.
+
+Uses are not given back when an order is deleted.
+"""
+# Python modules
+import time
+from collections import namedtuple
+from decimal import Decimal, ROUND_HALF_UP
+
+# Django modules
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+# Project modules
+from apps.abstracts.routers import use_primary
+from apps.commerces.models import PromoCode, PromoCodeUsage, OrderPromo
+
+CENT = Decimal("0.01")
+VERSION_KEY = "promo:version"
+
+ActivePromo = namedtuple("ActivePromo", "pk code discount_percent max_uses max_uses_per_user")
+
+# (version, monotonic time to re-check, {code: ActivePromo})
+_index = (None, 0.0, {})
+
+
+def promo_cache():
+    return caches[settings.PROMO_CACHE_ALIAS]
+
+
+def _version():
+    cache = promo_cache()
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # start from a timestamp, so a lost version never matches an old index
+        cache.add(VERSION_KEY, time.time_ns(), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def _bump():
+    cache = promo_cache()
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.add(VERSION_KEY, time.time_ns(), None)
+
+
+def invalidate():
+    """Rebuild the index of every process once the transaction commits."""
+    transaction.on_commit(_bump)
+
+
+def _forget():
+    global _index
+    _index = (None, 0.0, {})
+
+
+def load_index():
+    """{code: ActivePromo} of the active codes, from the primary database."""
+    with use_primary():
+        rows = PromoCode.objects.filter(is_active=True).values_list(*ActivePromo._fields)
+        return {row[1]: ActivePromo(*row) for row in rows}
+
+
+def active_codes():
+    global _index
+    version, expires, codes = _index
+    # read before loading: a bump during the load is seen by the next lookup
+    current = _version()
+    if current != version or time.monotonic() >= expires:
+        codes = load_index()
+        _index = (current, time.monotonic() + settings.PROMO_INDEX_TTL, codes)
+    return codes
+
+
+def lookup(code):
+    """The active promo code named code, ValidationError otherwise."""
+    promo = active_codes().get(code)
+    if promo is None:
+        raise ValidationError(f"Promo code {code} is not valid.")
+    return promo
+
+
+def discount(promo, subtotal):
+    """The amount promo takes off subtotal, rounded half up to the cent."""
+    return min(subtotal, (subtotal * promo.discount_percent / 100).quantize(CENT, ROUND_HALF_UP))
+
+
+def _use_for_user(promo, user):
+    if promo.max_uses_per_user < 1:
+        return False
+    usages = PromoCodeUsage.objects.filter(promo_id=promo.pk, user=user, uses__lt=promo.max_uses_per_user)
+    if usages.update(uses=F("uses") + 1):
+        return True
+    try:
+        with transaction.atomic():
+            PromoCodeUsage.objects.create(promo_id=promo.pk, user=user, uses=1)
+        return True
+    except IntegrityError:
+        # the row exists: at the limit, or created concurrently
+        return bool(usages.update(uses=F("uses") + 1))
+
+
+def _use(promo):
+    return bool(
+        PromoCode.objects.filter(
+            pk=promo.pk,
+            is_active=True,
+            discount_percent=promo.discount_percent,
+            used_count__lt=F("max_uses"),
+        ).update(used_count=F("used_count") + 1)
+    )
+
+
+def _still_active(promo):
+    # read on the primary, the change may not have reached a replica
+    with use_primary():
+        return PromoCode.objects.filter(pk=promo.pk, is_active=True, discount_percent=promo.discount_percent).exists()
+
+
+def redeem(promo, user, order, subtotal):
+    """
+    Apply promo to an order written in the current transaction and return
+    the OrderPromo. Call it last in the transaction; raises
+    ValidationError if the code or the user's share of it is used up, or
+    the code changed since the index was built.
+    """
+    if promo.max_uses is None and not _still_active(promo):
+        _forget()
+        raise ValidationError(f"Promo code {promo.code} is no longer valid.")
+    if promo.max_uses_per_user is not None and not _use_for_user(promo, user):
+        raise ValidationError(f"Promo code {promo.code} has already been used.")
+    order_promo = OrderPromo.objects.create(order=order, promo_id=promo.pk, applied_amount=discount(promo, subtotal))
+    if promo.max_uses is not None and not _use(promo):
+        # used up, or the index is stale: reload it on the next lookup
+        _forget()
+        raise ValidationError(f"Promo code {promo.code} is no longer valid.")
+    return order_promo
@@ -0,0 +1,267 @@
+"""
+Daily sales rollups.
+
+RestaurantDailySales holds the order count and revenue (sum of totals) of
+done, alive orders per restaurant and day of created_at, and
+MenuItemDailySales the quantity and line totals per menu item and day;
+the average basket is revenue / order count. The receivers in
+apps.commerces.signals apply deltas in the transaction that marks an
+order done (or moves it back), soft deletes, restores or deletes it, so
+a report reads a few thousand rollup rows instead of every line item.
+
+Menu item rows outlive their menu item: a hard delete or purge sets
+their menu_item to NULL, and verify() and rebuild() leave those rows
+alone, they are history the orders can no longer reproduce.
+
+Queryset update(), bulk_create() and edits of the items or totals of an
+order that is already done send no order signals (recalculate_totals()
+keeps the rollups right itself): run
+`manage.py salesrollups --rebuild` (optionally over a date range) after
+such changes.
+"""
+# Python modules
+from datetime import datetime, time as dt_time, timedelta
+from decimal import Decimal
+from functools import reduce
+from operator import or_
+
+# Django modules
+from django.db import transaction
+from django.db.models import Case, Count, F, Max, Min, Q, Sum, Value, When
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+# Project modules
+from apps.commerces.models import Order, OrderItem, RestaurantDailySales, MenuItemDailySales
+
+ZERO = Decimal("0.00")
+# keys per statement, an OR of keys nests one level per key in SQLite
+CHUNK_SIZE = 200
+
+
+def counts(status, deleted_at):
+    """Whether an order in this state is in the rollups."""
+    return status == Order.STATUS_DONE and deleted_at is None
+
+
+def day_of(created_at):
+    # the day TruncDate() gives in SQL, in the current time zone
+    return timezone.localdate(created_at)
+
+
+def merge(*deltas):
+    """Sum delta dicts of (a, b) pairs key by key."""
+    merged = {}
+    for delta in deltas:
+        for key, (a, b) in delta.items():
+            old_a, old_b = merged.get(key, (0, ZERO))
+            merged[key] = (old_a + a, old_b + b)
+    return merged
+
+
+def _add(model, key_fields, value_fields, deltas):
+    """Add {key tuple: value tuple} deltas to the rows of model, CHUNK_SIZE keys per statement."""
+    deltas = [(key, values) for key, values in dict(deltas).items() if any(values)]
+    for start in range(0, len(deltas), CHUNK_SIZE):
+        chunk = deltas[start:start + CHUNK_SIZE]
+        # zero rows for the keys that gain, so one UPDATE covers every key; a
+        # missing row on decrement means it went away with its restaurant or
+        # menu item, or the rollups drifted (see verify())
+        model.objects.bulk_create(
+            [model(**dict(zip(key_fields, key))) for key, values in chunk if min(values) >= 0],
+            ignore_conflicts=True,
+        )
+        conditions = [(Q(**dict(zip(key_fields, key))), values) for key, values in chunk]
+        model.objects.filter(reduce(or_, (condition for condition, _ in conditions))).update(**{
+            field: F(field) + Case(
+                *(When(condition, then=Value(values[i])) for condition, values in conditions),
+                default=Value(0),
+                output_field=model._meta.get_field(field),
+            )
+            for i, field in enumerate(value_fields)
+        })
+
+
+def apply(restaurant_deltas=(), menu_item_deltas=()):
+    """
+    Apply deltas: {(restaurant_id, day): (orders, revenue)} to restaurant
+    rollups and {(menu_item_id, day): (quantity, revenue)} to menu item ones,
+    in a few statements whatever the number of keys.
+    """
+    _add(RestaurantDailySales, ("restaurant_id", "day"), ("order_count", "revenue"), restaurant_deltas)
+    _add(MenuItemDailySales, ("menu_item_id", "day"), ("quantity", "revenue"), menu_item_deltas)
+
+
+# ----------------------------------------------
+# Contributions
+#
+def _restaurant_rows(orders):
+    return (
+        orders.annotate(day=TruncDate("created_at"))
+        .order_by()
+        .values("restaurant_id", "day")
+        .annotate(orders=Count("pk"), revenue=Sum("total"))
+    )
+
+
+def _menu_item_rows(items):
+    return (
+        items.filter(menu_item__isnull=False)
+        .annotate(day=TruncDate("order__created_at"))
+        .order_by()
+        .values("menu_item_id", "day")
+        .annotate(quantity=Sum("quantity"), revenue=Sum("line_total"))
+    )
+
+
+def contributions(order_ids, sign=1):
+    """
+    Deltas that add (sign=1) or remove (sign=-1) orders, as apply() takes
+    them. Items count if they are alive or were soft deleted together
+    with their order, so a soft deleted order is removed the way it was
+    counted.
+    """
+    orders = Order.all_objects.filter(pk__in=order_ids)
+    items = OrderItem.all_objects.filter(order__in=orders).filter(
+        Q(deleted_at__isnull=True) | Q(deleted_at=F("order__deleted_at")),
+    )
+    restaurants = {
+        (row["restaurant_id"], row["day"]): (sign * row["orders"], sign * row["revenue"])
+        for row in _restaurant_rows(orders)
+    }
+    menu_items = {
+        (row["menu_item_id"], row["day"]): (sign * row["quantity"], sign * row["revenue"])
+        for row in _menu_item_rows(items)
+    }
+    return restaurants, menu_items
+
+
+def add_orders(order_ids):
+    apply(*contributions(order_ids, 1))
+
+
+def remove_orders(order_ids):
+    apply(*contributions(order_ids, -1))
+
+
+# ----------------------------------------------
+# Reads
+#
+def restaurant_sales(restaurant_id, since=None, until=None):
+    """[{day, order_count, revenue, average_basket}] of a restaurant, days in [since, until)."""
+    rows = RestaurantDailySales.objects.filter(restaurant_id=restaurant_id).exclude(order_count=0)
+    if since:
+        rows = rows.filter(day__gte=since)
+    if until:
+        rows = rows.filter(day__lt=until)
+    return [
+        {"day": row.day, "order_count": row.order_count, "revenue": row.revenue, "average_basket": row.average_basket}
+        for row in rows.order_by("day")
+    ]
+
+
+def top_menu_items(restaurant_id, since=None, until=None, limit=10):
+    """[{menu_item_id, name, quantity, revenue}] best sellers of a restaurant, days in [since, until)."""
+    rows = MenuItemDailySales.objects.filter(menu_item__restaurant_id=restaurant_id)
+    if since:
+        rows = rows.filter(day__gte=since)
+    if until:
+        rows = rows.filter(day__lt=until)
+    return list(
+        rows.values("menu_item_id", name=F("menu_item__name"))
+        .annotate(quantity=Sum("quantity"), revenue=Sum("revenue"))
+        .filter(quantity__gt=0)
+        .order_by("-quantity", "menu_item_id")[:limit]
+    )
+
+
+# ----------------------------------------------
+# Verify / rebuild
+#
+def _midnight(day):
+    return timezone.make_aware(datetime.combine(day, dt_time.min))
+
+
+def _window(since, until):
+    """Done, alive orders created on days [since, until)."""
+    # datetime bounds, created_at__date would not use the created_at index
+    return Order.objects.filter(
+        status=Order.STATUS_DONE, created_at__gte=_midnight(since), created_at__lt=_midnight(until),
+    )
+
+
+def expected_rows(since, until):
+    """Rollups computed from the orders of days [since, until), as two dicts like apply() takes."""
+    orders = _window(since, until)
+    restaurants = {
+        (row["restaurant_id"], row["day"]): (row["orders"], row["revenue"])
+        for row in _restaurant_rows(orders)
+    }
+    menu_items = {
+        (row["menu_item_id"], row["day"]): (row["quantity"], row["revenue"])
+        for row in _menu_item_rows(OrderItem.objects.filter(order__in=orders))
+    }
+    return restaurants, menu_items
+
+
+def stored_rows(since, until):
+    """Rollups as stored for days [since, until), zero rows and deleted menu items left out."""
+    restaurants = {
+        (restaurant_id, day): (order_count, revenue)
+        for restaurant_id, day, order_count, revenue in RestaurantDailySales.objects
+        .filter(day__gte=since, day__lt=until)
+        .exclude(order_count=0, revenue=ZERO)
+        .values_list("restaurant_id", "day", "order_count", "revenue")
+    }
+    menu_items = {
+        (menu_item_id, day): (quantity, revenue)
+        for menu_item_id, day, quantity, revenue in MenuItemDailySales.objects
+        .filter(day__gte=since, day__lt=until, menu_item__isnull=False)
+        .exclude(quantity=0, revenue=ZERO)
+        .values_list("menu_item_id", "day", "quantity", "revenue")
+    }
+    return restaurants, menu_items
+
+
+def verify(since, until):
+    """Return [(kind, key, stored, expected)] for every rollup row of [since, until) that is off."""
+    mismatches = []
+    kinds = ("restaurant", "menu_item")
+    for kind, stored, expected in zip(kinds, stored_rows(since, until), expected_rows(since, until)):
+        for key in sorted(stored.keys() | expected.keys()):
+            if stored.get(key) != expected.get(key):
+                mismatches.append((kind, key, stored.get(key), expected.get(key)))
+    return mismatches
+
+
+def rebuild(since, until):
+    """Recompute the rollups of days [since, until) from the orders, returns the number of rows written."""
+    with transaction.atomic():
+        restaurants, menu_items = expected_rows(since, until)
+        RestaurantDailySales.objects.filter(day__gte=since, day__lt=until).delete()
+        MenuItemDailySales.objects.filter(day__gte=since, day__lt=until, menu_item__isnull=False).delete()
+        RestaurantDailySales.objects.bulk_create(
+            RestaurantDailySales(restaurant_id=restaurant_id, day=day, order_count=orders, revenue=revenue)
+            for (restaurant_id, day), (orders, revenue) in restaurants.items()
+        )
+        MenuItemDailySales.objects.bulk_create(
+            MenuItemDailySales(menu_item_id=menu_item_id, day=day, quantity=quantity, revenue=revenue)
+            for (menu_item_id, day), (quantity, revenue) in menu_items.items()
+        )
+    return len(restaurants) + len(menu_items)
+
+
+def rebuild_orders(orders, days=31):
+    """Rebuild the days the orders queryset was created on, returns the number of rows written."""
+    bounds = orders.aggregate(first=Min("created_at"), last=Max("created_at"))
+    if bounds["first"] is None:
+        return 0
+    since, until = day_of(bounds["first"]), day_of(bounds["last"]) + timedelta(days=1)
+    return sum(rebuild(start, end) for start, end in windows(since, until, days))
+
+
+def windows(since, until, days):
+    """[since, until) cut into chunks of days days."""
+    while since < until:
+        yield since, min(since + timedelta(days=days), until)
+        since += timedelta(days=days)
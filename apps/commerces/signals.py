@@ -0,0 +1,78 @@
+"""
+Keep the sales rollups in step with orders, and the promo code index of
+apps.commerces.promos with promo codes.
+
+A save compares the rolled up fields as stored (read in pre_save, so a
+stale instance, e.g. one soft deleted meanwhile, is not counted twice)
+with the saved values: the order count and revenue follow status,
+deleted_at, restaurant and total; menu item quantities follow the order
+in and out of the rollups.
+"""
+# Django modules
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+
+# Project modules
+from apps.abstracts.signals import soft_deleted, restored
+from apps.commerces import promos, rollups
+from apps.commerces.models import Order, PromoCode
+
+ORDER_FIELDS = ("status", "deleted_at", "restaurant_id", "created_at", "total")
+
+
+def _state(pk):
+    row = Order.all_objects.filter(pk=pk).values_list(*ORDER_FIELDS).first()
+    return tuple(row) if row else None
+
+
+def _order_delta(state, sign):
+    status, deleted_at, restaurant_id, created_at, total = state
+    if not rollups.counts(status, deleted_at):
+        return {}
+    return {(restaurant_id, rollups.day_of(created_at)): (sign, sign * total)}
+
+
+@receiver(pre_save, sender=Order)
+def load_order(sender, instance, **kwargs):
+    instance._rolled_up = None if instance._state.adding else _state(instance.pk)
+
+
+@receiver(post_save, sender=Order)
+def order_saved(sender, instance, created, update_fields, **kwargs):
+    old = None if created else instance._rolled_up
+    new = _state(instance.pk) if update_fields is not None else tuple(
+        getattr(instance, field) for field in ORDER_FIELDS
+    )
+    if old == new:
+        return
+    restaurants = rollups.merge(_order_delta(old, -1) if old else {}, _order_delta(new, 1))
+    was_counted = bool(old) and rollups.counts(*old[:2])
+    menu_items = {}
+    if was_counted != rollups.counts(*new[:2]):
+        _, menu_items = rollups.contributions([instance.pk], 1 if not was_counted else -1)
+    rollups.apply(restaurants, menu_items)
+
+
+@receiver(pre_delete, sender=Order)
+def order_deleted(sender, instance, **kwargs):
+    # restaurant deletes too: the items may be other restaurants' menu items, their rows stay
+    state = _state(instance.pk)
+    if state and rollups.counts(*state[:2]):
+        rollups.remove_orders([instance.pk])
+
+
+@receiver(soft_deleted, sender=Order)
+def orders_soft_deleted(sender, pks, **kwargs):
+    # only alive orders are soft deleted, the done ones were counted
+    rollups.remove_orders(Order.all_objects.filter(pk__in=pks, status=Order.STATUS_DONE).values("pk"))
+
+
+@receiver(restored, sender=Order)
+def orders_restored(sender, pks, **kwargs):
+    rollups.add_orders(Order.all_objects.filter(pk__in=pks, status=Order.STATUS_DONE).values("pk"))
+
+
+@receiver((post_save, post_delete, soft_deleted, restored), sender=PromoCode)
+def promo_code_changed(sender, **kwargs):
+    # usage counts are queryset updates and send nothing
+    promos.invalidate()
@@ -1,3 +1,194 @@
+# Python modules
+import csv
+import io
+import json
+from datetime import timedelta
+from decimal import Decimal
+
+# Django modules
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+# Project modules
+from apps.abstracts import jobs
+from apps.abstracts.instrumentation import query_budget
+from apps.abstracts.models import Job
+from apps.catalogs.models import Restaurant, MenuItem
+from apps.commerces import datagen, dispatch, rollups
+from apps.commerces.jobs import recalculate_order_totals
+from apps.commerces.models import (
+    Order, OrderItem, PromoCode, RestaurantDailySales, MenuItemDailySales,
+)
+from apps.commerces.orders import place_order
+from apps.commerces.totals import recalculate_totals
+
+
+def cart_of(restaurant, size=2):
+    """Cart lines of the first menu items of restaurant, required options picked."""
+    menu_items = MenuItem.objects.filter(restaurant=restaurant, is_available=True).prefetch_related("itemoption_set__option")
+    return [
+        {
+            "menu_item": menu_item.pk,
+            "quantity": 2,
+            "options": [io.option_id for io in menu_item.itemoption_set.all() if io.option.is_required],
+        }
+        for menu_item in menu_items[:size]
+    ]
+
+
+class CommercesTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        datagen.generate(2, seed=0)
+        cls.restaurant = Restaurant.objects.order_by("pk").first()
+        cls.customer = get_user_model().objects.get(pk=Order.objects.values_list("user_id", flat=True).first())
+        cls.staff = get_user_model().objects.create_superuser("staff", "staff@example.com", "staff")
+
+    def assertRollupsCorrect(self):
+        today = timezone.localdate()
+        self.assertEqual(rollups.verify(today - timedelta(days=400), today + timedelta(days=1)), [])
+
+
+class QueryBudgetTests(CommercesTestCase):
+    def test_order_history(self):
+        self.client.force_login(self.customer)
+        # session, user, orders, items
+        with query_budget(4):
+            response = self.client.get(reverse("order-history"))
+        self.assertEqual(response.status_code, 200)
+        orders = response.json()["orders"]
+        self.assertTrue(orders)
+        self.assertEqual(len({order["id"] for order in orders}), len(orders))
+
+    def test_export(self):
+        self.client.force_login(self.staff)
+        # session, user, then orders, items, options and promos per chunk
+        with query_budget(6):
+            response = self.client.get(reverse("export-orders"), {"format": "csv"})
+            content = b"".join(response.streaming_content).decode()
+        self.assertEqual(response.status_code, 200)
+        rows = list(csv.reader(io.StringIO(content)))
+        self.assertGreater(len(rows), 1)
+
+        with query_budget(6):
+            response = self.client.get(reverse("export-orders"), {"format": "ndjson", "restaurant": self.restaurant.pk})
+            lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), Order.objects.filter(restaurant=self.restaurant).count())
+        self.assertTrue(all(json.loads(line)["restaurant"]["id"] == self.restaurant.pk for line in lines))
+
+    def test_export_is_for_staff(self):
+        self.client.force_login(self.customer)
+        self.assertEqual(self.client.get(reverse("export-orders")).status_code, 403)
+
+    def test_restaurant_sales(self):
+        self.client.force_login(self.staff)
+        with query_budget(4):
+            response = self.client.get(reverse("restaurant-sales", args=[self.restaurant.pk]))
+        self.assertEqual(response.status_code, 200)
+        days = response.json()["days"]
+        done = Order.objects.filter(restaurant=self.restaurant, status=Order.STATUS_DONE).count()
+        self.assertEqual(sum(day["order_count"] for day in days), done)
+
+
+class PlaceOrderTests(CommercesTestCase):
+    def test_place_order(self):
+        cart = cart_of(self.restaurant)
+        order = place_order(self.customer, self.restaurant.pk, cart)
+        self.assertEqual(OrderItem.objects.filter(order=order).count(), len(cart))
+        self.assertEqual(order.total, order.subtotal)
+
+    def test_malformed_lines(self):
+        menu_item = cart_of(self.restaurant, 1)[0]["menu_item"]
+        for lines in (
+            [{"quantity": 1}],
+            [{"menu_item": menu_item, "quantity": "two"}],
+            [{"menu_item": menu_item, "options": 3}],
+            [{"menu_item": [menu_item]}],
+            ["not a line"],
+        ):
+            with self.subTest(lines=lines), self.assertRaises(ValidationError):
+                place_order(self.customer, self.restaurant.pk, lines)
+
+    def test_deactivated_unlimited_code_is_refused_before_the_index_notices(self):
+        # the receivers rebuild the promo index on commit
+        with self.captureOnCommitCallbacks(execute=True):
+            code = PromoCode.objects.create(code="ALWAYS10", discount_percent=Decimal("10"))
+        cart = cart_of(self.restaurant)
+        place_order(self.customer, self.restaurant.pk, cart, promo_code=code.code)
+        # update() sends no signal, the index of this process still has the code
+        PromoCode.objects.filter(pk=code.pk).update(is_active=False)
+        with self.assertRaises(ValidationError):
+            place_order(self.customer, self.restaurant.pk, cart, promo_code=code.code)
+
+
+class RollupTests(CommercesTestCase):
+    def done_order(self):
+        order = place_order(self.customer, self.restaurant.pk, cart_of(self.restaurant))
+        order.status = Order.STATUS_DONE
+        order.save()
+        return order
+
+    def test_generated_data(self):
+        self.assertTrue(RestaurantDailySales.objects.exists())
+        self.assertRollupsCorrect()
+
+    def test_done_soft_deleted_restored(self):
+        order = self.done_order()
+        self.assertRollupsCorrect()
+        order.soft_delete()
+        self.assertRollupsCorrect()
+        order.restore()
+        self.assertRollupsCorrect()
+
+    def test_recalculate_totals_of_done_orders(self):
+        done = Order.objects.filter(status=Order.STATUS_DONE, restaurant=self.restaurant)
+        # update() sends no signal: the stored totals are now off
+        OrderItem.objects.filter(order__in=done).update(item_price=Decimal("1.00"))
+        recalculate_totals(done)
+        self.assertRollupsCorrect()
+
+    def test_recalculate_order_totals_job(self):
+        done = Order.objects.filter(status=Order.STATUS_DONE)
+        OrderItem.objects.filter(order__in=done).update(item_price=Decimal("2.50"))
+        jobs.enqueue(recalculate_order_totals, queryset=done)
+        self.assertEqual(jobs.run(jobs.claim("test")), Job.STATUS_DONE)
+        self.assertRollupsCorrect()
+
+    def test_hard_deleted_menu_item_keeps_its_history(self):
+        row = MenuItemDailySales.objects.filter(menu_item__restaurant=self.restaurant, quantity__gt=0).first()
+        quantity = row.quantity
+        MenuItem.all_objects.filter(pk=row.menu_item_id).hard_delete()
+        row.refresh_from_db()
+        self.assertIsNone(row.menu_item_id)
+        self.assertEqual(row.quantity, quantity)
+        self.assertRollupsCorrect()
+
+
+class DispatchTests(CommercesTestCase):
+    def test_claim_and_advance_to_done(self):
+        token, pks = dispatch.claim("worker-1", Order.STATUS_NEW, limit=5)
+        self.assertTrue(pks)
+        self.assertEqual(len(set(Order.objects.filter(pk__in=pks).values_list("restaurant_id", flat=True))), 1)
+
+        # leased: another worker gets other orders
+        _, others = dispatch.claim("worker-2", Order.STATUS_NEW, limit=5)
+        self.assertFalse(set(pks) & set(others))
+
+        self.assertEqual(dispatch.advance(token, pks), len(pks))
+        restaurant_id = Order.objects.get(pk=pks[0]).restaurant_id
+        for status in (Order.STATUS_CONFIRMED, Order.STATUS_DELIVERING):
+            token, claimed = dispatch.claim("worker-1", status, restaurant_id=restaurant_id, limit=1000)
+            self.assertLessEqual(set(pks), set(claimed))
+            self.assertEqual(dispatch.advance(token, claimed), len(claimed))
+        self.assertEqual(Order.objects.filter(pk__in=pks, status=Order.STATUS_DONE).count(), len(pks))
+        # advance() adds the orders reaching done to the rollups
+        self.assertRollupsCorrect()
 
-# Create your tests here.
+    def test_expired_lease_is_not_advanced(self):
+        token, pks = dispatch.claim("worker-1", Order.STATUS_NEW, limit=3, lease=60)
+        Order.objects.filter(pk__in=pks).update(claimed_until=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(dispatch.advance(token, pks), 0)
+        self.assertFalse(Order.objects.filter(pk__in=pks).exclude(status=Order.STATUS_NEW).exists())
@@ -0,0 +1,82 @@
+"""
+Set-based recalculation of order totals.
+
+Totals are recomputed in SQL with correlated subqueries, a handful of
+UPDATE statements per call whatever the number of orders:
+
+    OrderItem.line_total  = (item_price + sum of alive option deltas) * quantity
+    Order.subtotal        = sum of alive line totals
+    OrderPromo.applied    = subtotal * discount_percent / 100, rounded half up
+                            (reapply_promos only)
+    Order.discount_total  = min(sum of alive applied amounts, subtotal)
+    Order.total           = subtotal - discount_total
+
+Done orders are in the daily sales rollups (apps.commerces.rollups) and
+send no signal here: their contributions are removed before the updates
+and added back after them, in the same transaction.
+"""
+# Python modules
+from decimal import Decimal
+
+# Django modules
+from django.db import transaction
+from django.db.models import DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Least, Round
+
+# Project modules
+from apps.commerces import rollups
+from apps.commerces.models import PromoCode, Order, OrderItem, OrderItemOption, OrderPromo
+
+MONEY = DecimalField(max_digits=10, decimal_places=2)
+ZERO = Value(Decimal("0.00"), output_field=MONEY)
+
+
+def _sum(queryset, fk_name, field_name):
+    """Correlated SUM(field_name) of queryset rows pointing at the outer row."""
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{fk_name: OuterRef("pk")})
+            .values(fk_name)
+            .annotate(total=Sum(field_name))
+            .values("total"),
+            output_field=MONEY,
+        ),
+        ZERO,
+    )
+
+
+def recalculate_totals(orders, reapply_promos=False):
+    """
+    Recompute line totals, subtotal, discount and total of the given orders.
+    orders is any Order queryset; it is evaluated as a subquery by every
+    statement, so it must not filter on the totals it recalculates.
+    Returns the number of orders updated.
+    """
+    order_ids = orders.values("pk")
+    # the orders the rollups count, the same set before and after the updates
+    counted = Order.all_objects.filter(pk__in=order_ids, status=Order.STATUS_DONE, deleted_at__isnull=True).values("pk")
+    with transaction.atomic():
+        rollups.remove_orders(counted)
+        OrderItem.objects.filter(order__in=order_ids).update(
+            line_total=Round(
+                (F("item_price") + _sum(OrderItemOption.objects, "order_item", "price_delta")) * F("quantity"),
+                2,
+            ),
+        )
+        Order.all_objects.filter(pk__in=order_ids).update(
+            subtotal=_sum(OrderItem.objects, "order", "line_total"),
+        )
+        if reapply_promos:
+            subtotal = Subquery(Order.all_objects.filter(pk=OuterRef("order_id")).values("subtotal"))
+            percent = Subquery(PromoCode.all_objects.filter(pk=OuterRef("promo_id")).values("discount_percent"))
+            OrderPromo.objects.filter(order__in=order_ids).update(
+                # 100.0 keeps SQLite from doing integer division on whole amounts
+                applied_amount=Round(subtotal * percent / Value(100.0), 2, output_field=MONEY),
+            )
+        discount = Least(_sum(OrderPromo.objects, "order", "applied_amount"), F("subtotal"))
+        updated = Order.all_objects.filter(pk__in=order_ids).update(
+            discount_total=discount,
+            total=F("subtotal") - discount,
+        )
+        rollups.add_orders(counted)
+    return updated
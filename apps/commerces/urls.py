@@ -0,0 +1,13 @@
+# Django modules
+from django.urls import path
+
+# Project modules
+from apps.commerces import views
+
+urlpatterns = [
+    path("orders/", views.order_history, name="order-history"),
+    path("orders/async/", views.async_order_history, name="async-order-history"),
+    path("orders/export/", views.export_orders, name="export-orders"),
+    path("orders/export/async/", views.async_export_orders, name="async-export-orders"),
+    path("restaurants/<int:restaurant_id>/sales/", views.restaurant_sales, name="restaurant-sales"),
+]
@@ -1,3 +1,199 @@
-from django.shortcuts import render
+# Django modules
+from django.db.models import Prefetch
+from django.http import HttpRequest, JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.views.decorators.http import require_GET
 
-# Create your views here.
+# Project modules
+from apps.commerces import export, rollups
+from apps.commerces.models import Order, OrderItem
+
+ORDER_HISTORY_LIMIT = 20
+
+
+def _order_history(user, before):
+    orders = (
+        Order.objects.filter(user=user)
+        .select_related("restaurant")
+        .prefetch_related(Prefetch("items", queryset=OrderItem.objects.order_by("pk")))
+        .order_by("-pk")
+    )
+    if before is not None:
+        orders = orders.filter(pk__lt=before)
+    return orders[:ORDER_HISTORY_LIMIT]
+
+
+def _serialize_orders(orders):
+    return {
+        "orders": [
+            {
+                "id": order.pk,
+                "restaurant": {"id": order.restaurant_id, "name": order.restaurant.name},
+                "status": order.status,
+                "subtotal": order.subtotal,
+                "discount_total": order.discount_total,
+                "total": order.total,
+                "created_at": order.created_at,
+                "items": [
+                    {"name": item.item_name, "price": item.item_price, "quantity": item.quantity, "line_total": item.line_total}
+                    for item in order.items.all()
+                ],
+            }
+            for order in orders
+        ],
+        # cursor of the next page
+        "before": orders[-1].pk if len(orders) == ORDER_HISTORY_LIMIT else None,
+    }
+
+
+def _before(request):
+    value = request.GET.get("before")
+    return int(value) if value and value.isdigit() else None
+
+
+@require_GET
+def order_history(request: HttpRequest) -> JsonResponse:
+    """
+    Return the orders of the signed in user, newest first.
+
+    Parameters:
+        request: HttpRequest
+            The request object, ?before=<order id> for the next page.
+
+    Returns:
+        JsonResponse
+            Up to ORDER_HISTORY_LIMIT orders with their items, read in
+            three queries.
+    """
+
+    if not request.user.is_authenticated:
+        return JsonResponse({"detail": "Authentication required."}, status=401)
+    orders = list(_order_history(request.user, _before(request)))
+    return JsonResponse(_serialize_orders(orders))
+
+
+@require_GET
+async def async_order_history(request: HttpRequest) -> JsonResponse:
+    """
+    order_history() as a native async view, for settings/asgi.py.
+
+    Parameters:
+        request: HttpRequest
+            The request object, ?before=<order id> for the next page.
+
+    Returns:
+        JsonResponse
+            The same page of orders.
+    """
+
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({"detail": "Authentication required."}, status=401)
+    orders = [order async for order in _order_history(user, _before(request))]
+    return JsonResponse(_serialize_orders(orders))
+
+
+def _export_params(request):
+    """(format, orders queryset) from the query string, ValueError if invalid."""
+    fmt = request.GET.get("format", "csv")
+    if fmt not in export.FORMATS:
+        raise ValueError(f"Unknown format {fmt!r}, expected one of {', '.join(export.FORMATS)}.")
+    try:
+        restaurant_ids = [int(value) for value in request.GET.getlist("restaurant")]
+        statuses = [int(value) for value in request.GET.getlist("status")]
+    except ValueError:
+        raise ValueError("restaurant and status must be integers.")
+    if any(status not in Order.STATUS_CHOICES for status in statuses):
+        raise ValueError(f"status must be one of {', '.join(map(str, Order.STATUS_CHOICES))}.")
+    since = export.parse_date(request.GET["since"]) if request.GET.get("since") else None
+    until = export.parse_date(request.GET["until"]) if request.GET.get("until") else None
+    return fmt, export.orders(restaurant_ids, statuses, since, until)
+
+
+def _export_response(content, fmt):
+    response = StreamingHttpResponse(content, content_type=export.CONTENT_TYPES[fmt])
+    response["Content-Disposition"] = f'attachment; filename="orders-{timezone.now():%Y%m%d-%H%M%S}.{fmt}"'
+    return response
+
+
+@require_GET
+def export_orders(request: HttpRequest) -> StreamingHttpResponse:
+    """
+    Stream orders with their items, options and promos, for staff.
+
+    Parameters:
+        request: HttpRequest
+            The request object: ?format=csv|ndjson, ?restaurant=<id> and
+            ?status=<status> (both repeatable), ?since= and ?until=
+            (YYYY-MM-DD, until excluded).
+
+    Returns:
+        StreamingHttpResponse
+            The export, read chunk by chunk while it is sent.
+    """
+
+    if not request.user.is_staff:
+        return JsonResponse({"detail": "Staff only."}, status=403)
+    try:
+        fmt, orders = _export_params(request)
+    except ValueError as exc:
+        return JsonResponse({"detail": str(exc)}, status=400)
+    return _export_response(export.export(orders, fmt), fmt)
+
+
+@require_GET
+async def async_export_orders(request: HttpRequest) -> StreamingHttpResponse:
+    """
+    export_orders() as a native async view, for settings/asgi.py: an
+    async iterator, so the ASGI handler does not buffer the export.
+
+    Parameters:
+        request: HttpRequest
+            The request object, same parameters as export_orders().
+
+    Returns:
+        StreamingHttpResponse
+            The export, read chunk by chunk while it is sent.
+    """
+
+    user = await request.auser()
+    if not user.is_staff:
+        return JsonResponse({"detail": "Staff only."}, status=403)
+    try:
+        fmt, orders = _export_params(request)
+    except ValueError as exc:
+        return JsonResponse({"detail": str(exc)}, status=400)
+    return _export_response(export.aexport(orders, fmt), fmt)
+
+
+@require_GET
+def restaurant_sales(request: HttpRequest, restaurant_id: int) -> JsonResponse:
+    """
+    Daily sales and best selling menu items of a restaurant, for staff,
+    read from the rollup tables.
+
+    Parameters:
+        request: HttpRequest
+            The request object: ?since= and ?until= (YYYY-MM-DD, until
+            excluded).
+        restaurant_id: int
+            The restaurant.
+
+    Returns:
+        JsonResponse
+            {"days": [...], "top_menu_items": [...]}.
+    """
+
+    if not request.user.is_staff:
+        return JsonResponse({"detail": "Staff only."}, status=403)
+    try:
+        since = export.parse_date(request.GET["since"]).date() if request.GET.get("since") else None
+        until = export.parse_date(request.GET["until"]).date() if request.GET.get("until") else None
+    except ValueError as exc:
+        return JsonResponse({"detail": str(exc)}, status=400)
+    return JsonResponse(
+        {
+            "days": rollups.restaurant_sales(restaurant_id, since, until),
+            "top_menu_items": rollups.top_menu_items(restaurant_id, since, until),
+        }
+    )
@@ -0,0 +1,151 @@
+"""
+Denormalized task counters.
+
+ProjectTaskCounter holds the number of alive tasks per (project, status)
+and AssigneeTaskCounter the same per assignee. The receivers in
+apps.tasks.signals apply +1/-1 deltas in the transaction that creates,
+moves, soft deletes or reassigns a task, so a dashboard reads a few counter
+rows instead of grouping every task of the project.
+
+Queryset update() and bulk_create() send no signals: run
+`manage.py taskcounters --rebuild` after such bulk changes.
+"""
+# Python modules
+import logging
+from collections import Counter, defaultdict
+
+# Django modules
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+
+# Project modules
+from apps.tasks.models import Task, UserTask, ProjectTaskCounter, AssigneeTaskCounter
+
+logger = logging.getLogger(__name__)
+
+
+def task_key(project_id, status, deleted_at):
+    """(project_id, status) a task counts under, None if it does not count."""
+    if deleted_at is not None:
+        return None
+    return project_id, status
+
+
+def _add(model, delta, **key):
+    if not delta:
+        return
+    if model.objects.filter(**key).update(count=F("count") + delta):
+        return
+    if delta < 0:
+        # the row went away with its project or user, or the counters
+        # drifted (see verify())
+        logger.warning("No %s row for %s to subtract %d from.", model.__name__, key, -delta)
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(count=delta, **key)
+    except IntegrityError:
+        # created concurrently
+        model.objects.filter(**key).update(count=F("count") + delta)
+
+
+def apply(project_deltas=(), assignee_deltas=()):
+    """
+    Apply Counter deltas: {(project_id, status): n} to project counters and
+    {(project_id, user_id, status): n} to assignee counters.
+    """
+    for (project_id, status), delta in dict(project_deltas).items():
+        _add(ProjectTaskCounter, delta, project_id=project_id, status=status)
+    for (project_id, user_id, status), delta in dict(assignee_deltas).items():
+        _add(AssigneeTaskCounter, delta, project_id=project_id, user_id=user_id, status=status)
+
+
+# ----------------------------------------------
+# Reads
+#
+def project_status_counts(project_id):
+    """{status: number of alive tasks} of a project, every status included."""
+    counts = dict.fromkeys(Task.STATUS_CHOICES, 0)
+    rows = ProjectTaskCounter.objects.filter(project_id=project_id).values_list("status", "count")
+    counts.update(rows)
+    return counts
+
+
+def assignee_status_counts(project_id):
+    """{user_id: {status: number of alive tasks}} of a project's assignees."""
+    counts = defaultdict(lambda: dict.fromkeys(Task.STATUS_CHOICES, 0))
+    rows = AssigneeTaskCounter.objects.filter(project_id=project_id, count__gt=0)
+    for user_id, status, count in rows.values_list("user_id", "status", "count"):
+        counts[user_id][status] = count
+    return dict(counts)
+
+
+# ----------------------------------------------
+# Verify / rebuild
+#
+def _scope(queryset, project_ids, field="project_id"):
+    return queryset.filter(**{f"{field}__in": project_ids}) if project_ids is not None else queryset
+
+
+def expected_counts(project_ids=None):
+    """Counters computed from the tasks, as (project Counter, assignee Counter)."""
+    tasks = _scope(Task.objects.filter(deleted_at__isnull=True), project_ids)
+    projects = Counter({
+        (row["project_id"], row["status"]): row["total"]
+        for row in tasks.order_by().values("project_id", "status").annotate(total=Count("pk"))
+    })
+    assignments = _scope(
+        UserTask.objects.filter(deleted_at__isnull=True, task__deleted_at__isnull=True),
+        project_ids,
+        field="task__project_id",
+    )
+    assignees = Counter({
+        (row["task__project_id"], row["user_id"], row["task__status"]): row["total"]
+        for row in assignments.order_by()
+        .values("task__project_id", "user_id", "task__status")
+        .annotate(total=Count("pk"))
+    })
+    return projects, assignees
+
+
+def stored_counts(project_ids=None):
+    """Counters as stored, zero rows left out."""
+    projects = Counter({
+        (project_id, status): count
+        for project_id, status, count in _scope(ProjectTaskCounter.objects.exclude(count=0), project_ids)
+        .values_list("project_id", "status", "count")
+    })
+    assignees = Counter({
+        (project_id, user_id, status): count
+        for project_id, user_id, status, count in _scope(AssigneeTaskCounter.objects.exclude(count=0), project_ids)
+        .values_list("project_id", "user_id", "status", "count")
+    })
+    return projects, assignees
+
+
+def verify(project_ids=None):
+    """Return [(kind, key, stored, expected)] for every counter that is off."""
+    mismatches = []
+    kinds = ("project", "assignee")
+    for kind, stored, expected in zip(kinds, stored_counts(project_ids), expected_counts(project_ids)):
+        for key in sorted(stored.keys() | expected.keys()):
+            if stored[key] != expected[key]:
+                mismatches.append((kind, key, stored[key], expected[key]))
+    return mismatches
+
+
+def rebuild(project_ids=None):
+    """Recompute the counters from the tasks, returns the number of rows written."""
+    with transaction.atomic():
+        projects, assignees = expected_counts(project_ids)
+        _scope(ProjectTaskCounter.objects.all(), project_ids).delete()
+        _scope(AssigneeTaskCounter.objects.all(), project_ids).delete()
+        ProjectTaskCounter.objects.bulk_create(
+            ProjectTaskCounter(project_id=project_id, status=status, count=count)
+            for (project_id, status), count in projects.items()
+        )
+        AssigneeTaskCounter.objects.bulk_create(
+            AssigneeTaskCounter(project_id=project_id, user_id=user_id, status=status, count=count)
+            for (project_id, user_id, status), count in assignees.items()
+        )
+    return len(projects) + len(assignees)
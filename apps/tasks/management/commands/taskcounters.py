@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.tasks import counters
+
+
+class Command(BaseCommand):
+    help = "Verify the denormalized task counters against the tasks, or rebuild them."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rebuild", action="store_true", help="Recompute the counters instead of verifying them.")
+        parser.add_argument("--project", type=int, action="append", default=None, help="Project id, can be repeated.")
+
+    def handle(self, *args, **options):
+        project_ids = options["project"]
+        if options["rebuild"]:
+            rows = counters.rebuild(project_ids)
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt task counters ({rows} rows)."))
+            return
+
+        mismatches = counters.verify(project_ids)
+        for kind, key, stored, expected in mismatches:
+            self.stdout.write(f"  {kind} {key}: stored {stored}, expected {expected}")
+        if mismatches:
+            raise CommandError(f"{len(mismatches)} task counters are off, run with --rebuild.")
+        self.stdout.write(self.style.SUCCESS("Task counters are correct."))
@@ -0,0 +1,69 @@
+# Generated by Django 5.0 on 2026-10-18 13:35
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_counters(apps, schema_editor):
+    # apps.tasks.counters.rebuild(), with the historical models
+    Task = apps.get_model("tasks", "Task")
+    UserTask = apps.get_model("tasks", "UserTask")
+    ProjectTaskCounter = apps.get_model("tasks", "ProjectTaskCounter")
+    AssigneeTaskCounter = apps.get_model("tasks", "AssigneeTaskCounter")
+    using = schema_editor.connection.alias
+
+    tasks = Task._base_manager.using(using).filter(deleted_at__isnull=True)
+    ProjectTaskCounter._base_manager.using(using).bulk_create(
+        ProjectTaskCounter(project_id=row["project_id"], status=row["status"], count=row["total"])
+        for row in tasks.order_by().values("project_id", "status").annotate(total=Count("pk"))
+    )
+    assignments = UserTask._base_manager.using(using).filter(deleted_at__isnull=True, task__deleted_at__isnull=True)
+    AssigneeTaskCounter._base_manager.using(using).bulk_create(
+        AssigneeTaskCounter(
+            project_id=row["task__project_id"], user_id=row["user_id"], status=row["task__status"], count=row["total"],
+        )
+        for row in assignments.order_by()
+        .values("task__project_id", "user_id", "task__status")
+        .annotate(total=Count("pk"))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AssigneeTaskCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.IntegerField(choices=[(1, 'To Do'), (2, 'In Progress'), (3, 'Done')])),
+                ('count', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='task_counters', to=settings.AUTH_USER_MODEL)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='assignee_task_counters', to='tasks.project')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ProjectTaskCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.IntegerField(choices=[(1, 'To Do'), (2, 'In Progress'), (3, 'Done')])),
+                ('count', models.IntegerField(default=0)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='task_counters', to='tasks.project')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='assigneetaskcounter',
+            constraint=models.UniqueConstraint(fields=('project', 'user', 'status'), name='unique_assignee_task_counter'),
+        ),
+        migrations.AddConstraint(
+            model_name='projecttaskcounter',
+            constraint=models.UniqueConstraint(fields=('project', 'status'), name='unique_project_task_counter'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -7,6 +7,7 @@ from django.db.models import (
     DateTimeField,
     TextField,
     IntegerField,
+    BigIntegerField,
     ForeignKey,
     ManyToManyField,
     UniqueConstraint,
@@ -14,8 +15,11 @@ from django.db.models import (
     CASCADE,
 )
 from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.db import router, transaction
 
 # Project modules
+from apps.tasks.tree import TaskQuerySet
 
 
 class Project(Model):
@@ -112,6 +116,19 @@ class Task(Model):
         blank=True,
     )
 
+    objects = TaskQuerySet.as_manager()
+
+    def save(self, *args, **kwargs):
+        # task counters are updated by post_save, inside the same transaction
+        with transaction.atomic(using=kwargs.get("using") or router.db_for_write(Task, instance=self)):
+            super().save(*args, **kwargs)
+
+    def clean(self):
+        # a task moved under one of its own subtasks would orphan the branch,
+        # deleted ones too: a restore would bring the cycle back
+        if self.pk and self.parent_id and Task.objects.subtree(self, alive=False).filter(pk=self.parent_id).exists():
+            raise ValidationError({"parent": "A task cannot be moved under its own subtask."})
+
 
 class UserTask(Model):
     """
@@ -147,3 +164,88 @@ class UserTask(Model):
                 name="unique_task_user",
             ),
         ]
+
+    def save(self, *args, **kwargs):
+        # task counters are updated by post_save, inside the same transaction
+        with transaction.atomic(using=kwargs.get("using") or router.db_for_write(UserTask, instance=self)):
+            super().save(*args, **kwargs)
+
+
+class ProjectTaskCounter(Model):
+    """
+    Number of alive tasks of a project in a status,
+    maintained by apps.tasks.counters.
+    """
+
+    project = ForeignKey(
+        to=Project,
+        on_delete=CASCADE,
+        related_name="task_counters",
+    )
+    status = IntegerField(
+        choices=Task.STATUS_CHOICES,
+    )
+    count = IntegerField(
+        default=0,
+    )
+
+    class Meta:
+        """Customization of the model's meta data."""
+
+        constraints = [
+            UniqueConstraint(
+                fields=["project", "status"],
+                name="unique_project_task_counter",
+            ),
+        ]
+
+
+class AssigneeTaskCounter(Model):
+    """
+    Number of alive tasks of a project in a status assigned to a user,
+    maintained by apps.tasks.counters.
+    """
+
+    project = ForeignKey(
+        to=Project,
+        on_delete=CASCADE,
+        related_name="assignee_task_counters",
+    )
+    user = ForeignKey(
+        to=User,
+        on_delete=CASCADE,
+        related_name="task_counters",
+    )
+    status = IntegerField(
+        choices=Task.STATUS_CHOICES,
+    )
+    count = IntegerField(
+        default=0,
+    )
+
+    class Meta:
+        """Customization of the model's meta data."""
+
+        constraints = [
+            UniqueConstraint(
+                fields=["project", "user", "status"],
+                name="unique_assignee_task_counter",
+            ),
+        ]
+
+
+class NamedCounter(Model):
+    """
+    Shared counter (hits and the like),
+    written through apps.tasks.named_counters.
+    """
+
+    NAME_MAX_LEN = 100
+
+    name = CharField(
+        max_length=NAME_MAX_LEN,
+        unique=True,
+    )
+    value = BigIntegerField(
+        default=0,
+    )
@@ -0,0 +1,218 @@
+"""
+Named counters shared by every worker process.
+
+The backend is chosen with settings.COUNTER_BACKEND:
+
+    DatabaseCounterBackend   every increment is one UPDATE ... SET value =
+                             value + n, atomic across processes.
+    BufferedCounterBackend   increments are summed in memory and written
+                             every COUNTER_FLUSH_INTERVAL seconds or
+                             COUNTER_FLUSH_SIZE increments, one UPDATE per
+                             counter. incr() answers from the value read
+                             at the last flush plus the local deltas, so
+                             it lags other processes by up to one flush.
+                             A daemon thread flushes every
+                             COUNTER_FLUSH_INTERVAL seconds even when no
+                             increment comes, and atexit flushes on a clean
+                             exit: a killed process loses at most the
+                             increments of its last interval. A failed
+                             flush keeps the deltas and is logged; the
+                             thread then waits twice as long each time,
+                             up to FLUSH_BACKOFF_MAX seconds.
+"""
+# Python modules
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from functools import lru_cache
+
+# Django modules
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import F
+from django.utils.module_loading import import_string
+
+# Project modules
+from apps.abstracts.routers import use_primary
+from apps.tasks.models import NamedCounter
+
+logger = logging.getLogger(__name__)
+
+FLUSH_BACKOFF_MAX = 300
+
+
+class BaseCounterBackend:
+    def incr(self, name, delta=1):
+        """Add delta to the counter, returns its new value."""
+        raise NotImplementedError
+
+    def get(self, name):
+        raise NotImplementedError
+
+    def reset(self, name):
+        raise NotImplementedError
+
+    async def aincr(self, name, delta=1):
+        return await sync_to_async(self.incr)(name, delta)
+
+    async def aget(self, name):
+        return await sync_to_async(self.get)(name)
+
+    async def areset(self, name):
+        return await sync_to_async(self.reset)(name)
+
+
+class DatabaseCounterBackend(BaseCounterBackend):
+    def add(self, deltas):
+        """Apply {name: delta} in one transaction, returns {name: new value}."""
+        with transaction.atomic():
+            # a fixed order, so concurrent flushes lock rows in the same order
+            for name, delta in sorted(deltas.items()):
+                self._add(name, delta)
+            return dict(NamedCounter.objects.filter(name__in=deltas).values_list("name", "value"))
+
+    def _add(self, name, delta):
+        if NamedCounter.objects.filter(name=name).update(value=F("value") + delta):
+            return
+        try:
+            with transaction.atomic():
+                NamedCounter.objects.create(name=name, value=delta)
+        except IntegrityError:
+            # created concurrently
+            NamedCounter.objects.filter(name=name).update(value=F("value") + delta)
+
+    def incr(self, name, delta=1):
+        with transaction.atomic():
+            self._add(name, delta)
+            # the UPDATE holds the row lock, nobody can change it in between
+            return self.get(name)
+
+    def get(self, name):
+        # replicas lag behind, counters are exact
+        with use_primary():
+            value = NamedCounter.objects.filter(name=name).values_list("value", flat=True).first()
+        return value or 0
+
+    def reset(self, name):
+        NamedCounter.objects.filter(name=name).update(value=0)
+
+
+class BufferedCounterBackend(BaseCounterBackend):
+    def __init__(self, flush_interval=None, flush_size=None):
+        self.flush_interval = settings.COUNTER_FLUSH_INTERVAL if flush_interval is None else flush_interval
+        self.flush_size = settings.COUNTER_FLUSH_SIZE if flush_size is None else flush_size
+        self.database = DatabaseCounterBackend()
+        self.pending = Counter()
+        self.pending_count = 0
+        # values as of the last flush or read
+        self.values = {}
+        self.flushed_at = time.monotonic()
+        self.lock = threading.Lock()
+        # pid of the process the flush thread runs in, a forked child starts its own
+        self.flusher_pid = None
+        atexit.register(self.flush)
+
+    def _start_flusher(self):
+        # under the lock; started on the first increment, not at import
+        if self.flusher_pid == os.getpid() or self.flush_interval <= 0:
+            return
+        self.flusher_pid = os.getpid()
+        threading.Thread(target=self._flush_periodically, name="counter-flush", daemon=True).start()
+
+    def _flush_periodically(self):
+        failures = 0
+        delay = self.flush_interval
+        while True:
+            time.sleep(delay)
+            close_old_connections()
+            try:
+                self.flush()
+            except Exception:
+                # the deltas are kept, the next round tries again, later
+                failures += 1
+                delay = min(delay * 2, max(self.flush_interval, FLUSH_BACKOFF_MAX))
+                logger.exception(
+                    "Counter flush failed %d time(s) in a row, %d increments pending, next try in %.1fs.",
+                    failures, self.pending_count, delay,
+                )
+            else:
+                failures = 0
+                delay = self.flush_interval
+
+    def _add_pending(self, name, delta):
+        """Record a delta, returns the pending deltas and their count if a flush is due."""
+        with self.lock:
+            self._start_flusher()
+            self.pending[name] += delta
+            self.pending_count += 1
+            due = self.pending_count >= self.flush_size or time.monotonic() - self.flushed_at >= self.flush_interval
+            return self._take() if due else None
+
+    def _take(self):
+        taken = (self.pending, self.pending_count)
+        self.pending, self.pending_count = Counter(), 0
+        self.flushed_at = time.monotonic()
+        return taken
+
+    def _write(self, pending, count):
+        try:
+            values = self.database.add(pending)
+        except Exception:
+            # keep the deltas for the next flush; count is the number of
+            # increments taken, so pending_count is back where it was plus
+            # whatever came in since, not once per counter
+            with self.lock:
+                self.pending.update(pending)
+                self.pending_count += count
+            raise
+        with self.lock:
+            self.values.update(values)
+
+    def _local(self, name):
+        # value without a query, None if never read
+        with self.lock:
+            if name not in self.values:
+                return None
+            return self.values[name] + self.pending[name]
+
+    def flush(self):
+        """Write pending deltas now."""
+        with self.lock:
+            pending, count = self._take()
+        if pending:
+            self._write(pending, count)
+
+    def incr(self, name, delta=1):
+        taken = self._add_pending(name, delta)
+        if taken:
+            self._write(*taken)
+        value = self._local(name)
+        return self.get(name) if value is None else value
+
+    def get(self, name):
+        value = self.database.get(name)
+        with self.lock:
+            self.values[name] = value
+            return value + self.pending[name]
+
+    def reset(self, name):
+        with self.lock:
+            self.pending.pop(name, None)
+            self.values[name] = 0
+        self.database.reset(name)
+
+    async def aincr(self, name, delta=1):
+        taken = self._add_pending(name, delta)
+        if taken:
+            await sync_to_async(self._write)(*taken)
+        value = self._local(name)
+        return await self.aget(name) if value is None else value
+
+
+@lru_cache(maxsize=None)
+def get_backend():
+    return import_string(settings.COUNTER_BACKEND)()
@@ -0,0 +1,174 @@
+"""
+Keep the task counters in step with tasks and assignments.
+
+Instances remember the counted fields as loaded (post_init), so a save
+only has to compare them with the new values to know which counters move.
+"""
+# Python modules
+from collections import Counter
+
+# Django modules
+from django.db.models import QuerySet
+from django.db.models.signals import post_init, pre_save, post_save, pre_delete, m2m_changed
+from django.dispatch import receiver
+
+# Project modules
+from apps.tasks import counters
+from apps.tasks.models import Project, Task, UserTask
+
+TASK_FIELDS = ("project_id", "status", "deleted_at")
+ASSIGNMENT_FIELDS = ("task_id", "user_id", "deleted_at")
+
+
+def _loaded(instance, fields):
+    # read __dict__ so deferred fields are not fetched one query per row
+    values = instance.__dict__
+    if all(field in values for field in fields):
+        return tuple(values[field] for field in fields)
+    return None
+
+
+def _saved(instance, fields, old, update_fields):
+    """Values of fields in the row after a save with update_fields."""
+    if update_fields is None or old is None:
+        return tuple(getattr(instance, field) for field in fields)
+    return tuple(
+        getattr(instance, field) if field in update_fields or field.removesuffix("_id") in update_fields else value
+        for field, value in zip(fields, old)
+    )
+
+
+def _deleting(origin, *models):
+    """Whether a delete started from an instance or queryset of models."""
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return model in models
+
+
+def _task_states(task_ids):
+    rows = Task.objects.filter(pk__in=task_ids).values_list("pk", *TASK_FIELDS)
+    return {pk: state for pk, *state in rows}
+
+
+def _assignees(task):
+    return list(UserTask.objects.filter(task=task, deleted_at__isnull=True).values_list("user_id", flat=True))
+
+
+def _move(old_key, new_key, user_ids=()):
+    """Count a task (and its assignees) under new_key instead of old_key."""
+    if old_key == new_key:
+        return
+    projects, assignees = Counter(), Counter()
+    if old_key:
+        projects[old_key] -= 1
+        for user_id in user_ids:
+            assignees[old_key[0], user_id, old_key[1]] -= 1
+    if new_key:
+        projects[new_key] += 1
+        for user_id in user_ids:
+            assignees[new_key[0], user_id, new_key[1]] += 1
+    counters.apply(projects, assignees)
+
+
+def _assignment_key(state, task_state):
+    """(project_id, user_id, status) an assignment counts under, or None."""
+    task_id, user_id, deleted_at = state
+    key = counters.task_key(*task_state) if task_state else None
+    if key is None or deleted_at is not None:
+        return None
+    return key[0], user_id, key[1]
+
+
+# ----------------------------------------------
+# Tasks
+#
+@receiver(post_init, sender=Task)
+def remember_task(sender, instance, **kwargs):
+    instance._counted = _loaded(instance, TASK_FIELDS)
+
+
+@receiver(pre_save, sender=Task)
+def load_task(sender, instance, **kwargs):
+    if instance._counted is None and not instance._state.adding:
+        instance._counted = _task_states([instance.pk]).get(instance.pk)
+
+
+@receiver(post_save, sender=Task)
+def task_saved(sender, instance, created, update_fields, **kwargs):
+    old = None if created else instance._counted
+    new = _saved(instance, TASK_FIELDS, old, update_fields)
+    old_key = counters.task_key(*old) if old else None
+    new_key = counters.task_key(*new)
+    if old_key != new_key:
+        _move(old_key, new_key, [] if created else _assignees(instance))
+    instance._counted = new
+
+
+@receiver(pre_delete, sender=Task)
+def task_deleted(sender, instance, origin=None, **kwargs):
+    if _deleting(origin, Project):
+        # the counter rows go away with the project
+        return
+    state = instance._counted or _task_states([instance.pk]).get(instance.pk)
+    if state:
+        _move(counters.task_key(*state), None, _assignees(instance))
+
+
+# ----------------------------------------------
+# Assignments
+#
+@receiver(post_init, sender=UserTask)
+def remember_assignment(sender, instance, **kwargs):
+    instance._counted = _loaded(instance, ASSIGNMENT_FIELDS)
+
+
+@receiver(pre_save, sender=UserTask)
+def load_assignment(sender, instance, **kwargs):
+    if instance._counted is None and not instance._state.adding:
+        row = UserTask.objects.filter(pk=instance.pk).values_list(*ASSIGNMENT_FIELDS).first()
+        instance._counted = tuple(row) if row else None
+
+
+@receiver(post_save, sender=UserTask)
+def assignment_saved(sender, instance, created, update_fields, **kwargs):
+    old = None if created else instance._counted
+    new = _saved(instance, ASSIGNMENT_FIELDS, old, update_fields)
+    tasks = _task_states({state[0] for state in (old, new) if state})
+    old_key = _assignment_key(old, tasks.get(old[0])) if old else None
+    new_key = _assignment_key(new, tasks.get(new[0]))
+    deltas = Counter()
+    if old_key != new_key:
+        if old_key:
+            deltas[old_key] -= 1
+        if new_key:
+            deltas[new_key] += 1
+    counters.apply(assignee_deltas=deltas)
+    instance._counted = new
+
+
+@receiver(pre_delete, sender=UserTask)
+def assignment_deleted(sender, instance, origin=None, **kwargs):
+    if _deleting(origin, Task, Project):
+        # counted by task_deleted, or gone with the project
+        return
+    state = instance._counted or (instance.task_id, instance.user_id, instance.deleted_at)
+    key = _assignment_key(state, _task_states([state[0]]).get(state[0]))
+    if key:
+        counters.apply(assignee_deltas={key: -1})
+
+
+@receiver(m2m_changed, sender=Task.assignees.through)
+def assignees_added(sender, instance, action, reverse, pk_set, **kwargs):
+    # add() bulk inserts UserTask rows without post_save; remove() and
+    # clear() delete them one by one through pre_delete
+    if action != "post_add" or not pk_set:
+        return
+    if reverse:
+        states = _task_states(pk_set)
+        keys = [counters.task_key(*states[task_id]) for task_id in pk_set if task_id in states]
+        user_ids = [instance.pk] * len(keys)
+    else:
+        state = _task_states([instance.pk]).get(instance.pk)
+        keys = [counters.task_key(*state)] * len(pk_set) if state else []
+        user_ids = list(pk_set)
+    deltas = Counter((key[0], user_id, key[1]) for key, user_id in zip(keys, user_ids) if key)
+    counters.apply(assignee_deltas=deltas)
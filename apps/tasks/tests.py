@@ -1,3 +1,103 @@
+# Python modules
+import time
+from unittest import mock
+
+# Django modules
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+# Project modules
+from apps.abstracts.instrumentation import query_budget
+from apps.tasks import counters
+from apps.tasks.models import Project, Task, NamedCounter
+from apps.tasks.named_counters import BufferedCounterBackend
+
+
+class TaskTreeTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = get_user_model().objects.create(username="author")
+        cls.project = Project.objects.create(name="Tree", author=author)
+        cls.root = Task.objects.create(name="root", project=cls.project)
+        cls.children = [Task.objects.create(name=f"child {index}", project=cls.project, parent=cls.root) for index in range(3)]
+        cls.grandchildren = [
+            Task.objects.create(name=f"grandchild {index}", project=cls.project, parent=child, status=Task.STATUS_DONE)
+            for index, child in enumerate(cls.children)
+        ]
+
+
+class QueryBudgetTests(TaskTreeTestCase):
+    def test_project_tree(self):
+        with query_budget(1):
+            response = self.client.get(reverse("project-tree", args=[self.project.pk]))
+        self.assertEqual(response.status_code, 200)
+        tasks = response.json()["tasks"]
+        self.assertEqual(len(tasks), 7)
+        self.assertEqual(tasks[0]["subtree_status_counts"], {str(Task.STATUS_TODO): 4, str(Task.STATUS_DONE): 3})
+
+    def test_task_tree(self):
+        # the subtree, then the ancestors
+        with query_budget(2):
+            response = self.client.get(reverse("task-tree", args=[self.grandchildren[0].pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([ancestor["id"] for ancestor in response.json()["ancestors"]], [self.root.pk, self.children[0].pk])
+
+    def test_project_counts(self):
+        with query_budget(2):
+            response = self.client.get(reverse("project-counts", args=[self.project.pk]))
+        self.assertEqual(response.status_code, 200)
+
+
+class SubtreeTests(TaskTreeTestCase):
+    def test_skips_soft_deleted_branches(self):
+        Task.objects.filter(pk=self.children[0].pk).update(deleted_at=timezone.now())
+        subtree = set(Task.objects.subtree(self.root).values_list("pk", flat=True))
+        self.assertNotIn(self.children[0].pk, subtree)
+        self.assertNotIn(self.grandchildren[0].pk, subtree)
+        self.assertEqual(len(subtree), 5)
+        self.assertEqual(Task.objects.status_counts(self.root), {Task.STATUS_TODO: 3, Task.STATUS_DONE: 2})
+        self.assertEqual(Task.objects.subtree(self.root, alive=False).count(), 7)
+
+    def test_cannot_move_under_own_subtask(self):
+        self.root.parent = self.grandchildren[1]
+        with self.assertRaises(ValidationError):
+            self.root.clean()
+
+
+class CounterTests(TaskTreeTestCase):
+    def test_counters_follow_tasks(self):
+        self.assertEqual(counters.verify(), [])
+        task = Task.objects.create(name="new", project=self.project, status=Task.STATUS_IN_PROGRESS)
+        task.status = Task.STATUS_DONE
+        task.save()
+        task.delete()
+        self.assertEqual(counters.verify(), [])
+        self.assertEqual(counters.project_status_counts(self.project.pk)[Task.STATUS_DONE], 3)
+
+
+class BufferedCounterTests(TestCase):
+    def test_idle_process_flushes(self):
+        backend = BufferedCounterBackend(flush_interval=0.05, flush_size=1000)
+        # the flush thread has its own connection, which does not see the test transaction
+        with mock.patch.object(backend.database, "add", return_value={"hits": 2}) as add:
+            backend.incr("hits")
+            backend.incr("hits")
+            deadline = time.monotonic() + 5
+            while not add.called and time.monotonic() < deadline:
+                time.sleep(0.01)
+        add.assert_called_once_with({"hits": 2})
+        self.assertEqual(backend.pending_count, 0)
 
-# Create your tests here.
+    def test_failed_write_keeps_the_increment_count(self):
+        backend = BufferedCounterBackend(flush_interval=3600, flush_size=1000)
+        for name in ("a", "a", "a", "b"):
+            backend.incr(name)
+        with mock.patch.object(backend.database, "add", side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                backend.flush()
+        self.assertEqual(backend.pending_count, 4)
+        backend.flush()
+        self.assertEqual(dict(NamedCounter.objects.values_list("name", "value")), {"a": 3, "b": 1})
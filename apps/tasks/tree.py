@@ -0,0 +1,135 @@
+"""
+Task hierarchy queries.
+
+Subtrees and ancestors are resolved by the database with recursive CTEs
+over Task.parent, so each call is one query whatever the depth of the
+tree. Nothing is stored besides parent_id: reparenting and cascading
+deletes need no bookkeeping. subtree() and status_counts() skip
+soft-deleted tasks in the seed and in every step of the recursion, so a
+deleted task hides its whole branch and the walk does not go through it.
+"""
+# Python modules
+from collections import Counter
+
+# Django modules
+from django.db import connections
+from django.db.models import Count, QuerySet
+from django.db.models.expressions import RawSQL
+
+
+def _pks(tasks):
+    """Primary keys of a task, a pk or an iterable of either."""
+    if isinstance(tasks, (list, tuple, set, frozenset, QuerySet)):
+        return [getattr(task, "pk", task) for task in tasks]
+    return [getattr(tasks, "pk", tasks)]
+
+
+class TaskQuerySet(QuerySet):
+    def _tree(self, seed, pks, join, alive=False):
+        """
+        pk__in expression for the seed rows (the `seed` condition over pks)
+        and every row reached from them by repeatedly following `join`,
+        through rows with no deleted_at only if alive.
+        """
+        # UNION (not UNION ALL) drops rows already seen, so a cycle in
+        # parent links ends the recursion instead of looping forever
+        quote = connections[self.db].ops.quote_name
+        names = {
+            "table": quote(self.model._meta.db_table),
+            "pk": quote("id"),
+            "parent": quote("parent_id"),
+            "pks": ", ".join(["%s"] * len(pks)),
+            "deleted": quote("deleted_at"),
+        }
+        seed_alive, step_alive = (" AND {deleted} IS NULL", " AND t.{deleted} IS NULL") if alive else ("", "")
+        sql = (
+            "WITH RECURSIVE tree (id, parent_id) AS ("
+            "SELECT {pk}, {parent} FROM {table} WHERE (" + seed + ")" + seed_alive + " "
+            "UNION SELECT t.{pk}, t.{parent} FROM {table} t JOIN tree ON " + join + step_alive +
+            ") SELECT id FROM tree"
+        ).format(**names)
+        return RawSQL(sql, pks)
+
+    def subtree(self, tasks, include_self=True, alive=True):
+        """
+        Tasks below the given task(s) at any depth, and the tasks
+        themselves unless include_self is False. With alive, only tasks
+        reached through alive tasks (a deleted given task has none).
+        """
+        pks = _pks(tasks)
+        if not pks:
+            return self.none()
+        seed = "{pk} IN ({pks})" if include_self else "{parent} IN ({pks})"
+        return self.filter(pk__in=self._tree(seed, pks, "t.{parent} = tree.id", alive=alive))
+
+    def ancestors(self, tasks, include_self=False):
+        """Tasks above the given task(s), up to their roots."""
+        pks = _pks(tasks)
+        if not pks:
+            return self.none()
+        if include_self:
+            seed = "{pk} IN ({pks})"
+        else:
+            seed = "{pk} IN (SELECT {parent} FROM {table} WHERE {pk} IN ({pks}))"
+        return self.filter(pk__in=self._tree(seed, pks, "t.{pk} = tree.parent_id"))
+
+    def status_counts(self, tasks):
+        """{status: number of tasks} over the alive subtree(s) of the given task(s)."""
+        rows = self.subtree(tasks).order_by().values("status").annotate(total=Count("pk"))
+        return {row["status"]: row["total"] for row in rows}
+
+
+def build_tree(tasks):
+    """
+    Link tasks (from subtree() or a whole project) into a forest and return
+    its roots. Every task gets a `children` list and `status_counts`, a
+    Counter of statuses over its own subtree, so progress rolls up without
+    another query.
+    """
+    tasks = list(tasks)
+    by_pk = {task.pk: task for task in tasks}
+    roots = []
+    for task in tasks:
+        task.children = []
+        task.status_counts = Counter()
+    for task in tasks:
+        parent = by_pk.get(task.parent_id)
+        if parent is None or parent is task:
+            roots.append(task)
+        else:
+            parent.children.append(task)
+
+    # post-order walk without recursion, deep trees would hit the stack limit
+    stack, order = list(roots), []
+    while stack:
+        task = stack.pop()
+        order.append(task)
+        stack.extend(task.children)
+    for task in reversed(order):
+        task.status_counts[task.status] += 1
+        parent = by_pk.get(task.parent_id)
+        if parent is not None and parent is not task:
+            parent.status_counts.update(task.status_counts)
+    return roots
+
+
+def walk(roots):
+    """Yield (task, depth) pairs of a forest from build_tree() in pre-order."""
+    stack = [(task, 0) for task in reversed(roots)]
+    while stack:
+        task, depth = stack.pop()
+        yield task, depth
+        stack.extend((child, depth + 1) for child in reversed(task.children))
+
+
+def ancestor_path(task):
+    """Ancestors of task ordered from its root down to its parent."""
+    from apps.tasks.models import Task
+
+    by_pk = {ancestor.pk: ancestor for ancestor in Task.objects.ancestors(task)}
+    path, parent_id = [], task.parent_id
+    while parent_id in by_pk:
+        ancestor = by_pk.pop(parent_id)
+        path.append(ancestor)
+        parent_id = ancestor.parent_id
+    return path[::-1]
@@ -0,0 +1,13 @@
+# Django modules
+from django.urls import path
+
+# Project modules
+from apps.tasks import views
+
+urlpatterns = [
+    path("projects/<int:project_id>/counts/", views.project_counts, name="project-counts"),
+    path("projects/<int:project_id>/tasks/", views.project_tasks, name="project-tasks"),
+    path("projects/<int:project_id>/tasks/async/", views.async_project_tasks, name="async-project-tasks"),
+    path("projects/<int:project_id>/tree/", views.project_tree, name="project-tree"),
+    path("<int:task_id>/tree/", views.task_tree, name="task-tree"),
+]
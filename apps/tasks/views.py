@@ -3,11 +3,29 @@ from typing import Any
 
 # Django modules
 from django.shortcuts import render
-from django.http import HttpRequest, HttpResponse
-from datetime import datetime
-import pytz
+from django.http import Http404, HttpRequest, HttpResponse, JsonResponse
+from django.utils.http import http_date
+from django.views.decorators.http import require_GET
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo, available_timezones
 
-counter_value = 0  # простая переменная для счётчика
+# Project modules
+from apps.tasks import counters
+from apps.tasks.models import Project, Task
+from apps.tasks.named_counters import get_backend
+from apps.tasks.tree import ancestor_path, build_tree, walk
+
+# город -> ZoneInfo, собирается один раз при импорте: "Almaty", "New York", ...
+CITY_ZONE_NAMES = {
+    name.rsplit("/", 1)[-1].replace("_", " "): name
+    for name in sorted(available_timezones())
+    if "/" in name and not name.startswith(("Etc/", "SystemV/"))
+}
+CITY_ZONE_NAMES.update({"Calgary": "America/Edmonton", "UTC": "UTC"})
+CITY_ZONES = {city.lower(): (city, ZoneInfo(name)) for city, name in CITY_ZONE_NAMES.items()}
+MAX_CITIES = 100
+
+COUNTER_NAME = "cnt"  # счётчик общий для всех воркеров, см. apps.tasks.named_counters
 
 def hello_view(
     request: HttpRequest,
@@ -50,19 +68,243 @@ def users(request):
 
 def city_time(request):
     city = request.GET.get("city", "UTC")
-    tz = pytz.timezone({
-        "Almaty": "Asia/Almaty",
-        "Calgary": "America/Edmonton",
-        "Moscow": "Europe/Moscow",
-        "UTC": "UTC",
-    }.get(city, "UTC"))
+    _, tz = CITY_ZONES.get(city.lower(), CITY_ZONES["utc"])
     current_time = datetime.now(tz).strftime("%Y-%m-%d %H:%M:%S")
     return render(request, "city_time.html", {"city": city, "time": current_time})
 
+async def city_times(request: HttpRequest) -> JsonResponse:
+    """
+    Return the current time in many cities at once.
+
+    Parameters:
+        request: HttpRequest
+            The request object, cities as ?city=Almaty&city=Moscow
+            or ?cities=Almaty,Moscow (at most MAX_CITIES).
+
+    Returns:
+        JsonResponse
+            The time in every known city and the list of unknown ones,
+            cacheable until the next second.
+    """
+
+    names = request.GET.getlist("city") + [
+        name for value in request.GET.getlist("cities") for name in value.split(",")
+    ]
+    names = [name.strip() for name in names if name.strip()]
+    if len(names) > MAX_CITIES:
+        return JsonResponse({"detail": f"At most {MAX_CITIES} cities per request."}, status=400)
+
+    # one instant for every city, truncated to the second the times show
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    cities, unknown = [], []
+    for name in names:
+        found = CITY_ZONES.get(name.lower())
+        if found is None:
+            unknown.append(name)
+            continue
+        city, tz = found
+        local = now.astimezone(tz)
+        cities.append({
+            "city": city,
+            "timezone": tz.key,
+            "time": local.strftime("%Y-%m-%d %H:%M:%S"),
+            "utc_offset": local.strftime("%z"),
+        })
+
+    response = JsonResponse({"utc": now.isoformat(), "cities": cities, "unknown": unknown})
+    # the answer holds until the next second boundary; max-age counts whole
+    # seconds and would outlive it, Expires alone marks the boundary
+    epoch = now.timestamp()
+    response["Last-Modified"] = http_date(epoch)
+    response["Expires"] = http_date(epoch + 1)
+    response["Cache-Control"] = "public"
+    return response
+
 def counter(request):
-    global counter_value
+    backend = get_backend()
+    if "reset" in request.GET:
+        backend.reset(COUNTER_NAME)
+        value = 0
+    elif "add" in request.GET:
+        value = backend.incr(COUNTER_NAME)
+    else:
+        value = backend.get(COUNTER_NAME)
+    return render(request, "counter.html", {"counter": value})
+
+async def async_counter(request):
+    """Same as counter() without holding a worker thread, for settings/asgi.py."""
+    backend = get_backend()
     if "reset" in request.GET:
-        counter_value = 0
+        await backend.areset(COUNTER_NAME)
+        value = 0
     elif "add" in request.GET:
-        counter_value += 1
-    return render(request, "counter.html", {"counter": counter_value})
+        value = await backend.aincr(COUNTER_NAME)
+    else:
+        value = await backend.aget(COUNTER_NAME)
+    return render(request, "counter.html", {"counter": value})
+
+
+TREE_FIELDS = ("id", "parent_id", "name", "status")
+TASK_LIST_LIMIT = 50
+
+
+def _project_tasks(project_id, after):
+    tasks = Task.objects.filter(project_id=project_id, deleted_at__isnull=True)
+    page = tasks.only(*TREE_FIELDS).order_by("pk")
+    if after is not None:
+        page = page.filter(pk__gt=after)
+    return tasks, page[:TASK_LIST_LIMIT]
+
+
+def _task_list(project_id, total, page):
+    return {
+        "project_id": project_id,
+        "total": total,
+        "tasks": [
+            {"id": task.pk, "parent_id": task.parent_id, "name": task.name, "status": task.status}
+            for task in page
+        ],
+        # cursor of the next page
+        "after": page[-1].pk if len(page) == TASK_LIST_LIMIT else None,
+    }
+
+
+def _after(request):
+    value = request.GET.get("after")
+    return int(value) if value and value.isdigit() else None
+
+
+@require_GET
+def project_tasks(request: HttpRequest, project_id: int) -> JsonResponse:
+    """
+    Return a page of the alive tasks of a project.
+
+    Parameters:
+        request: HttpRequest
+            The request object, ?after=<task id> for the next page.
+        project_id: int
+            Primary key of the project.
+
+    Returns:
+        JsonResponse
+            Up to TASK_LIST_LIMIT tasks in primary key order and the
+            number of alive tasks.
+    """
+
+    tasks, page = _project_tasks(project_id, _after(request))
+    total = tasks.count()
+    if not total and not Project.objects.filter(pk=project_id).exists():
+        raise Http404("No such project.")
+    return JsonResponse(_task_list(project_id, total, list(page)))
+
+
+@require_GET
+async def async_project_tasks(request: HttpRequest, project_id: int) -> JsonResponse:
+    """
+    project_tasks() as a native async view, for settings/asgi.py.
+
+    Parameters:
+        request: HttpRequest
+            The request object, ?after=<task id> for the next page.
+        project_id: int
+            Primary key of the project.
+
+    Returns:
+        JsonResponse
+            The same page of tasks.
+    """
+
+    tasks, page = _project_tasks(project_id, _after(request))
+    total = await tasks.acount()
+    if not total and not await Project.objects.filter(pk=project_id).aexists():
+        raise Http404("No such project.")
+    return JsonResponse(_task_list(project_id, total, [task async for task in page]))
+
+
+def _tree_nodes(roots):
+    return [
+        {
+            "id": task.pk,
+            "parent_id": task.parent_id,
+            "depth": depth,
+            "name": task.name,
+            "status": task.status,
+            "subtree_status_counts": dict(task.status_counts),
+        }
+        for task, depth in walk(roots)
+    ]
+
+
+@require_GET
+def project_tree(request: HttpRequest, project_id: int) -> JsonResponse:
+    """
+    Return every task of a project as a tree.
+
+    Parameters:
+        request: HttpRequest
+            The request object.
+        project_id: int
+            Primary key of the project.
+
+    Returns:
+        JsonResponse
+            Tasks in depth-first order with their depth and the status
+            counts of their subtree, read in a single query.
+    """
+
+    tasks = Task.objects.filter(project_id=project_id, deleted_at__isnull=True).only(*TREE_FIELDS).order_by("pk")
+    roots = build_tree(tasks)
+    if not roots and not Project.objects.filter(pk=project_id).exists():
+        raise Http404("No such project.")
+    return JsonResponse({"project_id": project_id, "tasks": _tree_nodes(roots)})
+
+
+@require_GET
+def task_tree(request: HttpRequest, task_id: int) -> JsonResponse:
+    """
+    Return a task with its ancestors and its whole subtree.
+
+    Parameters:
+        request: HttpRequest
+            The request object.
+        task_id: int
+            Primary key of the task.
+
+    Returns:
+        JsonResponse
+            The ancestors from the root down and the subtree in depth-first
+            order, read in two queries.
+    """
+
+    tasks = list(Task.objects.subtree(task_id).only(*TREE_FIELDS).order_by("pk"))
+    task = next((task for task in tasks if task.pk == task_id), None)
+    if task is None:
+        raise Http404("No such task.")
+    # the parent of the task is not in the list, so it comes out as the root
+    roots = build_tree(tasks)
+    ancestors = [{"id": ancestor.pk, "name": ancestor.name} for ancestor in ancestor_path(task)]
+    return JsonResponse({"ancestors": ancestors, "tasks": _tree_nodes(roots)})
+
+
+@require_GET
+def project_counts(request: HttpRequest, project_id: int) -> JsonResponse:
+    """
+    Return the task counts of a project for its dashboard.
+
+    Parameters:
+        request: HttpRequest
+            The request object.
+        project_id: int
+            Primary key of the project.
+
+    Returns:
+        JsonResponse
+            Alive tasks per status, overall and per assignee, read from the
+            task counters whatever the number of tasks.
+    """
+
+    return JsonResponse({
+        "project_id": project_id,
+        "statuses": counters.project_status_counts(project_id),
+        "assignees": counters.assignee_status_counts(project_id),
+    })
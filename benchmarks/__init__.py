@@ -0,0 +1,14 @@
+"""
+Benchmark suite for the ORM hot paths.
+
+    python -m benchmarks run --scales 10,100 --output before.json
+    python -m benchmarks compare before.json after.json
+    python -m benchmarks concurrency --clients 100 --threads 4 --slow-ms 50
+    python -m benchmarks contention --workers 8 --seconds 10
+
+Every scale seeds a fresh on-disk test database with
+apps.commerces.datagen and reports wall time, query count and peak memory
+of each case as JSON. The concurrency command compares the sync read
+endpoints under WSGI with their async versions under ASGI, the contention
+command the stock SQLite setup with the production profile.
+"""
@@ -0,0 +1,99 @@
+import argparse
+import sys
+
+from benchmarks import harness
+
+
+def run(args):
+    harness.setup_django()
+
+    from benchmarks import orm
+
+    selected = [(name, func) for name, func in harness.BENCHMARKS if not args.only or name.startswith(tuple(args.only))]
+    results = []
+    with harness.BenchmarkDatabase() as database:
+        for scale in args.scales:
+            database.reset()
+            print(f"seeding scale {scale}...", file=sys.stderr)
+            context = orm.Context(scale, args.seed, args.repeat)
+            for name, func in selected:
+                result = {"scale": scale, "name": name, **harness.measure(func, context, args.repeat)}
+                results.append(result)
+                print(
+                    f"{scale:>7}  {name:<34} {result['wall_ms_median']:>10.2f} ms "
+                    f"{result['queries']:>6} queries {result['peak_kib']:>10.1f} KiB",
+                    file=sys.stderr,
+                )
+    harness.write_results(args.output, results)
+
+
+def concurrency(args):
+    harness.setup_django()
+
+    from benchmarks import concurrency
+
+    with harness.BenchmarkDatabase():
+        print(f"seeding scale {args.scale}...", file=sys.stderr)
+        context = concurrency.Context(args.scale, args.seed)
+        results = concurrency.run(context, args.clients, args.requests, args.threads, args.slow_ms, args.only)
+    harness.write_results(args.output, results)
+
+
+def contention(args):
+    from benchmarks import contention
+
+    results = contention.run(args.workers, args.seconds, args.reads, args.profile)
+    harness.write_results(args.output, results)
+
+
+def compare(args):
+    regressions = harness.compare(args.old, args.new, args.threshold)
+    if regressions:
+        print(f"{regressions} regressions above {args.threshold:.0%}")
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Seed datasets and run the benchmarks.")
+    run_parser.add_argument("--scales", type=lambda value: [int(v) for v in value.split(",")], default=[10, 100],
+                            help="Comma separated restaurant counts.")
+    run_parser.add_argument("--repeat", type=int, default=5)
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--only", action="append", default=[], help="Only run benchmarks with this name prefix.")
+    run_parser.add_argument("--output", default="-", help="JSON results file, - for stdout.")
+    run_parser.set_defaults(handler=run)
+
+    concurrency_parser = commands.add_parser("concurrency", help="Compare sync WSGI and async ASGI read endpoints.")
+    concurrency_parser.add_argument("--scale", type=int, default=10)
+    concurrency_parser.add_argument("--seed", type=int, default=0)
+    concurrency_parser.add_argument("--clients", type=int, default=100, help="Concurrent clients on the ASGI side.")
+    concurrency_parser.add_argument("--threads", type=int, default=4, help="WSGI worker threads.")
+    concurrency_parser.add_argument("--requests", type=int, default=400, help="Requests per endpoint and server.")
+    concurrency_parser.add_argument("--slow-ms", type=float, default=50, help="Time a client takes to read the response.")
+    concurrency_parser.add_argument("--only", action="append", default=[], help="Only run this endpoint (menu, order_history, task_list).")
+    concurrency_parser.add_argument("--output", default="-", help="JSON results file, - for stdout.")
+    concurrency_parser.set_defaults(handler=concurrency)
+
+    contention_parser = commands.add_parser("contention", help="Compare SQLite profiles under concurrent writers.")
+    contention_parser.add_argument("--workers", type=int, default=8, help="Writer processes.")
+    contention_parser.add_argument("--seconds", type=float, default=10)
+    contention_parser.add_argument("--reads", type=int, default=5, help="Reads after every write.")
+    contention_parser.add_argument("--profile", action="append", default=[], help="Only run this profile (default, production).")
+    contention_parser.add_argument("--output", default="-", help="JSON results file, - for stdout.")
+    contention_parser.set_defaults(handler=contention)
+
+    compare_parser = commands.add_parser("compare", help="Compare two result files.")
+    compare_parser.add_argument("old")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument("--threshold", type=float, default=0.1, help="Relative change flagged as regression.")
+    compare_parser.set_defaults(handler=compare)
+
+    args = parser.parse_args()
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
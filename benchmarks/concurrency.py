@@ -0,0 +1,173 @@
+"""
+Sync WSGI against native async ASGI under concurrent slow clients.
+
+Both handlers are driven in process, without a server: the WSGI side runs
+requests on a fixed pool of worker threads (like gunicorn --threads), the
+ASGI side runs every client as a task on one event loop (like one uvicorn
+worker). --clients clients send their share of the requests one after the
+other and every client reads its response slowly (--slow-ms per body
+chunk), which ties up a WSGI thread for the whole time but only parks an
+ASGI task. Latencies are seen from the client, waiting for a free WSGI
+thread included.
+"""
+import asyncio
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+# (name, sync path, async path), formatted with the Context
+ENDPOINTS = (
+    ("menu", "/api/catalogs/restaurants/{restaurant_id}/menu/", "/api/catalogs/restaurants/{restaurant_id}/menu/async/"),
+    ("order_history", "/api/commerces/orders/", "/api/commerces/orders/async/"),
+    ("task_list", "/api/tasks/projects/{project_id}/tasks/", "/api/tasks/projects/{project_id}/tasks/async/"),
+)
+
+
+class Context:
+    """Seeded data and a session cookie for the signed in endpoints."""
+
+    def __init__(self, scale, seed, tasks=500):
+        from django.conf import settings
+        from django.test import Client
+
+        from apps.commerces import datagen
+        from apps.commerces.models import Order
+        from apps.tasks.models import Project, Task
+
+        datagen.generate(scale, seed=seed)
+        order = Order.objects.order_by("pk").first()
+        self.user = order.user
+        self.restaurant_id = order.restaurant_id
+        project = Project.objects.create(name="bench", author=self.user)
+        Task.objects.bulk_create(Task(name=f"task {i}", project=project) for i in range(tasks))
+        self.project_id = project.pk
+
+        client = Client()
+        client.force_login(self.user)
+        self.cookie = f"{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}"
+
+
+def _shares(requests, clients):
+    """Split requests between clients as evenly as possible."""
+    return [requests // clients + (i < requests % clients) for i in range(clients)]
+
+
+def _summary(latencies, elapsed):
+    latencies = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "requests_per_second": round(len(latencies) / elapsed, 1),
+        "latency_ms_p50": round(statistics.median(latencies), 2),
+        "latency_ms_p95": round(latencies[int(len(latencies) * 0.95) - 1], 2),
+    }
+
+
+def run_wsgi(path, cookie, clients, requests, threads, slow_ms):
+    from django.core.handlers.wsgi import WSGIHandler
+
+    handler = WSGIHandler()
+    path, _, query = path.partition("?")
+
+    def one(_):
+        environ = {
+            "REQUEST_METHOD": "GET", "PATH_INFO": path, "QUERY_STRING": query, "SCRIPT_NAME": "",
+            "SERVER_NAME": "testserver", "SERVER_PORT": "80", "SERVER_PROTOCOL": "HTTP/1.1",
+            "HTTP_HOST": "testserver", "HTTP_COOKIE": cookie, "wsgi.input": BytesIO(b""),
+            "wsgi.errors": sys.stderr, "wsgi.url_scheme": "http", "wsgi.version": (1, 0),
+            "wsgi.multithread": True, "wsgi.multiprocess": False, "wsgi.run_once": False,
+        }
+        status = []
+        body = handler(environ, lambda s, headers, exc_info=None: status.append(s))
+        for _chunk in body:
+            # the thread writes to a slow client
+            time.sleep(slow_ms / 1000)
+        body.close()
+        assert status[0].startswith("200"), status
+
+    with ThreadPoolExecutor(max_workers=threads) as pool, ThreadPoolExecutor(max_workers=clients) as client_pool:
+
+        def client(count):
+            latencies = []
+            for _ in range(count):
+                started = time.perf_counter()
+                pool.submit(one, None).result()
+                latencies.append((time.perf_counter() - started) * 1000)
+            return latencies
+
+        started = time.perf_counter()
+        latencies = [latency for chunk in client_pool.map(client, _shares(requests, clients)) for latency in chunk]
+    return _summary(latencies, time.perf_counter() - started)
+
+
+def run_asgi(path, cookie, clients, requests, threads, slow_ms):
+    from django.core.handlers.asgi import ASGIHandler
+
+    handler = ASGIHandler()
+    path, _, query = path.partition("?")
+
+    async def one():
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+            "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": query.encode(),
+            "root_path": "", "headers": [(b"host", b"testserver"), (b"cookie", cookie.encode())],
+            "client": ("127.0.0.1", 0), "server": ("testserver", 80),
+        }
+        sent, statuses = asyncio.Event(), []
+
+        async def receive():
+            if not sent.is_set():
+                sent.set()
+                return {"type": "http.request", "body": b"", "more_body": False}
+            # the client stays connected until the response is done
+            await asyncio.Future()
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                statuses.append(message["status"])
+            elif message["type"] == "http.response.body":
+                # the task waits on a slow client
+                await asyncio.sleep(slow_ms / 1000)
+
+        await handler(scope, receive, send)
+        assert statuses == [200], statuses
+
+    async def client(count):
+        latencies = []
+        for _ in range(count):
+            started = time.perf_counter()
+            await one()
+            latencies.append((time.perf_counter() - started) * 1000)
+        return latencies
+
+    async def main():
+        return await asyncio.gather(*(client(count) for count in _shares(requests, clients)))
+
+    started = time.perf_counter()
+    latencies = [latency for chunk in asyncio.run(main()) for latency in chunk]
+    return _summary(latencies, time.perf_counter() - started)
+
+
+def run(context, clients, requests, threads, slow_ms, only=()):
+    results = []
+    for name, sync_path, async_path in ENDPOINTS:
+        if only and name not in only:
+            continue
+        for server, runner, path in (("wsgi", run_wsgi, sync_path), ("asgi", run_asgi, async_path)):
+            path = path.format(restaurant_id=context.restaurant_id, project_id=context.project_id)
+            result = {
+                "name": name,
+                "server": server,
+                "clients": clients,
+                "threads": threads if server == "wsgi" else None,
+                "slow_ms": slow_ms,
+                **runner(path, context.cookie, clients, requests, threads, slow_ms),
+            }
+            results.append(result)
+            print(
+                f"{name:<14} {server:<5} {result['requests_per_second']:>9.1f} req/s "
+                f"p50 {result['latency_ms_p50']:>9.2f} ms  p95 {result['latency_ms_p95']:>9.2f} ms",
+                file=sys.stderr,
+            )
+    return results
@@ -0,0 +1,119 @@
+"""
+SQLite write contention: the stock backend against the production profile.
+
+Every profile gets a fresh database file, migrated in a subprocess, and
+--workers worker processes hammer it for --seconds. One worker "request"
+is a read-modify-write transaction on a shared counter (the pattern of
+place_order() and friends) followed by --reads plain reads, after which
+the worker closes its connection like the end of a request does, unless
+the profile keeps connections alive.
+
+Profiles are plain environment overrides, so they exercise the same
+settings the web workers read.
+"""
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+PROFILES = {
+    # Django's own SQLite backend with SQLite defaults: rollback journal,
+    # deferred transactions, a connection per request
+    "default": {"DB_ENGINE": "django.db.backends.sqlite3", "DB_CONN_MAX_AGE": "0"},
+    # settings.base defaults
+    "production": {},
+}
+COUNTERS = 10
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _env(profile, path):
+    env = dict(os.environ, DJANGORLAR_ENV_ID="prod", DB_NAME=path, **PROFILES[profile])
+    env.setdefault("SECRET_KEY", "benchmarks")
+    return env
+
+
+def run_profile(profile, workers, seconds, reads):
+    with tempfile.TemporaryDirectory(prefix="contention-") as directory:
+        env = _env(profile, os.path.join(directory, "contention.sqlite3"))
+        subprocess.run(
+            [sys.executable, "manage.py", "migrate", "--run-syncdb", "--verbosity", "0"], env=env, cwd=ROOT, check=True,
+        )
+        command = [sys.executable, "-m", "benchmarks.contention", str(seconds), str(reads)]
+        processes = [
+            subprocess.Popen(command + [str(seed)], env=env, cwd=ROOT, stdout=subprocess.PIPE, text=True)
+            for seed in range(workers)
+        ]
+        reports = [json.loads(process.communicate()[0]) for process in processes]
+
+    latencies = sorted(latency for report in reports for latency in report["latencies"])
+    writes = sum(report["writes"] for report in reports)
+    return {
+        "name": profile,
+        "workers": workers,
+        "seconds": seconds,
+        "writes_per_second": round(writes / seconds, 1),
+        "reads_per_second": round(sum(report["reads"] for report in reports) / seconds, 1),
+        "locked_errors": sum(report["locked"] for report in reports),
+        "write_ms_p50": round(statistics.median(latencies), 2) if latencies else None,
+        "write_ms_p95": round(latencies[int(len(latencies) * 0.95) - 1], 2) if latencies else None,
+    }
+
+
+def run(workers, seconds, reads, profiles=()):
+    results = []
+    for profile in profiles or PROFILES:
+        result = run_profile(profile, workers, seconds, reads)
+        results.append(result)
+        print(
+            f"{profile:<11} {result['writes_per_second']:>9.1f} writes/s {result['reads_per_second']:>10.1f} reads/s "
+            f"{result['locked_errors']:>6} locked  p95 {result['write_ms_p95']} ms",
+            file=sys.stderr,
+        )
+    return results
+
+
+def worker(seconds, reads, seed):
+    """One worker process: print a JSON report of what it managed to do."""
+    from benchmarks.harness import setup_django
+
+    setup_django()
+
+    from django.db import OperationalError, close_old_connections, transaction
+    from django.db.models import F
+
+    from apps.tasks.models import NamedCounter
+
+    rng = random.Random(seed)
+    names = [f"contention:{i}" for i in range(COUNTERS)]
+    report = {"writes": 0, "reads": 0, "locked": 0, "latencies": []}
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        name = rng.choice(names)
+        started = time.perf_counter()
+        try:
+            with transaction.atomic():
+                value = NamedCounter.objects.filter(name=name).values_list("value", flat=True).first()
+                if value is None:
+                    NamedCounter.objects.get_or_create(name=name)
+                NamedCounter.objects.filter(name=name).update(value=F("value") + 1)
+            report["writes"] += 1
+            report["latencies"].append((time.perf_counter() - started) * 1000)
+            for _ in range(reads):
+                NamedCounter.objects.filter(name=rng.choice(names)).values_list("value", flat=True).first()
+                report["reads"] += 1
+        except OperationalError as exc:
+            if "locked" not in str(exc):
+                raise
+            report["locked"] += 1
+        # end of the "request"
+        close_old_connections()
+    json.dump(report, sys.stdout)
+
+
+if __name__ == "__main__":
+    worker(float(sys.argv[1]), int(sys.argv[2]), int(sys.argv[3]))
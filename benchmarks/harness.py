@@ -0,0 +1,166 @@
+"""
+Measurement helpers shared by the benchmark suites.
+"""
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BENCHMARKS = []
+
+
+def setup_django():
+    """Configure Django the same way manage.py does."""
+    from settings.conf import ENV_ID, ENV_POSSIBLE_OPTIONS
+
+    assert ENV_ID in ENV_POSSIBLE_OPTIONS, f"Invalid env id. Possible options: {ENV_POSSIBLE_OPTIONS}"
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", f"settings.env.{ENV_ID}")
+
+    import django
+
+    django.setup()
+
+
+def benchmark(name):
+    """Register func(context) as a benchmark case."""
+
+    def decorator(func):
+        BENCHMARKS.append((name, func))
+        return func
+
+    return decorator
+
+
+class BenchmarkDatabase:
+    """
+    Throwaway on-disk test database, so timings include real file I/O
+    instead of the in-memory database Django tests use for SQLite.
+    """
+
+    def __init__(self, alias="default"):
+        from django.db import connections
+
+        self.connection = connections[alias]
+        self.directory = None
+        self.old_name = None
+
+    def __enter__(self):
+        from django.test.utils import setup_test_environment
+
+        setup_test_environment()
+        if self.connection.vendor == "sqlite":
+            self.directory = tempfile.TemporaryDirectory(prefix="benchmarks-")
+            self.connection.settings_dict["TEST"]["NAME"] = os.path.join(self.directory.name, "bench.sqlite3")
+        self.old_name = self.connection.settings_dict["NAME"]
+        self.connection.creation.create_test_db(verbosity=0, serialize=False)
+        return self
+
+    def __exit__(self, *exc_info):
+        from django.test.utils import teardown_test_environment
+
+        self.connection.creation.destroy_test_db(self.old_name, verbosity=0)
+        teardown_test_environment()
+        if self.directory is not None:
+            self.directory.cleanup()
+
+    def reset(self):
+        from django.core.management import call_command
+
+        call_command("flush", interactive=False, verbosity=0)
+
+
+def measure(func, context, repeat):
+    """
+    Run func(context) repeat times and return wall times, the query count
+    of one run and its peak traced memory. Memory is traced in a separate
+    run so tracemalloc overhead does not leak into the timings.
+    """
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(context)
+        timings.append((time.perf_counter() - started) * 1000)
+
+    with CaptureQueriesContext(connection) as queries:
+        tracemalloc.start()
+        try:
+            func(context)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    return {
+        "wall_ms_min": round(min(timings), 3),
+        "wall_ms_median": round(statistics.median(timings), 3),
+        "queries": len(queries),
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+def environment():
+    import django
+    import sqlite3
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "django": django.get_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def write_results(path, results):
+    payload = {"environment": environment(), "results": results}
+    if path == "-":
+        json.dump(payload, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+        return
+    with open(path, "w") as fh:
+        json.dump(payload, fh, indent=2)
+
+
+def compare(old_path, new_path, threshold):
+    """
+    Print the change of every metric between two result files and
+    return the number of cases whose median wall time, query count or
+    peak memory regressed by more than threshold (a fraction).
+    """
+    with open(old_path) as fh:
+        old = {(r["scale"], r["name"]): r for r in json.load(fh)["results"]}
+    with open(new_path) as fh:
+        new = {(r["scale"], r["name"]): r for r in json.load(fh)["results"]}
+
+    regressions = 0
+    header = f"{'scale':>7}  {'benchmark':<34} {'median ms':>21} {'queries':>13} {'peak KiB':>21}"
+    print(header)
+    print("-" * len(header))
+    for key in sorted(old.keys() & new.keys()):
+        before, after = old[key], new[key]
+        flagged = False
+        cells = []
+        for metric, width in (("wall_ms_median", 9), ("queries", 5), ("peak_kib", 9)):
+            a, b = before[metric], after[metric]
+            change = (b - a) / a if a else (1.0 if b else 0.0)
+            flagged |= change > threshold
+            cells.append(f"{a:>{width}} → {b:<{width}}")
+        regressions += flagged
+        print(f"{key[0]:>7}  {key[1]:<34} {'  '.join(cells)}{'  REGRESSION' if flagged else ''}")
+    for key in sorted(old.keys() ^ new.keys()):
+        print(f"{key[0]:>7}  {key[1]:<34} only in {'old' if key in old else 'new'} results")
+    return regressions
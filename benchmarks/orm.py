@@ -0,0 +1,157 @@
+"""
+Benchmarks of the ORM paths the project runs in production.
+"""
+from decimal import Decimal
+
+from benchmarks.harness import benchmark
+
+ADMIN_CHANGELISTS = (
+    ("commerces", "order"),
+    ("commerces", "orderitem"),
+    ("catalogs", "menuitem"),
+    ("catalogs", "itemcategory"),
+)
+# every n-th order is soft deleted, so alive filters have tombstones to skip
+TOMBSTONE_EVERY = 5
+
+
+class Context:
+    """
+    Dataset handles shared by the cases of one scale.
+    """
+
+    def __init__(self, scale, seed, repeat=5):
+        from django.contrib.auth import get_user_model
+        from django.db.models import F
+        from django.test import Client
+
+        from apps.catalogs.models import Restaurant, MenuItem
+        from apps.commerces import datagen
+        from apps.commerces.models import Order, PromoCode
+
+        self.scale = scale
+        datagen.generate(scale, seed=seed)
+        Order.objects.alias(mod=F("pk") % TOMBSTONE_EVERY).filter(mod=0).soft_delete()
+
+        restaurants = list(Restaurant.objects.order_by("pk").values_list("pk", flat=True))
+        self.restaurant_id = restaurants[0]
+        # restaurants the soft delete case removes one by one, restore brings
+        # back: one per run, measure() runs a case repeat + 1 times. Small
+        # scales get extra restaurants, seeded after the tombstones.
+        runs = repeat + 1
+        if len(restaurants) - 1 < runs:
+            datagen.generate(runs - (len(restaurants) - 1), seed=seed + 1)
+            restaurants = list(Restaurant.objects.order_by("pk").values_list("pk", flat=True))
+        self.to_delete = restaurants[-runs:]
+        self.to_restore = []
+
+        self.user = get_user_model().objects.create_superuser("bench", "bench@example.com", "bench")
+        self.promo = PromoCode.objects.first()
+        self.cart = [
+            {
+                "menu_item": menu_item.pk,
+                "quantity": 2,
+                "options": [io.option_id for io in menu_item.itemoption_set.all() if io.option.is_required],
+            }
+            for menu_item in MenuItem.objects.filter(restaurant_id=self.restaurant_id)
+            .prefetch_related("itemoption_set__option")[:3]
+        ]
+        self.client = Client()
+        self.client.force_login(self.user)
+
+
+@benchmark("alive.order_count")
+def alive_order_count(ctx):
+    from apps.commerces.models import Order
+
+    Order.objects.count()
+
+
+@benchmark("alive.restaurant_orders_page")
+def alive_restaurant_orders(ctx):
+    from apps.commerces.models import Order
+
+    list(Order.objects.filter(restaurant_id=ctx.restaurant_id).order_by("-created_at")[:50])
+
+
+@benchmark("catalogs.menu_listing")
+def menu_listing(ctx):
+    from apps.catalogs.models import MenuItem
+
+    for menu_item in MenuItem.objects.filter(restaurant_id=ctx.restaurant_id):
+        str(menu_item)
+        [category.name for category in menu_item.categories.all()]
+        [option.name for option in menu_item.options.all()]
+
+
+@benchmark("catalogs.menu_endpoint")
+def menu_endpoint(ctx):
+    response = ctx.client.get(f"/api/catalogs/restaurants/{ctx.restaurant_id}/menu/")
+    assert response.status_code == 200, response.status_code
+
+
+@benchmark("catalogs.menu_build")
+def menu_build(ctx):
+    from apps.catalogs.cache import build_menu_json
+
+    build_menu_json(ctx.restaurant_id)
+
+
+@benchmark("commerces.order_create")
+def order_create(ctx):
+    from apps.catalogs.models import MenuItem
+    from apps.commerces.models import Order, OrderItem, OrderPromo
+
+    menu_items = list(MenuItem.objects.filter(restaurant_id=ctx.restaurant_id)[:3])
+    order = Order.objects.create(user=ctx.user, restaurant_id=ctx.restaurant_id)
+    subtotal = Decimal("0.00")
+    for menu_item in menu_items:
+        line_total = menu_item.base_price * 2
+        OrderItem.objects.create(
+            order=order, menu_item=menu_item, item_name=menu_item.name,
+            item_price=menu_item.base_price, quantity=2, line_total=line_total,
+        )
+        subtotal += line_total
+    applied = (subtotal * ctx.promo.discount_percent / Decimal(100)).quantize(Decimal("0.01"))
+    OrderPromo.objects.create(order=order, promo=ctx.promo, applied_amount=applied)
+    order.subtotal = subtotal
+    order.discount_total = applied
+    order.total = subtotal - applied
+    order.save()
+
+
+@benchmark("commerces.place_order")
+def order_place(ctx):
+    from apps.commerces.orders import place_order
+
+    place_order(ctx.user, ctx.restaurant_id, ctx.cart, promo_code=ctx.promo.code)
+
+
+def changelist_case(app_label, model_name):
+    @benchmark(f"admin.{model_name}_changelist")
+    def changelist(ctx):
+        response = ctx.client.get(f"/admin/{app_label}/{model_name}/")
+        assert response.status_code == 200, response.status_code
+
+    return changelist
+
+
+for _app_label, _model_name in ADMIN_CHANGELISTS:
+    changelist_case(_app_label, _model_name)
+
+
+@benchmark("abstracts.soft_delete_restaurant")
+def soft_delete_restaurant(ctx):
+    from apps.catalogs.models import Restaurant
+
+    restaurant_id = ctx.to_delete.pop()
+    Restaurant.objects.filter(pk=restaurant_id).soft_delete()
+    ctx.to_restore.append(restaurant_id)
+
+
+@benchmark("abstracts.restore_restaurant")
+def restore_restaurant(ctx):
+    from apps.catalogs.models import Restaurant
+
+    restaurant_id = ctx.to_restore.pop()
+    Restaurant.all_objects.filter(pk=restaurant_id).restore()
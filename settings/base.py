@@ -3,7 +3,7 @@ import os
 
 # Project modules
 from settings.conf import *  # noqa: F403
-from decouple import config
+from decouple import Csv, config
 
 # ----------------------------------------------
 # Path
@@ -38,6 +38,9 @@ INSTALLED_APPS = DJANGO_AND_THIRD_PARTY_APPS + PROJECT_APPS
 #
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'apps.abstracts.profiling.profiler_middleware',
+    'apps.abstracts.instrumentation.sql_instrumentation_middleware',
+    'apps.abstracts.middleware.replica_pin_middleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -74,16 +77,149 @@ AUTH_PASSWORD_VALIDATORS = [
         'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator',
     },
 ]
+
+# ----------------------------------------------
+# Database
+#
+# The SQLite production profile: apps.abstracts.backends.sqlite3 runs
+# SQLITE_PRAGMAS on every new connection and starts transactions in
+# SQLITE_TRANSACTION_MODE. Connections are kept DB_CONN_MAX_AGE seconds.
+SQLITE_PRAGMAS = {
+    'journal_mode': config('SQLITE_JOURNAL_MODE', default='wal'),
+    'busy_timeout': config('SQLITE_BUSY_TIMEOUT', default=5000, cast=int),
+    'synchronous': config('SQLITE_SYNCHRONOUS', default='normal'),
+    'mmap_size': config('SQLITE_MMAP_SIZE', default=256 * 1024 * 1024, cast=int),
+    # negative: KiB instead of pages
+    'cache_size': config('SQLITE_CACHE_SIZE', default=-64 * 1024, cast=int),
+    'temp_store': config('SQLITE_TEMP_STORE', default='memory'),
+    'wal_autocheckpoint': config('SQLITE_WAL_AUTOCHECKPOINT', default=1000, cast=int),
+    # rows read per index by the ANALYZE of PRAGMA optimize on close
+    'analysis_limit': config('SQLITE_ANALYSIS_LIMIT', default=1000, cast=int),
+}
+SQLITE_TRANSACTION_MODE = config('SQLITE_TRANSACTION_MODE', default='IMMEDIATE')
+# seconds between WAL checkpoints of `manage.py sqlitecheckpoint --every`
+SQLITE_CHECKPOINT_INTERVAL = config('SQLITE_CHECKPOINT_INTERVAL', default=300, cast=int)
+
+DB_ENGINE = config('DB_ENGINE', default='apps.abstracts.backends.sqlite3')
 DATABASES = {
     'default': {
-        'ENGINE': config('DB_ENGINE', default='django.db.backends.sqlite3'),
+        'ENGINE': DB_ENGINE,
         'NAME': config('DB_NAME', default=os.path.join(BASE_DIR, 'db.sqlite3')),
         'USER': config('DB_USER', default=''),
         'PASSWORD': config('DB_PASSWORD', default=''),
         'HOST': config('DB_HOST', default=''),
         'PORT': config('DB_PORT', default=''),
+        'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=600, cast=int),
+        'CONN_HEALTH_CHECKS': config('DB_CONN_HEALTH_CHECKS', default=True, cast=bool),
+        'OPTIONS': {
+            'pragmas': SQLITE_PRAGMAS,
+            'transaction_mode': SQLITE_TRANSACTION_MODE,
+        } if DB_ENGINE == 'apps.abstracts.backends.sqlite3' else {},
+    }
+}
+
+# ----------------------------------------------
+# Replicas
+#
+# DB_REPLICAS: comma separated files of SQLite copies of the primary,
+# refreshed by `manage.py syncreplicas --every`. apps.abstracts.routers
+# reads REPLICA_APPS from them and pins clients that wrote to the primary
+# for REPLICA_PIN_SECONDS, keep it above REPLICA_SYNC_INTERVAL.
+DATABASE_REPLICAS = []
+for _index, _name in enumerate(config('DB_REPLICAS', default='', cast=Csv()), 1):
+    DATABASES[f'replica{_index}'] = {
+        **DATABASES['default'],
+        'NAME': _name,
+        'OPTIONS': {
+            **DATABASES['default']['OPTIONS'],
+            'pragmas': {**SQLITE_PRAGMAS, 'query_only': 1},
+        } if DB_ENGINE == 'apps.abstracts.backends.sqlite3' else {},
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica{_index}')
+DATABASE_ROUTERS = ['apps.abstracts.routers.ReplicaRouter']
+REPLICA_APPS = ['catalogs', 'commerces', 'tasks']
+REPLICA_PIN_COOKIE = 'pin_primary'
+REPLICA_PIN_SECONDS = config('REPLICA_PIN_SECONDS', default=5, cast=int)
+REPLICA_SYNC_INTERVAL = config('REPLICA_SYNC_INTERVAL', default=1.0, cast=float)
+
+# ----------------------------------------------
+# Cache
+#
+# locmem by default, set CACHE_BACKEND to
+# django.core.cache.backends.filebased.FileBasedCache and CACHE_LOCATION
+# to a directory to share the cache between worker processes.
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='djangorlar'),
     }
 }
+MENU_CACHE_ALIAS = config('MENU_CACHE_ALIAS', default='default')
+MENU_CACHE_TIMEOUT = config('MENU_CACHE_TIMEOUT', default=3600, cast=int)
+# apps.commerces.promos: cache holding the promo index version, and
+# the longest a process keeps its index without a version change
+PROMO_CACHE_ALIAS = config('PROMO_CACHE_ALIAS', default='default')
+PROMO_INDEX_TTL = config('PROMO_INDEX_TTL', default=60, cast=int)
+
+# ----------------------------------------------
+# Counters
+#
+# apps.tasks.named_counters.BufferedCounterBackend trades up to
+# COUNTER_FLUSH_INTERVAL seconds of lag for one write per flush; a
+# killed process loses the increments of its last interval.
+COUNTER_BACKEND = config('COUNTER_BACKEND', default='apps.tasks.named_counters.DatabaseCounterBackend')
+COUNTER_FLUSH_INTERVAL = config('COUNTER_FLUSH_INTERVAL', default=1.0, cast=float)
+COUNTER_FLUSH_SIZE = config('COUNTER_FLUSH_SIZE', default=1000, cast=int)
+
+# ----------------------------------------------
+# Order dispatch
+#
+# apps.commerces.dispatch, drained by `manage.py dispatchorders` workers.
+DISPATCH_BATCH_SIZE = config('DISPATCH_BATCH_SIZE', default=100, cast=int)
+DISPATCH_LEASE_SECONDS = config('DISPATCH_LEASE_SECONDS', default=60, cast=int)
+DISPATCH_IDLE_SLEEP = config('DISPATCH_IDLE_SLEEP', default=1.0, cast=float)
+
+# ----------------------------------------------
+# Background jobs
+#
+# apps.abstracts.jobs, run by `manage.py runworkers`. Admin actions on more
+# than JOBS_ADMIN_THRESHOLD rows are queued instead of run in the request.
+JOBS_PROCESSES = config('JOBS_PROCESSES', default=2, cast=int)
+JOBS_LEASE_SECONDS = config('JOBS_LEASE_SECONDS', default=60, cast=int)
+JOBS_POLL_INTERVAL = config('JOBS_POLL_INTERVAL', default=1.0, cast=float)
+JOBS_MAX_ATTEMPTS = config('JOBS_MAX_ATTEMPTS', default=3, cast=int)
+JOBS_RETRY_BACKOFF = config('JOBS_RETRY_BACKOFF', default=10, cast=int)
+JOBS_RETRY_BACKOFF_MAX = config('JOBS_RETRY_BACKOFF_MAX', default=3600, cast=int)
+JOBS_PROGRESS_INTERVAL = config('JOBS_PROGRESS_INTERVAL', default=1.0, cast=float)
+JOBS_CHUNK_SIZE = config('JOBS_CHUNK_SIZE', default=1000, cast=int)
+JOBS_ADMIN_THRESHOLD = config('JOBS_ADMIN_THRESHOLD', default=1000, cast=int)
+
+# ----------------------------------------------
+# SQL instrumentation
+#
+# apps.abstracts.instrumentation: Server-Timing headers, slow request and
+# N+1 warnings on the apps.abstracts.instrumentation logger. Off unless
+# the environment sets SQL_INSTRUMENTATION=True.
+SQL_INSTRUMENTATION = config('SQL_INSTRUMENTATION', default=False, cast=bool)
+SQL_SLOW_REQUEST_MS = config('SQL_SLOW_REQUEST_MS', default=500, cast=float)
+SQL_N_PLUS_ONE_THRESHOLD = config('SQL_N_PLUS_ONE_THRESHOLD', default=5, cast=int)
+
+# ----------------------------------------------
+# Profiler
+#
+# apps.abstracts.profiling, switched on per request with a signed header
+# or for a share of the traffic in the admin (profiler config). Profiles
+# past PROFILER_MAX_AGE_DAYS or beyond the newest PROFILER_MAX_PROFILES
+# are deleted, rows and files (0 keeps them). Off unless the environment
+# sets PROFILER_ENABLED=True.
+PROFILER_ENABLED = config('PROFILER_ENABLED', default=False, cast=bool)
+PROFILER_DIR = config('PROFILER_DIR', default=os.path.join(BASE_DIR, 'profiles'))
+PROFILER_INTERVAL_MS = config('PROFILER_INTERVAL_MS', default=5, cast=int)
+PROFILER_CONFIG_TTL = config('PROFILER_CONFIG_TTL', default=10, cast=float)
+PROFILER_TOKEN_MAX_AGE = config('PROFILER_TOKEN_MAX_AGE', default=3600, cast=int)
+PROFILER_MAX_PROFILES = config('PROFILER_MAX_PROFILES', default=1000, cast=int)
+PROFILER_MAX_AGE_DAYS = config('PROFILER_MAX_AGE_DAYS', default=14, cast=int)
 
 # ----------------------------------------------
 # Internationalization
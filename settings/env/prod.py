@@ -5,9 +5,5 @@ from settings.base import *
 DEBUG = False
 ALLOWED_HOSTS = ["*"]
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': 'db.sqlite3',
-    },
-}
+# DATABASES come from settings.base: the SQLite production profile,
+# configured through the DB_* and SQLITE_* environment variables.
@@ -1,6 +1,6 @@
 # Django modules
 from django.contrib import admin
-from django.urls import path
+from django.urls import include, path
 from apps.tasks import views 
 
 # Project modules
@@ -13,6 +13,11 @@ urlpatterns = [
     path("", views.welcome, name="welcome"),
     path("users/", views.users, name="users"),
     path("city-time/", views.city_time, name="city_time"),
+    path("city-time/batch/", views.city_times, name="city_times"),
     path("cnt/", views.counter, name="counter"),
+    path("cnt/async/", views.async_counter, name="async-counter"),
+    path("api/catalogs/", include("apps.catalogs.urls")),
+    path("api/commerces/", include("apps.commerces.urls")),
+    path("api/tasks/", include("apps.tasks.urls")),
 
 ]